@@ -3,6 +3,8 @@ from abc import ABC, abstractmethod
 import json
 
 from utils.llm_client import llm_client
+from utils.llm_metrics import llm_metrics
+from utils.lazy import LazyProxy
 
 
 class BaseAgent(ABC):
@@ -133,11 +135,6 @@ class MultiAgentSystem:
         self._setup_agents()
     
     def _setup_agents(self) -> None:
-        from modules.document_parser import document_parser
-        from modules.knowledge_base import knowledge_base
-        from modules.audit_engine import audit_engine
-        from modules.report_generator import report_generator
-        
         parser_agent = ParserAgent()
         knowledge_agent = KnowledgeAgent()
         audit_agent = AuditAgent()
@@ -150,7 +147,8 @@ class MultiAgentSystem:
     
     def run_audit(self, 
                   policy_files: List[str], 
-                  config_files: List[str]) -> Dict[str, Any]:
+                  config_files: List[str],
+                  workers: Optional[int] = None) -> Dict[str, Any]:
         workflow = [
             {
                 "agent": "ParserAgent",
@@ -181,7 +179,8 @@ class MultiAgentSystem:
                 "action": "audit",
                 "input_mapping": {
                     "rules": "parsed_policies.extracted_rules",
-                    "configs": "parsed_configs.configs"
+                    "configs": "parsed_configs.configs",
+                    "workers": "workers"
                 },
                 "output_key": "audit_result"
             },
@@ -189,7 +188,8 @@ class MultiAgentSystem:
                 "agent": "ReportAgent",
                 "action": "generate",
                 "input_mapping": {
-                    "violations": "audit_result.violations"
+                    "violations": "audit_result.violations",
+                    "llm_since": "llm_since"
                 },
                 "output_key": "report"
             }
@@ -197,10 +197,14 @@ class MultiAgentSystem:
         
         context = {
             "policy_files": policy_files,
-            "config_files": config_files
+            "config_files": config_files,
+            "workers": workers,
+            "llm_since": llm_metrics.snapshot()
         }
         
-        return self.orchestrator.execute_workflow(workflow, context)
+        result = self.orchestrator.execute_workflow(workflow, context)
+        result["llm_usage"] = llm_metrics.report(since=context["llm_since"])
+        return result
     
     def quick_audit(self, 
                     policy_text: str, 
@@ -259,6 +263,7 @@ class ParserAgent(BaseAgent):
     
     def _parse_policies(self, file_paths: List[str]) -> Dict[str, Any]:
         from modules.document_parser import document_parser
+        from modules.knowledge_base.dedup import collapse_near_duplicates
         
         results = []
         all_rules = []
@@ -267,6 +272,8 @@ class ParserAgent(BaseAgent):
             try:
                 parsed = document_parser.parse(file_path)
                 rules = document_parser.extract_policy_rules(parsed)
+                for rule in rules:
+                    rule["file_path"] = file_path
                 results.append({
                     "file_path": file_path,
                     "status": "success",
@@ -286,7 +293,7 @@ class ParserAgent(BaseAgent):
         return {
             "status": "success",
             "results": results,
-            "extracted_rules": all_rules
+            "extracted_rules": collapse_near_duplicates(all_rules)
         }
     
     def _parse_configs(self, file_paths: List[str]) -> Dict[str, Any]:
@@ -402,7 +409,7 @@ class AuditAgent(BaseAgent):
             if isinstance(configs, dict) and "configs" in configs:
                 configs = configs["configs"]
             
-            return self._perform_audit(rules, configs)
+            return self._perform_audit(rules, configs, input_data.get("workers"))
         
         elif action == "quick_check":
             rule = input_data.get("rule", {})
@@ -412,26 +419,23 @@ class AuditAgent(BaseAgent):
         else:
             return {"error": f"Unknown action: {action}"}
     
-    def _perform_audit(self, rules: List[Dict], configs: List[Dict]) -> Dict[str, Any]:
-        from modules.audit_engine import reasoning_engine
+    def _perform_audit(self, rules: List[Dict], configs: List[Dict], workers: Optional[int] = None) -> Dict[str, Any]:
+        from modules.audit_engine import audit_violations
         
         violations = []
-        
-        for rule in rules:
-            for config in configs:
-                reasoning = reasoning_engine.reason(rule, config)
-                
-                if reasoning.get("conclusion", {}).get("is_violation") == "是":
-                    violations.append({
-                        "violation_id": f"VIO_{len(violations) + 1}",
-                        "title": self._generate_title(rule),
-                        "risk_level": reasoning["conclusion"].get("risk_level", "中"),
-                        "description": reasoning["conclusion"].get("description", ""),
-                        "policy_reference": rule.get("source_text", ""),
-                        "config_value": config,
-                        "reasoning": reasoning,
-                        "confidence": reasoning["conclusion"].get("confidence", 0)
-                    })
+        matches, plan_stats = audit_violations(rules, configs, workers=workers)
+        
+        for violation_id, rule, config, reasoning in matches:
+            violations.append({
+                "violation_id": violation_id,
+                "title": self._generate_title(rule),
+                "risk_level": reasoning["conclusion"].get("risk_level", "中"),
+                "description": reasoning["conclusion"].get("description", ""),
+                "policy_reference": rule.get("source_text", ""),
+                "config_value": config,
+                "reasoning": reasoning,
+                "confidence": reasoning["conclusion"].get("confidence", 0)
+            })
         
         self.add_memory({
             "action": "audit",
@@ -443,6 +447,9 @@ class AuditAgent(BaseAgent):
         return {
             "status": "success",
             "total_checks": len(rules) * len(configs) if rules and configs else 0,
+            "pairs_evaluated": plan_stats["pairs_evaluated"],
+            "pairs_skipped": plan_stats["pairs_skipped"],
+            "workers": plan_stats["workers"],
             "violations": violations
         }
     
@@ -482,7 +489,7 @@ class ReportAgent(BaseAgent):
             }
             
             report = report_generator.generate_report(audit_result)
-            outputs = report_generator.save_all_outputs(audit_result)
+            outputs = report_generator.save_all_outputs(audit_result, input_data.get("llm_since"))
             
             self.add_memory({
                 "action": "generate",
@@ -508,4 +515,4 @@ class ReportAgent(BaseAgent):
             return {"error": f"Unknown action: {action}"}
 
 
-multi_agent_system = MultiAgentSystem()
+multi_agent_system = LazyProxy(MultiAgentSystem)
@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+审计执行吞吐量基准测试
+
+生成合成规则与配置行，对比不同进程数下分片审计的耗时与加速比，
+并校验各进程数下的违规结果与违规ID完全一致。
+
+使用方法：
+    python benchmarks/bench_audit.py --rules 2000 --configs 200000 --workers 1 8 32
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+from pathlib import Path
+
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+from modules.audit_engine import audit_violations
+
+
+RULE_TEMPLATES = [
+    ("单张优惠券金额不得超过{n}元", "上限约束"),
+    ("每位用户每月领取次数不超过{n}次", "上限约束"),
+    ("促销活动总预算不得超过{n}万元", "上限约束"),
+    ("优惠券有效期天数不少于{n}天", "下限约束"),
+    ("优惠券发放对象仅限新注册用户", "范围限制"),
+    ("活动规则必须明确告知用户", "必做事项"),
+]
+
+CONFIG_TEMPLATES = [
+    lambda rng: {"优惠券金额": rng.randint(1, 2000), "发放对象": rng.choice(["新用户", "全部用户"])},
+    lambda rng: {"monthly_limit": rng.randint(1, 10), "validity_days": rng.randint(1, 90)},
+    lambda rng: {"活动名称": "促销", "total_budget": rng.randint(1, 300) * 10000},
+    lambda rng: {"规则内容": "满500减100", "规则状态": "生效中"},
+]
+
+
+def generate_workload(rules: int, configs: int, seed: int = 11) -> tuple:
+    rng = random.Random(seed)
+    rule_list = []
+    for i in range(rules):
+        template, rule_type = rng.choice(RULE_TEMPLATES)
+        rule_list.append({"rule_id": f"R{i:05d}", "source_text": template.format(n=rng.randint(1, 999)),
+                          "rule_type": rule_type})
+    config_list = [rng.choice(CONFIG_TEMPLATES)(rng) for _ in range(configs)]
+    return rule_list, config_list
+
+
+def main():
+    parser = argparse.ArgumentParser(description="审计执行吞吐量基准测试")
+    parser.add_argument('--rules', type=int, default=500, help='合成规则数')
+    parser.add_argument('--configs', type=int, default=20000, help='合成配置行数')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, os.cpu_count() or 1], help='对比的进程数')
+    args = parser.parse_args()
+
+    rules, configs = generate_workload(args.rules, args.configs)
+    print(f"规则数: {len(rules)}, 配置行数: {len(configs)}, CPU核心数: {os.cpu_count()}")
+    print()
+
+    baseline = None
+    reference = None
+    for workers in args.workers:
+        start = time.perf_counter()
+        matches, stats = audit_violations(rules, configs, workers=workers)
+        elapsed = time.perf_counter() - start
+
+        ids = [violation_id for violation_id, _, _, _ in matches]
+        reference = reference if reference is not None else ids
+        baseline = baseline or elapsed
+        print(f"  进程数 {stats['workers']:<4} 分片 {stats['shards']:<5} {elapsed:8.3f}s  "
+              f"评估 {stats['pairs_evaluated']:,} 对 (跳过 {stats['pairs_skipped']:,})  "
+              f"违规 {len(matches):,}  加速比 {baseline / elapsed:.2f}x  "
+              f"结果一致: {'是' if ids == reference else '否'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+知识库写入吞吐量基准测试
+
+生成大规模合成审计案例与政策文档，对比逐文档写入与批量写入队列的吞吐量。
+默认使用离线哈希向量化后端，无需网络。
+
+使用方法：
+    python benchmarks/bench_ingestion.py --cases 5000 --policies 100
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+from pathlib import Path
+
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+os.environ.setdefault("EMBEDDING_BACKEND", "hashing")
+
+from config.settings import VECTOR_STORE_CONFIG
+from modules.knowledge_base.rag_engine import RAGEngine
+from modules.knowledge_base.rule_store import RuleStore
+from modules.knowledge_base.vector_store import VectorStore
+
+
+VIOLATIONS = ["金额超限", "对象违规", "渠道违规", "有效期违规", "预算超支"]
+
+POLICY_TEMPLATES = [
+    "单张优惠券金额不得超过{n}元",
+    "每位用户每月领取次数不超过{n}次",
+    "单次促销活动总预算不得超过{n}万元",
+    "各部门负责人应当做好活动复盘并按季度提交总结材料",
+]
+
+
+def generate_documents(cases: int, policies: int, seed: int = 7) -> list:
+    rng = random.Random(seed)
+    documents = [{
+        "document_type": "audit_case",
+        "content": f"案例{i}：活动配置{rng.choice(VIOLATIONS)}，配置值{rng.randint(1, 9999)}，已整改。",
+        "metadata": {"case_id": f"C{i:06d}", "violation_type": rng.choice(VIOLATIONS)}
+    } for i in range(cases)]
+    documents.extend({
+        "document_type": "policy_document",
+        "content": [{"text": rng.choice(POLICY_TEMPLATES).format(n=rng.randint(1, 999))}
+                    for _ in range(20)],
+        "metadata": {"title": f"政策{i}"}
+    } for i in range(policies))
+    return documents
+
+
+def make_engine(tmp_dir: str) -> RAGEngine:
+    engine = RAGEngine(rule_store=RuleStore(str(Path(tmp_dir) / "rules.db")))
+    engine.vector_store = VectorStore({**VECTOR_STORE_CONFIG, "persist_directory": tmp_dir})
+    engine._near_duplicates = None
+    engine.semantic_cache = None
+    return engine
+
+
+def main():
+    parser = argparse.ArgumentParser(description="知识库写入吞吐量基准测试")
+    parser.add_argument('--cases', type=int, default=5000, help='合成审计案例数')
+    parser.add_argument('--policies', type=int, default=100, help='合成政策文档数')
+    parser.add_argument('--workers', type=int, default=1, help='批量模式下的规则提取进程数')
+    args = parser.parse_args()
+
+    documents = generate_documents(args.cases, args.policies)
+    print(f"文档数: {len(documents)} (审计案例 {args.cases}, 政策 {args.policies})")
+    print()
+
+    results = {}
+    for name, bulk in (("逐文档写入", False), ("批量写入队列", True)):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            engine = make_engine(tmp_dir)
+            start = time.perf_counter()
+            engine.build_knowledge_base(documents, bulk=bulk, workers=args.workers)
+            elapsed = time.perf_counter() - start
+            count = engine.vector_store.get_count()
+            engine.rule_store.close()
+
+        results[name] = elapsed
+        print(f"  {name:<12} {elapsed:8.3f}s  记录 {count:<8} ({count / elapsed:,.0f} 条/秒)")
+
+    print(f"  加速比: {results['逐文档写入'] / results['批量写入队列']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+规则提取吞吐量基准测试
+
+生成大规模合成政策语料，对比逐方法关键词扫描（旧实现）与单次扫描分类器的吞吐量。
+
+使用方法：
+    python benchmarks/bench_rule_extraction.py --paragraphs 200000
+"""
+
+import sys
+import time
+import random
+import argparse
+from pathlib import Path
+
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+from modules.knowledge_base.rule_extractor import RuleExtractor
+from utils.keyword_matcher import PolicyKeywordClassifier, AHOCORASICK_AVAILABLE
+
+
+TEMPLATES = [
+    "单张优惠券金额不得超过{n}元",
+    "优惠券发放对象仅限新注册用户",
+    "每位用户每月领取次数不超过{n}次",
+    "优惠券有效期不得少于{n}天，不得超过{m}天",
+    "单次促销活动总预算不得超过{n}万元",
+    "促销范围仅限线上渠道，禁止与其它优惠活动叠加使用",
+    "活动规则必须明确告知用户，退款时优惠券应当返还",
+    "折扣比例不低于{n}%，由市场部负责解释",
+    "本办法自发布之日起施行，原有相关文件同时废止",
+    "各部门负责人应当做好活动复盘并按季度提交总结材料",
+]
+
+
+def generate_corpus(paragraphs: int, seed: int = 42) -> list:
+    rng = random.Random(seed)
+    return [
+        rng.choice(TEMPLATES).format(n=rng.randint(1, 999), m=rng.randint(1, 999))
+        for _ in range(paragraphs)
+    ]
+
+
+def legacy_classify(para: str) -> dict:
+    rule_keywords = [
+        "应当", "必须", "不得", "禁止", "要求", "规定",
+        "限额", "上限", "下限", "范围", "条件", "标准",
+        "不超过", "不得超过", "不得少于", "仅限"
+    ]
+    if not any(kw in para for kw in rule_keywords):
+        return {}
+
+    if any(kw in para for kw in ['不得', '禁止', '严禁']):
+        rule_type = "禁止事项"
+    elif any(kw in para for kw in ['必须', '应当', '需要']):
+        rule_type = "必做事项"
+    elif any(kw in para for kw in ['限额', '上限', '不超过', '不得超过']):
+        rule_type = "上限约束"
+    elif any(kw in para for kw in ['下限', '不低于', '不少于', '不得少于']):
+        rule_type = "下限约束"
+    elif any(kw in para for kw in ['仅限', '范围']):
+        rule_type = "范围限制"
+    else:
+        rule_type = "条件约束"
+
+    constraint_type = "其他"
+    for ctype, keywords in {
+        "金额": ["金额", "费用", "成本", "预算", "元"],
+        "比例": ["比例", "百分比", "%", "折扣"],
+        "范围": ["范围", "对象", "用户", "渠道", "仅限"],
+        "时间": ["时间", "期限", "日期", "周期", "天"],
+        "数量": ["数量", "次数", "件数", "人数"]
+    }.items():
+        if any(kw in para for kw in keywords):
+            constraint_type = ctype
+            break
+
+    if any(kw in para for kw in ["不超过", "不大于", "上限", "最高", "不得超过"]):
+        operator = "<="
+    elif any(kw in para for kw in ["不低于", "不小于", "下限", "最低", "不得少于"]):
+        operator = ">="
+    elif any(kw in para for kw in ["等于", "为", "是"]):
+        operator = "=="
+    else:
+        operator = "<="
+
+    return {"rule_type": rule_type, "constraint_type": constraint_type, "operator": operator}
+
+
+def single_scan_classify(classifier: PolicyKeywordClassifier, para: str) -> dict:
+    matched = classifier.matcher.scan(para)
+    if not classifier.contains_rule(matched):
+        return {}
+    return {
+        "rule_type": classifier.rule_type(matched),
+        "constraint_type": classifier.constraint_type(matched),
+        "operator": classifier.operator(matched)
+    }
+
+
+def measure(name: str, func, corpus: list) -> float:
+    start = time.perf_counter()
+    for para in corpus:
+        func(para)
+    elapsed = time.perf_counter() - start
+    throughput = len(corpus) / elapsed
+    print(f"  {name:<24} {elapsed:8.3f}s  {throughput:12,.0f} 段/秒")
+    return throughput
+
+
+def main():
+    parser = argparse.ArgumentParser(description="规则提取吞吐量基准测试")
+    parser.add_argument('--paragraphs', type=int, default=200000, help='合成语料段落数')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4], help='并行提取进程数')
+    args = parser.parse_args()
+
+    corpus = generate_corpus(args.paragraphs)
+    distinct = list(dict.fromkeys(corpus))
+
+    print(f"语料段落数: {len(corpus)} (不重复 {len(distinct)})")
+    print()
+
+    print("【关键词分类】")
+    legacy = measure("逐方法扫描 (旧实现)", legacy_classify, distinct)
+    backends = ["substring"] + (["ahocorasick"] if AHOCORASICK_AVAILABLE else [])
+    for backend in backends:
+        classifier = PolicyKeywordClassifier(backend)
+        single = measure(f"单次扫描 ({backend})",
+                         lambda para: single_scan_classify(classifier, para), distinct)
+        print(f"  {'':<24} 加速比: {single / legacy:.2f}x")
+    print()
+
+    print("【完整规则提取】")
+    extractor = RuleExtractor()
+    print(f"  匹配后端: {extractor.classifier.matcher.backend}")
+    text = "\n".join(corpus)
+    start = time.perf_counter()
+    rules = extractor.extract_rules(text)
+    elapsed = time.perf_counter() - start
+    print(f"  提取规则数: {len(rules)}")
+    print(f"  耗时: {elapsed:.3f}s  ({len(corpus) / elapsed:,.0f} 段/秒)")
+    print()
+
+    print("【流式并行提取】")
+    baseline = None
+    try:
+        for workers in args.workers:
+            start = time.perf_counter()
+            count = sum(1 for _ in extractor.iter_rules_parallel(corpus, workers=workers))
+            elapsed = time.perf_counter() - start
+            baseline = baseline or elapsed
+            print(f"  进程数 {workers:<3} 规则 {count:<8} 耗时 {elapsed:8.3f}s  "
+                  f"({len(corpus) / elapsed:,.0f} 段/秒, {baseline / elapsed:.2f}x)")
+    finally:
+        extractor.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+命令行启动耗时基准测试
+
+在独立子进程中按模式运行 main.py，统计端到端耗时以及被加载的重量级依赖，
+用于确认 status 等轻量命令不会初始化 ChromaDB、LLM 客户端或 pandas。
+
+使用方法：
+    python benchmarks/bench_startup.py --repeat 5
+    python benchmarks/bench_startup.py --mode import status
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+from pathlib import Path
+
+project_root = Path(__file__).resolve().parent.parent
+
+HEAVY_MODULES = ["chromadb", "openai", "zhipuai", "pandas", "openpyxl", "docx"]
+
+MODES = {
+    "import": [],
+    "help": ["--help"],
+    "status": ["--status"],
+    "parse-xlsx": ["--parse", str(project_root / "data" / "input" / "营销活动配置表.xlsx")],
+    "parse-docx": ["--parse", str(project_root / "data" / "input" / "营销活动管理规范.docx")],
+}
+
+PROBE = """
+import contextlib, io, json, sys
+sys.path.insert(0, {root!r})
+sys.argv = ["main.py"] + {argv!r}
+with contextlib.redirect_stdout(io.StringIO()):
+    import main
+    if len(sys.argv) > 1:
+        try:
+            main.main()
+        except SystemExit:
+            pass
+print(json.dumps([m for m in {heavy!r} if m in sys.modules]))
+"""
+
+
+def run_mode(argv: list) -> tuple:
+    code = PROBE.format(root=str(project_root), argv=argv, heavy=HEAVY_MODULES)
+    env = {**os.environ, "EMBEDDING_BACKEND": os.environ.get("EMBEDDING_BACKEND", "hashing")}
+    start = time.perf_counter()
+    completed = subprocess.run([sys.executable, "-c", code], cwd=str(project_root), env=env,
+                               capture_output=True, text=True, check=True)
+    elapsed = time.perf_counter() - start
+    return elapsed, json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="命令行启动耗时基准测试")
+    parser.add_argument('--repeat', type=int, default=3, help='每种模式的运行次数（取最小值）')
+    parser.add_argument('--mode', nargs='+', choices=list(MODES), help='只测试指定模式')
+    args = parser.parse_args()
+
+    print(f"{'模式':<14} {'耗时':>8}  加载的重量级依赖")
+    for name in args.mode or MODES:
+        timings = []
+        loaded = []
+        for _ in range(max(1, args.repeat)):
+            elapsed, loaded = run_mode(MODES[name])
+            timings.append(elapsed)
+        print(f"  {name:<12} {min(timings):7.3f}s  {', '.join(loaded) or '-'}")
+
+
+if __name__ == "__main__":
+    main()
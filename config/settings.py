@@ -18,21 +18,124 @@ LLM_CONFIG = {
     "base_url": os.getenv("LLM_BASE_URL", "https://open.bigmodel.cn/api/paas/v4"),
     "temperature": 0.1,
     "max_tokens": 4096,
+    "max_concurrency": int(os.getenv("LLM_MAX_CONCURRENCY", "8")),
+    "requests_per_minute": int(os.getenv("LLM_REQUESTS_PER_MINUTE", "0")),
+    "tokens_per_minute": int(os.getenv("LLM_TOKENS_PER_MINUTE", "0")),
+    "max_retries": int(os.getenv("LLM_MAX_RETRIES", "3")),
+    "retry_base_delay": 0.5,
+    "retry_max_delay": 8.0,
+    "breaker_failure_threshold": 5,
+    "breaker_recovery_seconds": 30.0,
+    "single_flight": os.getenv("LLM_SINGLE_FLIGHT", "1") == "1",
+    "prompt_budgets": {
+        "default": 8000,
+        "rerank": 4000,
+        "answer": 3000,
+        "extract": 2500,
+    },
+    "endpoints": [
+        {"name": "primary"},
+        {
+            "name": "gateway",
+            "enabled": bool(os.getenv("LLM_FALLBACK_BASE_URL")),
+            "base_url": os.getenv("LLM_FALLBACK_BASE_URL"),
+            "api_key": os.getenv("LLM_FALLBACK_API_KEY"),
+            "model": os.getenv("LLM_FALLBACK_MODEL"),
+        },
+    ],
+    "hedge": os.getenv("LLM_HEDGE", "1") == "1",
+    "hedge_quantile": 0.95,
+    "hedge_min_samples": 5,
+    "hedge_default_delay": 2.0,
+    "hedge_min_delay": 0.05,
+    "endpoint_failure_threshold": 3,
 }
 
 EMBEDDING_CONFIG = {
+    "backend": os.getenv("EMBEDDING_BACKEND", "chroma"),
     "model": os.getenv("EMBEDDING_MODEL", "embedding-2"),
     "dimension": 1024,
+    "local_model": os.getenv("EMBEDDING_LOCAL_MODEL", "paraphrase-multilingual-MiniLM-L12-v2"),
+    "device": os.getenv("EMBEDDING_DEVICE", "cpu"),
+    "hashing_dimension": 256,
+    "batch_size": 64,
+    "max_batch_size": 256,
+    "max_workers": int(os.getenv("EMBEDDING_WORKERS", "4")),
 }
 
 VECTOR_STORE_CONFIG = {
     "type": "chromadb",
     "persist_directory": str(DATA_DIR / "vector_db"),
     "collection_name": "audit_knowledge",
+    "retain_versions": 2,
+    "delete_batch_size": 1000,
+}
+
+RULE_EXTRACTION_CONFIG = {
+    "extraction_method": os.getenv("RULE_EXTRACTION_METHOD", "pattern"),
+    "workers": int(os.getenv("RULE_EXTRACTION_WORKERS", "1")),
+    "chunk_size": 2000,
+    "llm_batch_tokens": 1500,
+    "llm_max_concurrency": 4,
+    "llm_cache_size": 100000,
+    "llm_cache_path": str(KNOWLEDGE_DIR / "llm_rule_cache.json"),
+    "llm_cache_save_interval": 60,
+    "near_duplicate_threshold": float(os.getenv("RULE_NEAR_DUPLICATE_THRESHOLD", "0.75")),
+}
+
+CHUNKING_CONFIG = {
+    "max_tokens": 400,
+    "overlap_tokens": 50,
+    "min_tokens": 80,
+    "table_max_tokens": 400,
+}
+
+CONTEXT_CONFIG = {
+    "compression": os.getenv("CONTEXT_COMPRESSION", "1") == "1",
+    "method": os.getenv("CONTEXT_COMPRESSION_METHOD", "lexical"),
+    "token_budget": int(os.getenv("CONTEXT_TOKEN_BUDGET", "600")),
+}
+
+INGESTION_CONFIG = {
+    "batch_size": int(os.getenv("INGESTION_BATCH_SIZE", "512")),
+    "max_pending": 8192,
+    "workers": int(os.getenv("INGESTION_WORKERS", "1")),
+}
+
+RULE_STORE_CONFIG = {
+    "path": str(KNOWLEDGE_DIR / "rules.db"),
 }
 
 AUDIT_CONFIG = {
     "risk_levels": ["高", "中", "低"],
     "max_audit_items": 1000,
     "similarity_threshold": 0.85,
+    "vectorized": os.getenv("AUDIT_VECTORIZED", "1") == "1",
+    "vector_block_elements": 1 << 22,
+    "partition": os.getenv("AUDIT_PARTITION", "1") == "1",
+    "workers": int(os.getenv("AUDIT_WORKERS", "1")),
+    "min_shard_size": 256,
+}
+
+CACHE_CONFIG = {
+    "rerank": {
+        "enabled": True,
+        "max_size": 10000,
+        "ttl": 7 * 24 * 3600,
+        "persist": os.getenv("RERANK_CACHE_PERSIST", "1") == "1",
+        "persist_path": str(KNOWLEDGE_DIR / "rerank_cache.json"),
+        "save_interval": 60,
+    },
+    "semantic": {
+        "enabled": True,
+        "max_size": 1000,
+        "ttl": 24 * 3600,
+    },
+    "llm": {
+        "enabled": os.getenv("LLM_CACHE", "1") == "1",
+        "bypass": os.getenv("LLM_CACHE_BYPASS", "0") == "1",
+        "path": str(KNOWLEDGE_DIR / "llm_response_cache.db"),
+        "max_bytes": int(os.getenv("LLM_CACHE_MAX_MB", "64")) * 1024 * 1024,
+        "touch_batch": 64,
+    },
 }
@@ -16,6 +16,7 @@
 
 import os
 import sys
+import time
 import argparse
 import json
 from pathlib import Path
@@ -145,7 +146,7 @@ def run_demo():
     return result
 
 
-def run_audit(policy_files: list, config_files: list):
+def run_audit(policy_files: list, config_files: list, workers: int = None):
     print(f"\n开始审计流程...")
     print(f"政策文件: {policy_files}")
     print(f"配置文件: {config_files}")
@@ -156,7 +157,7 @@ def run_audit(policy_files: list, config_files: list):
             print(f"错误: 文件不存在 - {f}")
             return None
     
-    result = multi_agent_system.run_audit(policy_files, config_files)
+    result = multi_agent_system.run_audit(policy_files, config_files, workers)
     
     print("\n【审计完成】")
     
@@ -164,6 +165,9 @@ def run_audit(policy_files: list, config_files: list):
     violations = audit_result.get('violations', [])
     
     print(f"总检查项: {audit_result.get('total_checks', 0)}")
+    if 'pairs_evaluated' in audit_result:
+        print(f"实际评估: {audit_result['pairs_evaluated']} (分区跳过 {audit_result['pairs_skipped']}, "
+              f"进程数 {audit_result.get('workers', 1)})")
     print(f"发现违规: {len(violations)}")
     
     if violations:
@@ -179,6 +183,11 @@ def run_audit(policy_files: list, config_files: list):
         for name, path in report_result['output_files'].items():
             print(f"  {name}: {path}")
     
+    llm_totals = result.get('llm_usage', {}).get('totals', {})
+    if llm_totals.get('calls'):
+        print(f"\nLLM调用: {llm_totals['calls']} 次, tokens: {llm_totals['total_tokens']}, "
+              f"耗时: {llm_totals['latency_seconds']:.2f}s")
+    
     return result
 
 
@@ -217,10 +226,30 @@ def parse_single_document(file_path: str):
 def query_knowledge(question: str):
     print(f"\n知识库查询: {question}")
     
-    result = knowledge_base.query(question)
+    start = time.perf_counter()
+    first_token_at = None
+    result = {}
     
     print("\n【查询结果】")
-    print(f"回答: {result.get('answer', '暂无回答')}")
+    print("回答: ", end="", flush=True)
+    for event in knowledge_base.query_stream(question):
+        if event["type"] == "token":
+            if first_token_at is None:
+                first_token_at = time.perf_counter() - start
+            print(event["text"], end="", flush=True)
+        elif event["type"] == "done":
+            result = event["result"]
+    print()
+    
+    if not result.get('answer'):
+        print("暂无回答")
+    if first_token_at is not None:
+        print(f"\n首字延迟: {first_token_at:.2f}s, 总耗时: {time.perf_counter() - start:.2f}s")
+    
+    compression = result.get('compression')
+    if compression and 'original_tokens' in compression:
+        print(f"\n上下文压缩: {compression['original_tokens']} -> {compression['compressed_tokens']} tokens "
+              f"(压缩比 {compression['compression_ratio']:.0%})")
     
     if result.get('context'):
         print(f"\n参考文档:")
@@ -230,6 +259,34 @@ def query_knowledge(question: str):
     return result
 
 
+def export_knowledge(file_path: str):
+    print(f"\n导出知识库快照: {file_path}")
+    
+    result = knowledge_base.export_snapshot(file_path)
+    
+    print(f"知识库版本: {result['kb_version']}")
+    print(f"规则数: {result['rule_count']}")
+    print(f"文档数: {result['document_count']}")
+    
+    return result
+
+
+def import_knowledge(file_path: str):
+    print(f"\n导入知识库快照: {file_path}")
+    
+    if not os.path.exists(file_path):
+        print(f"错误: 文件不存在 - {file_path}")
+        return None
+    
+    result = knowledge_base.import_snapshot(file_path)
+    
+    print(f"知识库版本: {result['kb_version']}")
+    print(f"规则数: {result['rule_count']}")
+    print(f"文档数: {result['document_count']}")
+    
+    return result
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="营销审计多智能体系统",
@@ -238,17 +295,23 @@ def main():
 示例:
   python main.py --demo                    # 运行演示模式
   python main.py --policy policy.docx --config config.xlsx  # 执行审计
+  python main.py --policy policy.docx --config config.xlsx --workers 8  # 多进程分片审计
   python main.py --parse document.docx     # 解析单个文档
   python main.py --query "优惠券金额限制"   # 知识库查询
+  python main.py --export-kb kb.json       # 导出知识库快照
+  python main.py --import-kb kb.json       # 导入知识库快照
         """
     )
     
     parser.add_argument('--demo', action='store_true', help='运行演示模式')
     parser.add_argument('--policy', nargs='+', help='政策文件路径')
     parser.add_argument('--config', nargs='+', help='配置文件路径')
+    parser.add_argument('--workers', type=int, help='审计进程数（0 表示使用全部CPU核心）')
     parser.add_argument('--parse', type=str, help='解析单个文档')
     parser.add_argument('--query', type=str, help='知识库查询')
     parser.add_argument('--status', action='store_true', help='显示系统状态')
+    parser.add_argument('--export-kb', type=str, help='导出知识库快照')
+    parser.add_argument('--import-kb', type=str, help='导入知识库快照')
     
     args = parser.parse_args()
     
@@ -258,7 +321,7 @@ def main():
         return run_demo()
     
     if args.policy and args.config:
-        return run_audit(args.policy, args.config)
+        return run_audit(args.policy, args.config, args.workers)
     
     if args.parse:
         return parse_single_document(args.parse)
@@ -266,6 +329,12 @@ def main():
     if args.query:
         return query_knowledge(args.query)
     
+    if args.export_kb:
+        return export_knowledge(args.export_kb)
+    
+    if args.import_kb:
+        return import_knowledge(args.import_kb)
+    
     if args.status:
         status = multi_agent_system.get_system_status()
         print("\n【系统状态】")
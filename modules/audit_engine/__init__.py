@@ -2,6 +2,9 @@ from typing import Dict, List, Any, Optional
 
 from .reasoning import ReasoningEngine, reasoning_engine
 from .comparator import Comparator, comparator
+from .vectorized import VectorizedEvaluator, vectorized_evaluator, iter_violations
+from .planner import AuditPlan, AuditPlanner, audit_planner, find_violations
+from .sharding import ShardedAuditor, audit_violations, assign_violation_ids
 from .agents import (
     BaseAgent, ParserAgent, KnowledgeAgent, 
     AuditAgent, ReportAgent,
@@ -20,7 +23,12 @@ class AuditEngine:
     
     def run_full_audit(self, 
                        policy_files: List[str], 
-                       config_files: List[str]) -> Dict[str, Any]:
+                       config_files: List[str],
+                       workers: Optional[int] = None) -> Dict[str, Any]:
+        from modules.knowledge_base.dedup import collapse_near_duplicates
+        from utils.llm_metrics import llm_metrics
+        
+        llm_since = llm_metrics.snapshot()
         parsed_policies = []
         for file_path in policy_files:
             result = self.parser_agent.execute({
@@ -41,7 +49,10 @@ class AuditEngine:
         
         all_rules = []
         for policy in parsed_policies:
-            all_rules.extend(policy.get("extracted_rules", []))
+            for rule in policy.get("extracted_rules", []):
+                rule["file_path"] = policy.get("file_path", "")
+                all_rules.append(rule)
+        all_rules = collapse_near_duplicates(all_rules)
         
         all_configs = []
         for config in parsed_configs:
@@ -58,7 +69,8 @@ class AuditEngine:
         audit_result = self.audit_agent.execute({
             "action": "audit",
             "rules": all_rules,
-            "configs": all_configs
+            "configs": all_configs,
+            "workers": workers
         })
         
         report = self.report_agent.execute({
@@ -69,14 +81,16 @@ class AuditEngine:
                 "config_files": config_files,
                 "total_rules": len(all_rules),
                 "total_configs": len(all_configs)
-            }
+            },
+            "llm_since": llm_since
         })
         
         return {
             "audit_result": audit_result,
             "report": report,
             "parsed_policies": parsed_policies,
-            "parsed_configs": parsed_configs
+            "parsed_configs": parsed_configs,
+            "llm_usage": llm_metrics.report(since=llm_since)
         }
     
     def quick_check(self, 
@@ -4,6 +4,7 @@ import json
 
 from .reasoning import ReasoningEngine, reasoning_engine
 from .comparator import Comparator, comparator
+from .sharding import audit_violations
 from utils.llm_client import llm_client
 
 
@@ -138,18 +139,18 @@ class AuditAgent(BaseAgent):
         configs = input_data.get("configs", [])
         
         violations = []
+        matches, plan_stats = audit_violations(rules, configs, self.reasoning_engine, input_data.get("workers"))
         
-        for rule in rules:
-            for config in configs:
-                reasoning_result = self.reasoning_engine.reason(rule, config)
-                
-                if reasoning_result.get("conclusion", {}).get("is_violation") == "是":
-                    violation = self._create_violation_record(rule, config, reasoning_result)
-                    violations.append(violation)
+        for violation_id, rule, config, reasoning_result in matches:
+            violation = self._create_violation_record(rule, config, reasoning_result, violation_id)
+            violations.append(violation)
         
         result = {
             "status": "success",
             "total_checks": len(rules) * len(configs),
+            "pairs_evaluated": plan_stats["pairs_evaluated"],
+            "pairs_skipped": plan_stats["pairs_skipped"],
+            "workers": plan_stats["workers"],
             "violations_found": len(violations),
             "violations": violations
         }
@@ -182,11 +183,12 @@ class AuditAgent(BaseAgent):
     def _create_violation_record(self, 
                                   rule: Dict[str, Any], 
                                   config: Dict[str, Any],
-                                  reasoning: Dict[str, Any]) -> Dict[str, Any]:
+                                  reasoning: Dict[str, Any],
+                                  violation_id: Optional[str] = None) -> Dict[str, Any]:
         conclusion = reasoning.get("conclusion", {})
         
         return {
-            "violation_id": f"VIO_{len(self.memory) + 1}",
+            "violation_id": violation_id or f"VIO_{len(self.memory) + 1}",
             "title": self._generate_violation_title(rule, config),
             "risk_level": conclusion.get("risk_level", "中"),
             "description": conclusion.get("description", ""),
@@ -0,0 +1,161 @@
+from typing import Dict, List, Any, Optional, Tuple
+
+from config.settings import AUDIT_CONFIG
+from modules.document_parser.xlsx_parser import XlsxParser
+from utils.compiled_rule import compile_rule, FIELD_CATEGORY_KEYS, SCOPE_NEW_USER, SCOPE_ONLINE_ONLY
+from .reasoning import ReasoningEngine, config_fields
+from .vectorized import OPERATOR_CODES, iter_violation_indices
+
+
+FIELD_HINTS = {
+    "金额": FIELD_CATEGORY_KEYS["金额"] + ["价格", "面额", "元"],
+    "预算": FIELD_CATEGORY_KEYS["预算"],
+    "次数": FIELD_CATEGORY_KEYS["次数"] + ["限领", "限制"],
+    "天数": FIELD_CATEGORY_KEYS["天数"] + ["有效期", "天"],
+}
+
+CONFIG_TYPE_COMPATIBILITY = {
+    "金额": {"coupon_config", "promotion_config", "price_config"},
+    "比例": {"coupon_config", "promotion_config", "price_config"},
+    "数量": {"coupon_config", "promotion_config", "user_config"},
+    "时间": {"coupon_config", "promotion_config", "user_config"},
+    "范围": {"coupon_config", "promotion_config", "user_config"},
+}
+
+UNKNOWN_CONFIG_TYPE = "unknown_config"
+
+RuleSignature = Tuple[str, Tuple[str, ...], bool, bool, bool]
+ConfigSignature = Tuple[str, frozenset, bool, bool, bool]
+
+
+class AuditPlan:
+    def __init__(self,
+                 partitions: List[Tuple[List[int], List[int]]],
+                 total_pairs: int,
+                 rule_groups: int,
+                 config_groups: int):
+        self.partitions = partitions
+        self.total_pairs = total_pairs
+        self.rule_groups = rule_groups
+        self.config_groups = config_groups
+
+    @property
+    def pairs_evaluated(self) -> int:
+        return sum(len(rules) * len(configs) for rules, configs in self.partitions)
+
+    @property
+    def pairs_skipped(self) -> int:
+        return self.total_pairs - self.pairs_evaluated
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pairs_total": self.total_pairs,
+            "pairs_evaluated": self.pairs_evaluated,
+            "pairs_skipped": self.pairs_skipped,
+            "rule_groups": self.rule_groups,
+            "config_groups": self.config_groups,
+            "partitions": len(self.partitions)
+        }
+
+
+class AuditPlanner:
+    def __init__(self):
+        self.xlsx_parser = XlsxParser()
+
+    def rule_signature(self, rule: Dict[str, Any]) -> RuleSignature:
+        compiled = compile_rule(rule)
+        return (
+            rule.get("constraint_type") or compiled.constraint_type,
+            compiled.field_categories,
+            compiled.threshold is not None and compiled.operator in OPERATOR_CODES,
+            compiled.checks_scope and SCOPE_NEW_USER in compiled.scope_tokens,
+            compiled.checks_scope and SCOPE_ONLINE_ONLY in compiled.scope_tokens
+        )
+
+    def config_signature(self, config: Dict[str, Any]) -> ConfigSignature:
+        fields = config_fields(config)
+        keys = []
+        has_numeric = False
+        for key, value in fields.items():
+            keys.append(str(key).lower())
+            if isinstance(value, (int, float)):
+                has_numeric = True
+            elif isinstance(value, dict):
+                keys.extend(str(k).lower() for k in value)
+                has_numeric = has_numeric or any(isinstance(v, (int, float)) for v in value.values())
+
+        categories = frozenset(
+            category for category, hints in FIELD_HINTS.items()
+            if any(hint in key for key in keys for hint in hints)
+        )
+        return (
+            config.get("config_type") or self.xlsx_parser._detect_config_type(fields),
+            categories,
+            has_numeric,
+            bool(fields.get("target_users", fields.get("发放对象", ""))),
+            bool(fields.get("scope", fields.get("活动渠道", [])))
+        )
+
+    def compatible(self, rule: RuleSignature, config: ConfigSignature) -> bool:
+        constraint_type, fields, numeric, new_user, online_only = rule
+        config_type, categories, has_numeric, has_target, has_scope = config
+
+        allowed = CONFIG_TYPE_COMPATIBILITY.get(constraint_type)
+        if allowed is not None and config_type != UNKNOWN_CONFIG_TYPE and config_type not in allowed:
+            return False
+        if (new_user and has_target) or (online_only and has_scope):
+            return True
+        if not numeric or not has_numeric:
+            return False
+        return not fields or bool(categories.intersection(fields))
+
+    def plan(self, rules: List[Dict[str, Any]], configs: List[Dict[str, Any]]) -> AuditPlan:
+        rule_groups: Dict[RuleSignature, List[int]] = {}
+        for i, rule in enumerate(rules):
+            rule_groups.setdefault(self.rule_signature(rule), []).append(i)
+
+        config_groups: Dict[ConfigSignature, List[int]] = {}
+        for j, config in enumerate(configs):
+            config_groups.setdefault(self.config_signature(config), []).append(j)
+
+        partitions = []
+        for rule_sig, rule_indices in rule_groups.items():
+            config_indices = sorted(
+                j for config_sig, indices in config_groups.items()
+                if self.compatible(rule_sig, config_sig) for j in indices
+            )
+            if config_indices:
+                partitions.append((rule_indices, config_indices))
+
+        return AuditPlan(partitions, len(rules) * len(configs), len(rule_groups), len(config_groups))
+
+
+def find_violations(rules: List[Dict[str, Any]],
+                    configs: List[Dict[str, Any]],
+                    engine: Optional[ReasoningEngine] = None) -> Tuple[List[Tuple[Dict[str, Any], Dict[str, Any], Dict[str, Any]]], Dict[str, Any]]:
+    found, stats = find_violation_indices(rules, configs, engine)
+    return [(rules[i], configs[j], reasoning) for i, j, reasoning in found], stats
+
+
+def find_violation_indices(rules: List[Dict[str, Any]],
+                           configs: List[Dict[str, Any]],
+                           engine: Optional[ReasoningEngine] = None) -> Tuple[List[Tuple[int, int, Dict[str, Any]]], Dict[str, Any]]:
+    if not AUDIT_CONFIG.get("partition", True):
+        total = len(rules) * len(configs)
+        return list(iter_violation_indices(rules, configs, engine)), {
+            "pairs_total": total, "pairs_evaluated": total, "pairs_skipped": 0
+        }
+
+    plan = audit_planner.plan(rules, configs)
+    found = []
+    for rule_indices, config_indices in plan.partitions:
+        sub_rules = [rules[i] for i in rule_indices]
+        sub_configs = [configs[j] for j in config_indices]
+        for i, j, reasoning in iter_violation_indices(sub_rules, sub_configs, engine):
+            found.append((rule_indices[i], config_indices[j], reasoning))
+
+    found.sort(key=lambda match: match[:2])
+    return found, plan.stats()
+
+
+audit_planner = AuditPlanner()
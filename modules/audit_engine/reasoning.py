@@ -2,6 +2,17 @@ from typing import Dict, List, Any, Optional
 import json
 import re
 
+from utils.keyword_matcher import policy_classifier
+from utils.compiled_rule import (
+    CompiledRule, compile_rule, parse_threshold,
+    FIELD_CATEGORY_KEYS, SCOPE_NEW_USER, SCOPE_ONLINE_ONLY
+)
+
+
+def config_fields(config: Dict[str, Any]) -> Dict[str, Any]:
+    fields = config.get("config_data") if config else None
+    return fields if isinstance(fields, dict) else config
+
 
 class ReasoningEngine:
     def __init__(self):
@@ -20,12 +31,16 @@ class ReasoningEngine:
         }
     
     def _quick_reason(self, rule: Dict[str, Any], config: Dict[str, Any]) -> Dict[str, Any]:
-        rule_text = rule.get("source_text", rule.get("content", ""))
-        rule_type = rule.get("rule_type", "")
-        
-        rule_value = self._extract_numeric_value(rule_text)
-        config_value = self._extract_config_value(config, rule_text)
-        operator = self._extract_operator(rule_text)
+        return self.evaluate(compile_rule(rule), config)
+    
+    def compile_rule(self, rule: Dict[str, Any]) -> CompiledRule:
+        return compile_rule(rule)
+    
+    def evaluate(self, compiled: CompiledRule, config: Dict[str, Any]) -> Dict[str, Any]:
+        config = config_fields(config)
+        rule_value = compiled.threshold
+        config_value = self._lookup_config_value(config, compiled.field_categories)
+        operator = compiled.operator
         
         is_violation = False
         risk_level = "低"
@@ -34,19 +49,19 @@ class ReasoningEngine:
         if rule_value is not None and config_value is not None:
             if operator == "<=" and config_value > rule_value:
                 is_violation = True
-                risk_level = "高" if (config_value - rule_value) / rule_value > 0.2 else "中"
+                risk_level = self._deviation_risk(config_value - rule_value, rule_value)
                 description = f"配置值 {config_value} 超过规则上限 {rule_value}"
             elif operator == ">=" and config_value < rule_value:
                 is_violation = True
-                risk_level = "高" if (rule_value - config_value) / rule_value > 0.2 else "中"
+                risk_level = self._deviation_risk(rule_value - config_value, rule_value)
                 description = f"配置值 {config_value} 低于规则下限 {rule_value}"
             elif operator == "==" and config_value != rule_value:
                 is_violation = True
                 risk_level = "中"
                 description = f"配置值 {config_value} 不等于规则要求 {rule_value}"
         
-        if "仅限" in rule_text or "禁止" in rule_text:
-            scope_violation = self._check_scope_violation(rule_text, config)
+        if compiled.checks_scope:
+            scope_violation = self._check_compiled_scope(compiled, config)
             if scope_violation:
                 is_violation = True
                 risk_level = "中"
@@ -54,54 +69,39 @@ class ReasoningEngine:
         
         return {
             "is_violation": "是" if is_violation else "否",
-            "violation_type": rule_type if is_violation else "无违规",
+            "violation_type": compiled.rule_type if is_violation else "无违规",
             "risk_level": risk_level,
             "description": description if is_violation else "配置符合规则要求",
-            "evidence": rule_text,
+            "evidence": compiled.source_text,
             "confidence": 0.9 if is_violation else 1.0
         }
     
+    def _deviation_risk(self, deviation: float, rule_value: float) -> str:
+        if rule_value == 0:
+            return "高"
+        return "高" if deviation / rule_value > 0.2 else "中"
+    
     def _extract_numeric_value(self, text: str) -> Optional[float]:
-        if not text:
-            return None
-        
-        patterns = [
-            r'(\d+(?:\.\d+)?)\s*(?:万)?(?:元|%)?',
-            r'(\d+(?:\.\d+)?)\s*万',
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, str(text))
-            if match:
-                value = float(match.group(1))
-                if '万' in str(text):
-                    value *= 10000
-                return value
-        return None
+        return parse_threshold(text)
     
     def _extract_config_value(self, config: Dict[str, Any], rule_text: str) -> Optional[float]:
+        return self._lookup_config_value(config, CompiledRule.from_text(rule_text).field_categories)
+    
+    def _lookup_config_value(self, config: Dict[str, Any], field_categories) -> Optional[float]:
         if not config:
             return None
         
-        keywords = {
-            "金额": ["金额", "amount", "max_amount", "price"],
-            "预算": ["预算", "budget", "total_budget"],
-            "次数": ["次数", "limit", "monthly_limit"],
-            "天数": ["天数", "days", "validity_days"],
-        }
-        
-        for category, keys in keywords.items():
-            if category in rule_text:
-                for key in keys:
-                    if key in config:
-                        val = config[key]
+        for category in field_categories:
+            for key in FIELD_CATEGORY_KEYS[category]:
+                if key in config:
+                    val = config[key]
+                    if isinstance(val, (int, float)):
+                        return float(val)
+                for k, v in config.items():
+                    if isinstance(v, dict) and key in v:
+                        val = v[key]
                         if isinstance(val, (int, float)):
                             return float(val)
-                    for k, v in config.items():
-                        if isinstance(v, dict) and key in v:
-                            val = v[key]
-                            if isinstance(val, (int, float)):
-                                return float(val)
         
         for key, value in config.items():
             if isinstance(value, (int, float)):
@@ -114,22 +114,18 @@ class ReasoningEngine:
         return None
     
     def _extract_operator(self, text: str) -> str:
-        if any(kw in text for kw in ["不超过", "不大于", "上限", "最高", "不得超过"]):
-            return "<="
-        elif any(kw in text for kw in ["不低于", "不小于", "下限", "最低", "不得少于"]):
-            return ">="
-        elif any(kw in text for kw in ["等于", "为", "是"]):
-            return "=="
-        else:
-            return "<="
+        return policy_classifier.operator(policy_classifier.scan(text))
     
     def _check_scope_violation(self, rule_text: str, config: Dict[str, Any]) -> str:
-        if "新注册用户" in rule_text or "新用户" in rule_text:
+        return self._check_compiled_scope(CompiledRule.from_text(rule_text), config)
+    
+    def _check_compiled_scope(self, compiled: CompiledRule, config: Dict[str, Any]) -> str:
+        if SCOPE_NEW_USER in compiled.scope_tokens:
             target = config.get("target_users", config.get("发放对象", ""))
             if target and "新" not in str(target):
                 return f"发放对象 '{target}' 不符合规则要求 '新注册用户'"
         
-        if "线上" in rule_text and "仅限" in rule_text:
+        if SCOPE_ONLINE_ONLY in compiled.scope_tokens:
             scope = config.get("scope", config.get("活动渠道", []))
             if scope and "线下" in str(scope):
                 return f"活动范围包含线下渠道，不符合规则要求 '仅限线上'"
@@ -0,0 +1,116 @@
+from typing import Dict, List, Any, Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor
+import json
+import math
+import os
+
+from config.settings import AUDIT_CONFIG
+from utils.helpers import generate_id
+from .reasoning import ReasoningEngine, reasoning_engine
+from .planner import find_violation_indices
+
+
+PAIR_STATS = ("pairs_total", "pairs_evaluated", "pairs_skipped")
+ECHO_KEYS = ("policy_rule", "config_data")
+
+_worker_rules: List[Dict[str, Any]] = []
+
+
+def _init_worker(rules: List[Dict[str, Any]]) -> None:
+    global _worker_rules
+    _worker_rules = rules
+
+
+def _audit_shard(offset: int, configs: List[Dict[str, Any]]) -> Tuple[List[Tuple[int, int, Dict[str, Any]]], Dict[str, Any]]:
+    found, stats = find_violation_indices(_worker_rules, configs)
+    keys = violation_keys(found, _worker_rules, configs)
+    return [(i, offset + j, key, {k: v for k, v in reasoning.items() if k not in ECHO_KEYS})
+            for (i, j, reasoning), key in zip(found, keys)], {key: stats[key] for key in PAIR_STATS}
+
+
+def _rule_key(rule: Dict[str, Any]) -> str:
+    return rule.get("rule_id") or str(rule.get("source_text", rule.get("content", "")))
+
+
+def _config_key(config: Dict[str, Any]) -> str:
+    return json.dumps(config, ensure_ascii=False, sort_keys=True, default=str)
+
+
+def violation_key(rule: Dict[str, Any], config: Dict[str, Any]) -> str:
+    return generate_id(f"{_rule_key(rule)}|{_config_key(config)}")
+
+
+def violation_keys(found: List[Tuple[int, int, Dict[str, Any]]],
+                   rules: List[Dict[str, Any]],
+                   configs: List[Dict[str, Any]]) -> List[str]:
+    rule_keys: Dict[int, str] = {}
+    config_keys: Dict[int, str] = {}
+    keys = []
+    for i, j, _ in found:
+        if i not in rule_keys:
+            rule_keys[i] = _rule_key(rules[i])
+        if j not in config_keys:
+            config_keys[j] = _config_key(configs[j])
+        keys.append(generate_id(f"{rule_keys[i]}|{config_keys[j]}"))
+    return keys
+
+
+def assign_violation_ids(keys: List[str]) -> List[str]:
+    ids = []
+    seen: Dict[str, int] = {}
+    for key in keys:
+        seen[key] = seen.get(key, 0) + 1
+        ids.append(f"VIO_{key}" if seen[key] == 1 else f"VIO_{key}_{seen[key]}")
+    return ids
+
+
+class ShardedAuditor:
+    def __init__(self, workers: Optional[int] = None, min_shard_size: Optional[int] = None):
+        workers = AUDIT_CONFIG.get("workers", 1) if workers is None else workers
+        self.workers = workers if workers > 0 else os.cpu_count() or 1
+        self.min_shard_size = max(1, min_shard_size or AUDIT_CONFIG.get("min_shard_size", 256))
+
+    def shards(self, configs: List[Dict[str, Any]]) -> List[Tuple[int, List[Dict[str, Any]]]]:
+        size = max(self.min_shard_size, math.ceil(len(configs) / (self.workers * 4)))
+        return [(offset, configs[offset:offset + size]) for offset in range(0, len(configs), size)]
+
+    def find_violation_indices(self,
+                               rules: List[Dict[str, Any]],
+                               configs: List[Dict[str, Any]],
+                               engine: Optional[ReasoningEngine] = None) -> Tuple[List[Tuple[int, int, str, Dict[str, Any]]], Dict[str, Any]]:
+        shards = self.shards(configs)
+        workers = min(self.workers, len(shards))
+        if workers <= 1 or engine not in (None, reasoning_engine):
+            found, stats = find_violation_indices(rules, configs, engine)
+            keys = violation_keys(found, rules, configs)
+            found = [(i, j, key, reasoning) for (i, j, reasoning), key in zip(found, keys)]
+            return found, dict({key: stats[key] for key in PAIR_STATS}, workers=1, shards=1)
+
+        found = []
+        stats = {key: 0 for key in PAIR_STATS}
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(rules,)) as executor:
+            futures = [executor.submit(_audit_shard, offset, shard) for offset, shard in shards]
+            for future in futures:
+                shard_found, shard_stats = future.result()
+                found.extend((i, j, key, {"policy_rule": rules[i], "config_data": configs[j], **reasoning})
+                             for i, j, key, reasoning in shard_found)
+                for key in PAIR_STATS:
+                    stats[key] += shard_stats[key]
+
+        found.sort(key=lambda match: match[:2])
+        return found, dict(stats, workers=workers, shards=len(shards))
+
+    def audit(self,
+              rules: List[Dict[str, Any]],
+              configs: List[Dict[str, Any]],
+              engine: Optional[ReasoningEngine] = None) -> Tuple[List[Tuple[str, Dict[str, Any], Dict[str, Any], Dict[str, Any]]], Dict[str, Any]]:
+        found, stats = self.find_violation_indices(rules, configs, engine)
+        ids = assign_violation_ids([key for _, _, key, _ in found])
+        return [(vid, rules[i], configs[j], reasoning) for vid, (i, j, _, reasoning) in zip(ids, found)], stats
+
+
+def audit_violations(rules: List[Dict[str, Any]],
+                     configs: List[Dict[str, Any]],
+                     engine: Optional[ReasoningEngine] = None,
+                     workers: Optional[int] = None) -> Tuple[List[Tuple[str, Dict[str, Any], Dict[str, Any], Dict[str, Any]]], Dict[str, Any]]:
+    return ShardedAuditor(workers).audit(rules, configs, engine)
@@ -0,0 +1,147 @@
+from typing import Dict, List, Any, Optional, Tuple, Iterator
+
+import numpy as np
+
+from config.settings import AUDIT_CONFIG
+from utils.compiled_rule import compile_rule, SCOPE_NEW_USER, SCOPE_ONLINE_ONLY
+from .reasoning import ReasoningEngine, reasoning_engine, config_fields
+
+
+OP_NONE, OP_LE, OP_GE, OP_EQ = 0, 1, 2, 3
+OPERATOR_CODES = {"<=": OP_LE, ">=": OP_GE, "==": OP_EQ}
+
+
+class RuleMatrix:
+    def __init__(self, rules: List[Dict[str, Any]]):
+        compiled = [compile_rule(rule) for rule in rules]
+        self.rules = rules
+        self.field_keys: List[Tuple[str, ...]] = []
+        key_index: Dict[Tuple[str, ...], int] = {}
+
+        size = len(compiled)
+        self.field = np.zeros(size, dtype=np.int32)
+        self.operator = np.zeros(size, dtype=np.int8)
+        self.threshold = np.zeros(size, dtype=np.float64)
+        self.has_threshold = np.zeros(size, dtype=bool)
+        self.new_user = np.zeros(size, dtype=bool)
+        self.online_only = np.zeros(size, dtype=bool)
+
+        for i, rule in enumerate(compiled):
+            key = rule.field_categories
+            if key not in key_index:
+                key_index[key] = len(self.field_keys)
+                self.field_keys.append(key)
+            self.field[i] = key_index[key]
+            self.operator[i] = OPERATOR_CODES.get(rule.operator, OP_NONE)
+            if rule.threshold is not None:
+                self.threshold[i] = rule.threshold
+                self.has_threshold[i] = True
+            if rule.checks_scope:
+                self.new_user[i] = SCOPE_NEW_USER in rule.scope_tokens
+                self.online_only[i] = SCOPE_ONLINE_ONLY in rule.scope_tokens
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+
+class ConfigColumns:
+    def __init__(self,
+                 configs: List[Dict[str, Any]],
+                 field_keys: List[Tuple[str, ...]],
+                 engine: ReasoningEngine):
+        size = len(configs)
+        self.values = np.zeros((len(field_keys), size), dtype=np.float64)
+        self.present = np.zeros((len(field_keys), size), dtype=bool)
+        self.new_user_violation = np.zeros(size, dtype=bool)
+        self.online_violation = np.zeros(size, dtype=bool)
+
+        for j, config in enumerate(configs):
+            config = config_fields(config)
+            for k, key in enumerate(field_keys):
+                value = engine._lookup_config_value(config, key)
+                if value is not None:
+                    self.values[k, j] = value
+                    self.present[k, j] = True
+
+            target = config.get("target_users", config.get("发放对象", ""))
+            self.new_user_violation[j] = bool(target) and "新" not in str(target)
+            scope = config.get("scope", config.get("活动渠道", []))
+            self.online_violation[j] = bool(scope) and "线下" in str(scope)
+
+
+class VectorizedEvaluator:
+    def __init__(self, engine: Optional[ReasoningEngine] = None, block_elements: int = 1 << 22):
+        self.engine = engine or reasoning_engine
+        self.block_elements = max(1, block_elements)
+
+    def violation_mask(self, rules: RuleMatrix, columns: ConfigColumns,
+                       start: int, stop: int) -> np.ndarray:
+        field = rules.field[start:stop]
+        values = columns.values[field]
+        present = columns.present[field]
+        threshold = rules.threshold[start:stop, None]
+        operator = rules.operator[start:stop, None]
+
+        numeric = (((operator == OP_LE) & (values > threshold)) |
+                   ((operator == OP_GE) & (values < threshold)) |
+                   ((operator == OP_EQ) & (values != threshold)))
+        numeric &= present & rules.has_threshold[start:stop, None]
+
+        scope = ((rules.new_user[start:stop, None] & columns.new_user_violation[None, :]) |
+                 (rules.online_only[start:stop, None] & columns.online_violation[None, :]))
+        return numeric | scope
+
+    def iter_violations(self,
+                        rules: List[Dict[str, Any]],
+                        configs: List[Dict[str, Any]]) -> Iterator[Tuple[Dict[str, Any], Dict[str, Any], Dict[str, Any]]]:
+        for i, j, reasoning in self.iter_violation_indices(rules, configs):
+            yield rules[i], configs[j], reasoning
+
+    def iter_violation_indices(self,
+                               rules: List[Dict[str, Any]],
+                               configs: List[Dict[str, Any]]) -> Iterator[Tuple[int, int, Dict[str, Any]]]:
+        if not rules or not configs:
+            return
+
+        matrix = RuleMatrix(rules)
+        columns = ConfigColumns(configs, matrix.field_keys, self.engine)
+        block = max(1, self.block_elements // len(configs))
+
+        for start in range(0, len(matrix), block):
+            stop = min(start + block, len(matrix))
+            rule_idx, config_idx = np.nonzero(self.violation_mask(matrix, columns, start, stop))
+            for i, j in zip(rule_idx.tolist(), config_idx.tolist()):
+                reasoning = self.engine.reason(rules[start + i], configs[j])
+                if reasoning["conclusion"]["is_violation"] == "是":
+                    yield start + i, j, reasoning
+
+    def find_violations(self,
+                        rules: List[Dict[str, Any]],
+                        configs: List[Dict[str, Any]]) -> List[Tuple[Dict[str, Any], Dict[str, Any], Dict[str, Any]]]:
+        return list(self.iter_violations(rules, configs))
+
+
+def iter_violations(rules: List[Dict[str, Any]],
+                    configs: List[Dict[str, Any]],
+                    engine: Optional[ReasoningEngine] = None) -> Iterator[Tuple[Dict[str, Any], Dict[str, Any], Dict[str, Any]]]:
+    for i, j, reasoning in iter_violation_indices(rules, configs, engine):
+        yield rules[i], configs[j], reasoning
+
+
+def iter_violation_indices(rules: List[Dict[str, Any]],
+                           configs: List[Dict[str, Any]],
+                           engine: Optional[ReasoningEngine] = None) -> Iterator[Tuple[int, int, Dict[str, Any]]]:
+    engine = engine or reasoning_engine
+    if AUDIT_CONFIG.get("vectorized", True):
+        block_elements = AUDIT_CONFIG.get("vector_block_elements", 1 << 22)
+        yield from VectorizedEvaluator(engine, block_elements).iter_violation_indices(rules, configs)
+        return
+
+    for i, rule in enumerate(rules):
+        for j, config in enumerate(configs):
+            reasoning = engine.reason(rule, config)
+            if reasoning.get("conclusion", {}).get("is_violation") == "是":
+                yield i, j, reasoning
+
+
+vectorized_evaluator = VectorizedEvaluator(block_elements=AUDIT_CONFIG.get("vector_block_elements", 1 << 22))
@@ -4,6 +4,7 @@ from pathlib import Path
 from .docx_parser import DocxParser
 from .xlsx_parser import XlsxParser
 from .table_reconstructor import TableReconstructor
+from utils.keyword_matcher import policy_classifier
 
 
 class DocumentParser:
@@ -88,11 +89,7 @@ class DocumentParser:
         return rules
     
     def _contains_rule(self, text: str) -> bool:
-        rule_keywords = [
-            "应当", "必须", "不得", "禁止", "要求", "规定",
-            "限额", "上限", "下限", "范围", "条件", "标准"
-        ]
-        return any(kw in text for kw in rule_keywords)
+        return policy_classifier.contains_document_rule(policy_classifier.scan(text))
     
     def extract_business_config(self, parsed_doc: Dict[str, Any]) -> List[Dict[str, Any]]:
         return self.xlsx_parser.extract_business_config(parsed_doc)
@@ -1,9 +1,11 @@
 import re
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, TYPE_CHECKING
 from pathlib import Path
-from docx import Document
-from docx.table import Table
-from docx.text.paragraph import Paragraph
+
+if TYPE_CHECKING:
+    from docx.document import Document
+    from docx.table import Table
+    from docx.text.paragraph import Paragraph
 
 
 class DocxParser:
@@ -12,6 +14,8 @@ class DocxParser:
         self.sections = {}
     
     def parse(self, filepath: str) -> Dict[str, Any]:
+        from docx import Document
+        
         doc = Document(filepath)
         result = {
             "metadata": self._extract_metadata(doc),
@@ -22,7 +26,7 @@ class DocxParser:
         }
         return result
     
-    def _extract_metadata(self, doc: Document) -> Dict[str, Any]:
+    def _extract_metadata(self, doc: "Document") -> Dict[str, Any]:
         metadata = {
             "title": "",
             "author": "",
@@ -51,7 +55,7 @@ class DocxParser:
         
         return metadata
     
-    def _extract_content(self, doc: Document) -> List[Dict[str, Any]]:
+    def _extract_content(self, doc: "Document") -> List[Dict[str, Any]]:
         content = []
         current_section = "正文"
         
@@ -76,7 +80,7 @@ class DocxParser:
         
         return content
     
-    def _is_heading(self, para: Paragraph) -> bool:
+    def _is_heading(self, para: "Paragraph") -> bool:
         if not para.style:
             return False
         style_name = para.style.name.lower()
@@ -95,14 +99,14 @@ class DocxParser:
                 return True
         return False
     
-    def _extract_tables(self, doc: Document) -> List[Dict[str, Any]]:
+    def _extract_tables(self, doc: "Document") -> List[Dict[str, Any]]:
         tables = []
         for i, table in enumerate(doc.tables):
             table_data = self._parse_table(table, i)
             tables.append(table_data)
         return tables
     
-    def _parse_table(self, table: Table, table_index: int) -> Dict[str, Any]:
+    def _parse_table(self, table: "Table", table_index: int) -> Dict[str, Any]:
         rows_data = []
         merged_cells = []
         
@@ -147,7 +151,7 @@ class DocxParser:
         
         return "\n".join(lines)
     
-    def _analyze_structure(self, doc: Document) -> Dict[str, Any]:
+    def _analyze_structure(self, doc: "Document") -> Dict[str, Any]:
         structure = {
             "sections": [],
             "outline": []
@@ -165,7 +169,7 @@ class DocxParser:
         
         return structure
     
-    def _get_heading_level(self, para: Paragraph) -> int:
+    def _get_heading_level(self, para: "Paragraph") -> int:
         if not para.style:
             return 1
         style_name = para.style.name
@@ -175,7 +179,7 @@ class DocxParser:
                 return int(match.group())
         return 1
     
-    def _get_raw_text(self, doc: Document) -> str:
+    def _get_raw_text(self, doc: "Document") -> str:
         return "\n".join(para.text for para in doc.paragraphs if para.text.strip())
     
     def to_json_format(self, parsed_data: Dict[str, Any]) -> Dict[str, Any]:
@@ -198,7 +202,7 @@ class DocxParser:
                 {
                     "index": t["table_index"],
                     "headers": t["headers"],
-                    "data": t["rows"],
+                    "data": t["rows"][1:],
                     "markdown": t["markdown"]
                 }
                 for t in parsed_data["tables"]
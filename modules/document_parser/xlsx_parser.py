@@ -1,6 +1,8 @@
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, TYPE_CHECKING
 from pathlib import Path
-import pandas as pd
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 
 class XlsxParser:
@@ -27,6 +29,8 @@ class XlsxParser:
             "summary": {}
         }
         
+        import pandas as pd
+        
         excel_file = pd.ExcelFile(filepath)
         sheets_to_parse = [sheet_name] if sheet_name else excel_file.sheet_names
         
@@ -39,6 +43,8 @@ class XlsxParser:
         return result
     
     def _parse_csv(self, filepath: Path) -> Dict[str, Any]:
+        import pandas as pd
+        
         df = pd.read_csv(filepath)
         
         return {
@@ -53,7 +59,7 @@ class XlsxParser:
             "summary": self._generate_summary({"data": self._parse_dataframe(df, "data")})
         }
     
-    def _parse_dataframe(self, df: pd.DataFrame, sheet_name: str) -> Dict[str, Any]:
+    def _parse_dataframe(self, df: "pd.DataFrame", sheet_name: str) -> Dict[str, Any]:
         df = df.fillna('')
         
         columns = df.columns.tolist()
@@ -80,7 +86,7 @@ class XlsxParser:
             "markdown": self._to_markdown(df)
         }
     
-    def _to_markdown(self, df: pd.DataFrame, max_rows: int = 50) -> str:
+    def _to_markdown(self, df: "pd.DataFrame", max_rows: int = 50) -> str:
         df_display = df.head(max_rows)
         
         lines = []
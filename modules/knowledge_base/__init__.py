@@ -1,22 +1,44 @@
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Iterator
 
+from utils.llm_client import llm_client
+
+from .embeddings import Embedder, create_embedder
 from .vector_store import VectorStore, vector_store
 from .rule_extractor import RuleExtractor, rule_extractor
-from .rag_engine import RAGEngine, rag_engine
+from .rule_store import RuleStore
+from .rule_index import RuleIndex
+from .semantic_cache import SemanticCache
+from .dedup import NearDuplicateDetector, collapse_near_duplicates
+from .ingestion import BulkIngestor
+from .chunker import PolicyChunker, policy_chunker
+from .context_compressor import ContextCompressor, context_compressor
+from .rag_engine import RAGEngine, KnowledgeBuild, rag_engine
 
 
 class KnowledgeBase:
     def __init__(self):
         self.rag_engine = rag_engine
-        self.vector_store = vector_store
         self.rule_extractor = rule_extractor
     
-    def build_from_documents(self, documents: List[Dict[str, Any]]) -> None:
-        self.rag_engine.build_knowledge_base(documents)
+    @property
+    def vector_store(self) -> VectorStore:
+        return self.rag_engine.vector_store
+    
+    def build_from_documents(self,
+                             documents: List[Dict[str, Any]],
+                             bulk: bool = False,
+                             workers: Optional[int] = None) -> None:
+        self.rag_engine.build_knowledge_base(documents, bulk, workers)
+    
+    def rebuild_from_documents(self, documents: List[Dict[str, Any]], background: bool = False):
+        return self.rag_engine.rebuild_knowledge_base(documents, background)
     
     def query(self, question: str, n_context: int = 3) -> Dict[str, Any]:
         return self.rag_engine.query(question, n_context)
     
+    def query_stream(self, question: str, n_context: int = 3) -> Iterator[Dict[str, Any]]:
+        return self.rag_engine.query_stream(question, n_context)
+    
     def retrieve_rules(self, query: str, n_results: int = 10) -> List[Dict[str, Any]]:
         return self.rag_engine.retrieve(query, n_results)
     
@@ -29,10 +51,21 @@ class KnowledgeBase:
     def get_all_rules(self) -> List[Dict[str, Any]]:
         return self.rag_engine.get_all_rules()
     
+    def export_snapshot(self, filepath: str) -> Dict[str, Any]:
+        return self.rag_engine.export_snapshot(filepath)
+    
+    def import_snapshot(self, filepath: str) -> Dict[str, Any]:
+        return self.rag_engine.import_snapshot(filepath)
+    
     def get_statistics(self) -> Dict[str, Any]:
         return {
             "total_documents": self.vector_store.get_count(),
-            "total_rules": len(self.get_all_rules())
+            "total_rules": len(self.get_all_rules()),
+            "near_duplicates_collapsed": self.rag_engine.near_duplicates_collapsed,
+            "embedding": self.vector_store.embedder.stats(),
+            "ingestion": self.rag_engine.last_ingestion_stats,
+            "cache": self.rag_engine.get_cache_stats(),
+            "llm": llm_client.stats()
         }
 
 
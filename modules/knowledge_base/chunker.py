@@ -0,0 +1,162 @@
+from typing import Dict, List, Any, Optional
+import re
+
+from utils.helpers import estimate_tokens
+from config.settings import CHUNKING_CONFIG
+
+
+SENTENCE_PATTERN = re.compile(r'[^。；;！!？?\n]+[。；;！!？?]?')
+
+
+class PolicyChunker:
+    def __init__(self, config: Dict[str, Any] = None):
+        config = config or CHUNKING_CONFIG
+        self.max_tokens = config.get("max_tokens", 400)
+        self.overlap_tokens = config.get("overlap_tokens", 50)
+        self.min_tokens = config.get("min_tokens", 80)
+        self.table_max_tokens = config.get("table_max_tokens", self.max_tokens)
+
+    def chunk_document(self, doc: Dict[str, Any]) -> List[Dict[str, Any]]:
+        chunks = self.chunk_content(doc.get("content", []), doc.get("structure", {}))
+        for table in doc.get("tables", []):
+            chunks.extend(self.chunk_table(table))
+        return chunks
+
+    def chunk_content(self,
+                      content: List[Dict[str, Any]],
+                      structure: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        levels = {s.get("title"): s.get("level", 1) for s in (structure or {}).get("sections", [])}
+        chunks = []
+        window: List[str] = []
+        window_tokens = 0
+        window_section = ""
+        path: List[tuple] = []
+        current_section = None
+
+        def flush(carry_overlap: bool) -> None:
+            nonlocal window, window_tokens
+            if not window:
+                return
+            chunks.append(self._text_chunk(window_section, window))
+            if not carry_overlap:
+                window, window_tokens = [], 0
+                return
+            carried, carried_tokens = [], 0
+            for para in reversed(window):
+                tokens = estimate_tokens(para)
+                if carried_tokens + tokens > self.overlap_tokens:
+                    break
+                carried.insert(0, para)
+                carried_tokens += tokens
+            window, window_tokens = carried, carried_tokens
+
+        for item in content:
+            text = item.get("text", "").strip()
+            if not text:
+                continue
+
+            if self._is_heading(item):
+                level = levels.get(text, 1)
+                path = [p for p in path if p[0] < level] + [(level, text)]
+                section = " > ".join(title for _, title in path)
+                paras = []
+            else:
+                section = item.get("section") or current_section or ""
+                if path and section == path[-1][1]:
+                    section = " > ".join(title for _, title in path)
+                paras = self._split_oversized(text)
+
+            if section != current_section:
+                if window_tokens >= self.min_tokens:
+                    flush(carry_overlap=False)
+                current_section = section
+                if window:
+                    window.append(section)
+                    window_tokens += estimate_tokens(section)
+                else:
+                    window_section = section
+
+            for para in paras:
+                tokens = estimate_tokens(para)
+                if window and window_tokens + tokens > self.max_tokens:
+                    flush(carry_overlap=True)
+                    window_section = current_section
+                window.append(para)
+                window_tokens += tokens
+
+        flush(carry_overlap=False)
+        return chunks
+
+    def chunk_table(self, table: Dict[str, Any]) -> List[Dict[str, Any]]:
+        if table.get("rows"):
+            header, body = table["rows"][0], table["rows"][1:]
+        elif table.get("data"):
+            header, body = table.get("headers", []), table["data"]
+        else:
+            markdown = table.get("markdown", "")
+            return [self._table_chunk(table, markdown, 0, 0)] if markdown else []
+
+        header_md = self._markdown_rows([header], header=True)
+        header_tokens = estimate_tokens(header_md)
+        chunks = []
+        group: List[List[str]] = []
+        group_tokens = header_tokens
+        start = 0
+
+        for i, row in enumerate(body):
+            row_tokens = estimate_tokens(self._markdown_rows([row]))
+            if group and group_tokens + row_tokens > self.table_max_tokens:
+                chunks.append(self._table_chunk(table, header_md + "\n" + self._markdown_rows(group),
+                                                start, start + len(group)))
+                group, group_tokens, start = [], header_tokens, i
+            group.append(row)
+            group_tokens += row_tokens
+
+        if group or not chunks:
+            text = header_md + ("\n" + self._markdown_rows(group) if group else "")
+            chunks.append(self._table_chunk(table, text, start, start + len(group)))
+        return chunks
+
+    def _split_oversized(self, text: str) -> List[str]:
+        if estimate_tokens(text) <= self.max_tokens:
+            return [text]
+
+        pieces, current = [], ""
+        for sentence in SENTENCE_PATTERN.findall(text):
+            if current and estimate_tokens(current + sentence) > self.max_tokens:
+                pieces.append(current)
+                current = ""
+            current += sentence
+        if current:
+            pieces.append(current)
+        return pieces
+
+    @staticmethod
+    def _is_heading(item: Dict[str, Any]) -> bool:
+        return bool(item.get("is_heading")) or item.get("type") == "heading"
+
+    @staticmethod
+    def _text_chunk(section: str, paragraphs: List[str]) -> Dict[str, Any]:
+        body = "\n".join(paragraphs)
+        text = f"{section}\n{body}" if section and not body.startswith(section) else body
+        return {"text": text, "section": section, "chunk_type": "text"}
+
+    @staticmethod
+    def _table_chunk(table: Dict[str, Any], text: str, row_start: int, row_end: int) -> Dict[str, Any]:
+        return {
+            "text": text,
+            "section": f"表格{table.get('table_index', table.get('index', 0))}",
+            "chunk_type": "table",
+            "row_start": row_start,
+            "row_end": row_end
+        }
+
+    @staticmethod
+    def _markdown_rows(rows: List[List[Any]], header: bool = False) -> str:
+        lines = ["| " + " | ".join(str(cell).replace('\n', ' ') for cell in row) + " |" for row in rows]
+        if header and rows:
+            lines.append("| " + " | ".join(["---"] * len(rows[0])) + " |")
+        return "\n".join(lines)
+
+
+policy_chunker = PolicyChunker()
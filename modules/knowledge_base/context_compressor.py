@@ -0,0 +1,129 @@
+from typing import Dict, List, Any, Optional, Callable, FrozenSet
+import json
+import re
+
+import numpy as np
+
+from utils.helpers import estimate_tokens
+from config.settings import CONTEXT_CONFIG
+
+
+SENTENCE_PATTERN = re.compile(r'[^。；;！!？?\n]+[。；;！!？?]?')
+WORD_PATTERN = re.compile(r'[a-zA-Z]+|\d+(?:\.\d+)?')
+CJK_PATTERN = re.compile(r'[一-鿿]+')
+
+
+def text_features(text: str) -> FrozenSet[str]:
+    features = set(WORD_PATTERN.findall(text.lower()))
+    for run in CJK_PATTERN.findall(text):
+        if len(run) == 1:
+            features.add(run)
+        features.update(run[i:i + 2] for i in range(len(run) - 1))
+    return frozenset(features)
+
+
+class ContextCompressor:
+    def __init__(self,
+                 config: Dict[str, Any] = None,
+                 embed_fn: Optional[Callable[[List[str]], Any]] = None):
+        config = config or CONTEXT_CONFIG
+        self.token_budget = config.get("token_budget", 600)
+        self.method = config.get("method", "lexical")
+        self.embed_fn = embed_fn
+
+    def compress(self, question: str, docs: List[Dict[str, Any]]) -> Dict[str, Any]:
+        sentences = []
+        headers: Dict[int, List[str]] = {}
+        original_tokens = 0
+
+        for doc_idx, doc in enumerate(docs):
+            text = self._document_text(doc)
+            original_tokens += estimate_tokens(doc.get("content", "") or "")
+            lines = [line.strip() for line in text.split("\n") if line.strip()]
+            if lines and lines[0].startswith("|"):
+                headers[doc_idx] = lines[:2]
+                candidates = lines[2:]
+            else:
+                candidates = [s.strip() for line in lines for s in SENTENCE_PATTERN.findall(line) if s.strip()]
+            for position, sentence in enumerate(candidates):
+                sentences.append((doc_idx, position, sentence))
+
+        scores = self._score(question, [s[2] for s in sentences])
+        leading = not any(score > 0 for score in scores)
+        if leading:
+            candidates = [i for i, s in enumerate(sentences) if s[0] == sentences[0][0]]
+        else:
+            candidates = sorted((i for i in range(len(sentences)) if scores[i] > 0),
+                                key=lambda i: (-scores[i], sentences[i][0], sentences[i][1]))
+
+        selected = set()
+        used_headers = set()
+        used_tokens = 0
+        for i in candidates:
+            doc_idx, _, sentence = sentences[i]
+            tokens = estimate_tokens(sentence)
+            if doc_idx in headers and doc_idx not in used_headers:
+                tokens += sum(estimate_tokens(line) for line in headers[doc_idx])
+            if used_tokens + tokens > self.token_budget:
+                if leading:
+                    break
+                continue
+            selected.add(i)
+            used_headers.add(doc_idx)
+            used_tokens += tokens
+
+        blocks = []
+        for doc_idx in range(len(docs)):
+            kept = [sentences[i] for i in sorted(selected) if sentences[i][0] == doc_idx]
+            if not kept:
+                continue
+            lines = headers.get(doc_idx, []) + [s[2] for s in kept]
+            joiner = "\n" if doc_idx in headers else ""
+            blocks.append(f"【参考文档{doc_idx + 1}】\n{joiner.join(lines)}")
+
+        context = "\n\n".join(blocks)
+        compressed_tokens = estimate_tokens(context)
+        return {
+            "context": context,
+            "original_tokens": original_tokens,
+            "compressed_tokens": compressed_tokens,
+            "compression_ratio": round(compressed_tokens / original_tokens, 3) if original_tokens else 1.0,
+            "sentences_total": len(sentences),
+            "sentences_kept": len(selected)
+        }
+
+    def _score(self, question: str, sentences: List[str]) -> List[float]:
+        if not sentences:
+            return []
+
+        if self.method == "embedding" and self.embed_fn is not None:
+            vectors = np.asarray(self.embed_fn([question] + sentences), dtype=np.float32)
+            norms = np.linalg.norm(vectors, axis=1)
+            norms[norms == 0] = 1.0
+            vectors = vectors / norms[:, None]
+            return (vectors[1:] @ vectors[0]).tolist()
+
+        query = text_features(question)
+        if not query:
+            return [0.0] * len(sentences)
+        scores = []
+        for sentence in sentences:
+            features = text_features(sentence)
+            overlap = len(query & features)
+            scores.append(overlap / (len(features) ** 0.5) if overlap else 0.0)
+        return scores
+
+    @staticmethod
+    def _document_text(doc: Dict[str, Any]) -> str:
+        content = doc.get("content", "") or ""
+        if content.startswith("{"):
+            try:
+                rule = json.loads(content)
+            except json.JSONDecodeError:
+                return content
+            if isinstance(rule, dict) and rule.get("source_text"):
+                return str(rule["source_text"])
+        return content
+
+
+context_compressor = ContextCompressor()
@@ -0,0 +1,182 @@
+from typing import Dict, List, Any, Optional, Callable, Hashable, Tuple
+from collections import defaultdict
+import re
+import zlib
+
+import numpy as np
+
+from utils.compiled_rule import compile_rule
+
+
+MERSENNE_PRIME = (1 << 31) - 1
+
+NORMALIZE_PATTERN = re.compile(
+    r'^\s*(?:[一二三四五六七八九十]+[、．.]|\d+[、．.](?!\d)|[(（][一二三四五六七八九十\d]+[)）])'
+    r'|[\s，,。．.；;：:、！!？?“”"\'（）()【】\[\]]'
+)
+
+
+def normalize_rule_text(text: str) -> str:
+    return NORMALIZE_PATTERN.sub("", text)
+
+
+PROVENANCE_KEYS = ("rule_id", "source", "file_path", "section")
+
+QUANTITY_PATTERN = re.compile(
+    r'(?:\d+(?:\.\d+)?|[零一二两三四五六七八九十百千]+)[万千百]?(?:元|%|次|天|日|个|件|人|倍|折|小时)'
+)
+
+
+def rule_text(rule: Dict[str, Any]) -> Any:
+    text = rule.get("source_text", rule.get("content", ""))
+    if rule.get("extraction_method") == "llm":
+        return f"{text}|{rule.get('constraint_field', '')}|{rule.get('description', '')}"
+    return text
+
+
+def rule_guard_key(rule: Dict[str, Any]) -> Hashable:
+    compiled = compile_rule(rule)
+    quantities = QUANTITY_PATTERN.findall(normalize_rule_text(rule_text(rule)))
+    return compiled.operator, compiled.threshold, tuple(sorted(set(quantities)))
+
+
+class MinHashLSH:
+    def __init__(self,
+                 num_perm: int = 128,
+                 bands: int = 32,
+                 shingle_size: int = 3,
+                 threshold: float = 0.75,
+                 seed: int = 20240101):
+        if num_perm % bands:
+            raise ValueError("num_perm 必须能被 bands 整除")
+
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self.threshold = threshold
+
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, MERSENNE_PRIME, size=(num_perm, 1), dtype=np.int64)
+        self._b = rng.randint(0, MERSENNE_PRIME, size=(num_perm, 1), dtype=np.int64)
+        self._buckets: Dict[Tuple, List[Hashable]] = defaultdict(list)
+        self._signatures: Dict[Hashable, np.ndarray] = {}
+
+    def signature(self, text: str) -> np.ndarray:
+        k = self.shingle_size
+        if len(text) <= k:
+            shingles = {text}
+        else:
+            shingles = {text[i:i + k] for i in range(len(text) - k + 1)}
+
+        hashes = np.fromiter(
+            (zlib.crc32(s.encode("utf-8")) % MERSENNE_PRIME for s in shingles),
+            dtype=np.int64, count=len(shingles)
+        )
+        return ((self._a * hashes + self._b) % MERSENNE_PRIME).min(axis=1)
+
+    def insert(self, key: Hashable, signature: np.ndarray, namespace: Hashable = None) -> None:
+        self._signatures[key] = signature
+        for band_key in self._band_keys(signature, namespace):
+            self._buckets[band_key].append(key)
+
+    def query(self, signature: np.ndarray, namespace: Hashable = None) -> List[Tuple[Hashable, float]]:
+        candidates = set()
+        for band_key in self._band_keys(signature, namespace):
+            candidates.update(self._buckets.get(band_key, ()))
+
+        matches = []
+        for key in candidates:
+            similarity = float(np.mean(self._signatures[key] == signature))
+            if similarity >= self.threshold:
+                matches.append((key, similarity))
+        matches.sort(key=lambda m: m[1], reverse=True)
+        return matches
+
+    def _band_keys(self, signature: np.ndarray, namespace: Hashable):
+        rows = self.rows
+        for band in range(self.bands):
+            yield namespace, band, signature[band * rows:(band + 1) * rows].tobytes()
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+
+class NearDuplicateDetector:
+    def __init__(self,
+                 threshold: float = 0.75,
+                 num_perm: int = 128,
+                 bands: int = 32,
+                 shingle_size: int = 3,
+                 text_fn: Optional[Callable[[Dict[str, Any]], Any]] = None,
+                 guard_fn: Callable[[Dict[str, Any]], Hashable] = rule_guard_key):
+        self.lsh = MinHashLSH(num_perm=num_perm, bands=bands,
+                              shingle_size=shingle_size, threshold=threshold)
+        self.text_fn = text_fn or rule_text
+        self.guard_fn = guard_fn
+        self.collapsed = 0
+
+    def _prepare(self, rule: Dict[str, Any]) -> Optional[Tuple[np.ndarray, Hashable]]:
+        text = self.text_fn(rule)
+        if not isinstance(text, str):
+            return None
+        normalized = normalize_rule_text(text)
+        if not normalized:
+            return None
+        return self.lsh.signature(normalized), self.guard_fn(rule)
+
+    def find(self, rule: Dict[str, Any]) -> Optional[Hashable]:
+        prepared = self._prepare(rule)
+        if prepared is None:
+            return None
+        matches = self.lsh.query(*prepared)
+        return matches[0][0] if matches else None
+
+    def add(self, key: Hashable, rule: Dict[str, Any]) -> None:
+        prepared = self._prepare(rule)
+        if prepared is not None:
+            self.lsh.insert(key, *prepared)
+
+    def find_or_add(self, key: Hashable, rule: Dict[str, Any]) -> Optional[Hashable]:
+        prepared = self._prepare(rule)
+        if prepared is None:
+            return None
+        matches = self.lsh.query(*prepared)
+        if matches:
+            return matches[0][0]
+        self.lsh.insert(key, *prepared)
+        return None
+
+    def collapse(self, rules: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        canonical: List[Dict[str, Any]] = []
+        for rule in rules:
+            match = self.find_or_add(len(canonical), rule)
+            if match is None:
+                canonical.append(rule)
+            else:
+                attach_provenance(canonical[match], rule)
+                self.collapsed += 1
+        return canonical
+
+
+def attach_provenance(canonical: Dict[str, Any], duplicate: Dict[str, Any]) -> None:
+    entry = {
+        key: duplicate[key] for key in PROVENANCE_KEYS if duplicate.get(key)
+    }
+    entry["source_text"] = duplicate.get("source_text", duplicate.get("content", ""))
+    duplicates = canonical.setdefault("duplicates", [])
+    if entry not in duplicates:
+        duplicates.append(entry)
+    for nested in duplicate.get("duplicates", []):
+        if nested not in duplicates:
+            duplicates.append(nested)
+
+
+def collapse_near_duplicates(rules: List[Dict[str, Any]],
+                             threshold: Optional[float] = None) -> List[Dict[str, Any]]:
+    if threshold is None:
+        from config.settings import RULE_EXTRACTION_CONFIG
+        threshold = RULE_EXTRACTION_CONFIG.get("near_duplicate_threshold", 0.75)
+    if not threshold:
+        return rules
+    return NearDuplicateDetector(threshold=threshold).collapse(rules)
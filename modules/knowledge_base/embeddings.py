@@ -0,0 +1,204 @@
+from typing import Dict, List, Any, Optional
+from concurrent.futures import ThreadPoolExecutor
+import re
+import threading
+import time
+import zlib
+
+import numpy as np
+
+from config.settings import EMBEDDING_CONFIG
+
+
+class EmbeddingBackend:
+    name = "base"
+    max_batch_size = 256
+
+    @property
+    def signature(self) -> str:
+        return self.name
+
+    def embed_batch(self, texts: List[str]) -> np.ndarray:
+        raise NotImplementedError
+
+
+class HashingEmbedder(EmbeddingBackend):
+    name = "hashing"
+    max_batch_size = 4096
+
+    def __init__(self, dimension: int = 256):
+        self.dimension = dimension
+
+    @property
+    def signature(self) -> str:
+        return f"hashing-{self.dimension}"
+
+    def embed_batch(self, texts: List[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        for row, text in enumerate(texts):
+            features = [text[i:i + 2] for i in range(max(len(text) - 1, 1))]
+            features.extend(text)
+            if not features:
+                continue
+            hashes = np.fromiter((zlib.crc32(f.encode("utf-8")) for f in features),
+                                 dtype=np.uint32, count=len(features))
+            signs = np.where(hashes & 0x80000000, -1.0, 1.0).astype(np.float32)
+            np.add.at(vectors[row], hashes % self.dimension, signs)
+
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+
+class SentenceTransformerEmbedder(EmbeddingBackend):
+    name = "sentence_transformers"
+    max_batch_size = 128
+
+    def __init__(self, model_name: str, device: str = "cpu"):
+        self.model_name = model_name
+        self.device = device
+        self._model = None
+        self._lock = threading.Lock()
+
+    @property
+    def signature(self) -> str:
+        return f"st-{self.model_name.rsplit('/', 1)[-1]}"
+
+    @property
+    def model(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    try:
+                        from sentence_transformers import SentenceTransformer
+                    except ImportError:
+                        raise ImportError("sentence-transformers 未安装，无法使用本地向量模型")
+                    self._model = SentenceTransformer(self.model_name, device=self.device)
+        return self._model
+
+    def embed_batch(self, texts: List[str]) -> np.ndarray:
+        return np.asarray(
+            self.model.encode(texts, batch_size=len(texts), normalize_embeddings=True),
+            dtype=np.float32
+        )
+
+
+class ZhipuEmbedder(EmbeddingBackend):
+    name = "zhipu"
+    max_batch_size = 64
+
+    def __init__(self, model: str = "embedding-2"):
+        self.model = model
+
+    @property
+    def signature(self) -> str:
+        return f"zhipu-{self.model}"
+
+    def embed_batch(self, texts: List[str]) -> np.ndarray:
+        from utils.llm_client import llm_client
+
+        response = llm_client.client.embeddings.create(model=self.model, input=texts)
+        data = sorted(response.data, key=lambda item: item.index)
+        return np.asarray([item.embedding for item in data], dtype=np.float32)
+
+
+class ChromaDefaultEmbedder(EmbeddingBackend):
+    name = "chroma"
+    max_batch_size = 256
+
+    def __init__(self):
+        self._function = None
+
+    def embed_batch(self, texts: List[str]) -> np.ndarray:
+        if self._function is None:
+            from chromadb.utils import embedding_functions
+            self._function = embedding_functions.DefaultEmbeddingFunction()
+        return np.asarray(self._function(texts), dtype=np.float32)
+
+
+class Embedder:
+    def __init__(self,
+                 backend: EmbeddingBackend,
+                 batch_size: int = 64,
+                 max_batch_size: Optional[int] = None,
+                 max_workers: int = 1):
+        self.backend = backend
+        self.batch_size = max(1, min(batch_size, max_batch_size or backend.max_batch_size))
+        self.max_workers = max(1, max_workers)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.texts = 0
+        self.batches = 0
+        self.seconds = 0.0
+
+    @property
+    def name(self) -> str:
+        return self.backend.name
+
+    @property
+    def signature(self) -> str:
+        return re.sub(r'[^a-zA-Z0-9._-]', '-', self.backend.signature)
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        texts = list(texts)
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+
+        start = time.perf_counter()
+        batches = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+        if len(batches) == 1 or self.max_workers == 1:
+            vectors = [self.backend.embed_batch(batch) for batch in batches]
+        else:
+            vectors = list(self._get_executor().map(self.backend.embed_batch, batches))
+        result = np.vstack(vectors)
+
+        with self._lock:
+            self.texts += len(texts)
+            self.batches += len(batches)
+            self.seconds += time.perf_counter() - start
+        return result
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                        thread_name_prefix="embed")
+        return self._executor
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "backend": self.signature,
+                "texts": self.texts,
+                "batches": self.batches,
+                "seconds": round(self.seconds, 4),
+                "texts_per_second": round(self.texts / self.seconds, 1) if self.seconds else 0.0
+            }
+
+
+def create_backend(config: Dict[str, Any]) -> EmbeddingBackend:
+    backend = config.get("backend", "chroma")
+
+    if backend == "hashing":
+        return HashingEmbedder(config.get("hashing_dimension", 256))
+    if backend == "sentence_transformers":
+        return SentenceTransformerEmbedder(
+            config.get("local_model", "paraphrase-multilingual-MiniLM-L12-v2"),
+            config.get("device", "cpu")
+        )
+    if backend == "zhipu":
+        return ZhipuEmbedder(config.get("model", "embedding-2"))
+    if backend == "chroma":
+        return ChromaDefaultEmbedder()
+    raise ValueError(f"不支持的向量化后端: {backend}")
+
+
+def create_embedder(config: Dict[str, Any] = None) -> Embedder:
+    config = config or EMBEDDING_CONFIG
+    return Embedder(
+        create_backend(config),
+        batch_size=config.get("batch_size", 64),
+        max_batch_size=config.get("max_batch_size"),
+        max_workers=config.get("max_workers", 1)
+    )
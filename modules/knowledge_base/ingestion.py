@@ -0,0 +1,97 @@
+from typing import Dict, List, Any, Optional
+import queue
+import threading
+import time
+
+
+_CLOSE = object()
+
+
+class BulkIngestor:
+    def __init__(self, vector_store, batch_size: int = 512, max_pending: int = 8192):
+        self.vector_store = vector_store
+        self.batch_size = max(1, batch_size)
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max(1, max_pending))
+        self._writer: Optional[threading.Thread] = None
+        self._error: Optional[BaseException] = None
+        self._started_at: Optional[float] = None
+        self._finished_at: Optional[float] = None
+        self.records = 0
+        self.batches = 0
+        self.write_seconds = 0.0
+
+    def start(self) -> "BulkIngestor":
+        if self._writer is None:
+            self._started_at = time.perf_counter()
+            self._writer = threading.Thread(target=self._run, name="kb-ingest-writer", daemon=True)
+            self._writer.start()
+        return self
+
+    def put(self, documents: List[str], metadatas: List[Dict], ids: List[str]) -> None:
+        if self._writer is None:
+            self.start()
+        if self._error is not None:
+            raise RuntimeError(f"知识库写入线程已失败: {self._error}")
+
+        for record in zip(documents, metadatas, ids):
+            self._queue.put(record)
+
+    def close(self) -> Dict[str, Any]:
+        if self._writer is not None:
+            self._queue.put(_CLOSE)
+            self._writer.join()
+            self._writer = None
+        if self._error is not None:
+            raise RuntimeError(f"知识库批量写入失败: {self._error}") from self._error
+        return self.stats()
+
+    def __enter__(self) -> "BulkIngestor":
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        elif self._writer is not None:
+            self._queue.put(_CLOSE)
+            self._writer.join()
+            self._writer = None
+
+    def _run(self) -> None:
+        buffer = []
+        while True:
+            record = self._queue.get()
+            if record is _CLOSE:
+                break
+            buffer.append(record)
+            if len(buffer) >= self.batch_size:
+                self._flush(buffer)
+                buffer = []
+        self._flush(buffer)
+        self._finished_at = time.perf_counter()
+
+    def _flush(self, buffer: List[tuple]) -> None:
+        if not buffer or self._error is not None:
+            return
+
+        documents, metadatas, ids = (list(column) for column in zip(*buffer))
+        start = time.perf_counter()
+        try:
+            self.vector_store.add_documents(documents, metadatas, ids)
+        except Exception as e:
+            self._error = e
+            return
+        self.write_seconds += time.perf_counter() - start
+        self.records += len(buffer)
+        self.batches += 1
+
+    def stats(self) -> Dict[str, Any]:
+        end = self._finished_at or time.perf_counter()
+        elapsed = end - self._started_at if self._started_at else 0.0
+        return {
+            "records": self.records,
+            "batches": self.batches,
+            "batch_size": self.batch_size,
+            "elapsed_seconds": round(elapsed, 4),
+            "write_seconds": round(self.write_seconds, 4),
+            "records_per_second": round(self.records / elapsed, 1) if elapsed else 0.0
+        }
@@ -0,0 +1,193 @@
+from typing import Dict, List, Any, Optional, Callable
+import asyncio
+import hashlib
+import threading
+
+from utils.cache import TTLCache
+from utils.helpers import estimate_tokens
+from utils.compiled_rule import parse_threshold
+
+
+PROMPT_VERSION = "v1"
+
+VALID_OPERATORS = ("<=", ">=", "==")
+
+SYSTEM_PROMPT = """你是一个营销合规规则提取专家。请从编号的政策段落中提取可审计的规则。
+返回一个JSON数组，每个元素对应一个段落：
+- index: 段落编号
+- rules: 该段落中的规则列表（没有规则时为空数组），每条规则包含：
+  - rule_type: 禁止事项/必做事项/上限约束/下限约束/范围限制/条件约束 之一
+  - constraint_type: 金额/比例/范围/时间/数量/其他 之一
+  - constraint_field: 被约束的业务字段（如 优惠券金额、发放对象）
+  - operator: "<=" / ">=" / "==" 之一，无数值约束时为空字符串
+  - threshold: 数值阈值（已换算单位，如100万元写作1000000），无则为null
+  - constraint_value: 原文中的约束值列表
+  - description: 规则的简短描述
+
+只返回JSON数组，不要附加解释。"""
+
+
+class LLMRuleExtractor:
+    def __init__(self,
+                 fallback: Callable[[str], Optional[Dict[str, Any]]],
+                 compile_fn: Callable[[Dict[str, Any]], Any],
+                 config: Dict[str, Any]):
+        self.fallback = fallback
+        self.compile_fn = compile_fn
+        self.batch_tokens = config.get("llm_batch_tokens", 1500)
+        self.max_concurrency = config.get("llm_max_concurrency", 4)
+        self.cache = TTLCache(
+            max_size=config.get("llm_cache_size", 100000),
+            persist_path=config.get("llm_cache_path"),
+            save_interval=config.get("llm_cache_save_interval", 60.0)
+        )
+        self._lock = threading.Lock()
+        self.stats = {
+            "paragraphs": 0,
+            "cached_paragraphs": 0,
+            "llm_requests": 0,
+            "failed_requests": 0,
+            "fallback_paragraphs": 0
+        }
+
+    def extract(self, paragraphs: List[str]) -> List[Dict[str, Any]]:
+        from utils.llm_client import llm_client
+
+        model = llm_client.config.get("model", "")
+        keys = {para: self._cache_key(model, para) for para in dict.fromkeys(paragraphs)}
+        extracted: Dict[str, List[Dict[str, Any]]] = {}
+
+        for para, key in keys.items():
+            cached = self.cache.get(key)
+            if cached is not None:
+                extracted[para] = cached
+
+        uncached = [para for para in keys if para not in extracted]
+        with self._lock:
+            self.stats["paragraphs"] += len(keys)
+            self.stats["cached_paragraphs"] += len(keys) - len(uncached)
+
+        batches = self._pack(uncached)
+        if batches:
+            missing = []
+            for batch, result in zip(batches, llm_client.run(self._extract_batches(batches))):
+                if result is None:
+                    missing.extend(batch)
+                    continue
+
+                for para in batch:
+                    if para not in result:
+                        missing.append(para)
+                        continue
+                    extracted[para] = result[para]
+                    self.cache.set(keys[para], extracted[para])
+            self.cache.save_if_due()
+
+            for para in missing:
+                rule = self.fallback(para)
+                extracted[para] = [rule] if rule else []
+            with self._lock:
+                self.stats["fallback_paragraphs"] += len(missing)
+
+        rules = []
+        for para in paragraphs:
+            rules.extend(dict(rule) for rule in extracted.get(para, []))
+        return rules
+
+    def _pack(self, paragraphs: List[str]) -> List[List[str]]:
+        batches = []
+        current: List[str] = []
+        current_tokens = estimate_tokens(SYSTEM_PROMPT)
+        base_tokens = current_tokens
+
+        for para in paragraphs:
+            tokens = estimate_tokens(para) + 4
+            if current and current_tokens + tokens > self.batch_tokens:
+                batches.append(current)
+                current = []
+                current_tokens = base_tokens
+            current.append(para)
+            current_tokens += tokens
+
+        if current:
+            batches.append(current)
+        return batches
+
+    async def _extract_batches(self, batches: List[List[str]]) -> List[Optional[Dict[str, List[Dict[str, Any]]]]]:
+        from utils.llm_client import llm_client
+
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def bounded(batch: List[str]):
+            async with semaphore:
+                return await self._extract_batch(batch)
+
+        return await llm_client.gather(bounded(batch) for batch in batches)
+
+    async def _extract_batch(self, batch: List[str]) -> Optional[Dict[str, List[Dict[str, Any]]]]:
+        from utils.llm_client import llm_client
+
+        user_message = "政策段落：\n" + "\n".join(f"[{i}] {para}" for i, para in enumerate(batch))
+
+        with self._lock:
+            self.stats["llm_requests"] += 1
+
+        try:
+            result = await llm_client.achat_json(SYSTEM_PROMPT, user_message, caller="extract")
+        except Exception as e:
+            print(f"LLM规则提取失败: {e}")
+            result = None
+
+        if not isinstance(result, list):
+            with self._lock:
+                self.stats["failed_requests"] += 1
+            return None
+
+        extracted = {}
+        for item in result:
+            if not isinstance(item, dict) or not isinstance(item.get("index"), int):
+                continue
+            if not 0 <= item["index"] < len(batch):
+                continue
+            para = batch[item["index"]]
+            extracted[para] = [
+                self._to_rule(para, raw) for raw in item.get("rules", []) if isinstance(raw, dict)
+            ]
+        return extracted
+
+    def _to_rule(self, para: str, raw: Dict[str, Any]) -> Dict[str, Any]:
+        constraint_value = raw.get("constraint_value", [])
+        if not isinstance(constraint_value, list):
+            constraint_value = [str(constraint_value)]
+
+        rule = {
+            "source_text": para,
+            "rule_type": raw.get("rule_type", "条件约束"),
+            "constraint_type": raw.get("constraint_type", "其他"),
+            "constraint_field": raw.get("constraint_field", ""),
+            "constraint_value": constraint_value,
+            "description": raw.get("description", para),
+            "extraction_method": "llm"
+        }
+
+        compiled = self.compile_fn(rule).to_dict()
+        operator = raw.get("operator")
+        threshold = raw.get("threshold")
+        if isinstance(threshold, str):
+            threshold = parse_threshold(threshold)
+        if operator in VALID_OPERATORS and isinstance(threshold, (int, float)):
+            compiled["operator"] = operator
+            compiled["threshold"] = float(threshold)
+        rule["compiled"] = compiled
+        return rule
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+        stats["cache"] = self.cache.stats()
+        return stats
+
+    @staticmethod
+    def _cache_key(model: str, para: str) -> str:
+        digest = hashlib.sha1(para.encode("utf-8")).hexdigest()
+        return f"{PROMPT_VERSION}:{model}:{digest}"
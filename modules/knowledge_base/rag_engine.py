@@ -1,66 +1,382 @@
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Iterator
+from pathlib import Path
 import json
+import threading
 
 from .vector_store import vector_store
 from .rule_extractor import rule_extractor
+from .chunker import policy_chunker
+from .context_compressor import ContextCompressor
+from .semantic_cache import SemanticCache
+from .rule_index import RuleIndex
+from .rule_store import RuleStore
+from .dedup import NearDuplicateDetector, attach_provenance
+from .ingestion import BulkIngestor
 from utils.llm_client import llm_client
-from config.settings import KNOWLEDGE_DIR
+from utils.cache import TTLCache
+from utils.helpers import generate_id, save_json, load_json
+from utils.lazy import LazyProxy
+from config.settings import KNOWLEDGE_DIR, CACHE_CONFIG, AUDIT_CONFIG, RULE_STORE_CONFIG, INGESTION_CONFIG, CONTEXT_CONFIG
+
+
+SNAPSHOT_FORMAT = "audit_kb_snapshot"
+SNAPSHOT_FORMAT_VERSION = 1
+NEUTRAL_RELEVANCE_SCORE = 0.5
+
+
+class KnowledgeBuild:
+    def __init__(self,
+                 vector_store,
+                 rule_index: RuleIndex,
+                 near_duplicates: Optional[NearDuplicateDetector],
+                 ingestor: Optional[BulkIngestor] = None):
+        self.vector_store = vector_store
+        self.rule_index = rule_index
+        self.near_duplicates = near_duplicates
+        self.ingestor = ingestor
+        self.pending_rules: Dict[str, Dict[str, Any]] = {}
+        self.pending_updates: Dict[str, Dict[str, Any]] = {}
+    
+    def add_documents(self, documents: List[str], metadatas: List[Dict], ids: List[str]) -> None:
+        if not documents:
+            return
+        if self.ingestor is not None:
+            self.ingestor.put(documents, metadatas, ids)
+        else:
+            self.vector_store.add_documents(documents, metadatas, ids)
+    
+    def add_rules(self, rules: Dict[str, Dict[str, Any]]) -> None:
+        if self.ingestor is not None:
+            self.pending_rules.update(rules)
+        elif rules:
+            self.rule_index.add_many(rules)
+    
+    def update_rules(self, rules: Dict[str, Dict[str, Any]]) -> None:
+        self.add_rules(rules)
+        if self.ingestor is not None:
+            self.pending_updates.update(rules)
+        elif rules:
+            self._write_rule_documents(rules)
+    
+    def delete(self, ids: List[str]) -> None:
+        self.vector_store.delete(ids)
+        for rule_id in ids:
+            self.pending_rules.pop(rule_id, None)
+            self.pending_updates.pop(rule_id, None)
+        self.rule_index.remove(rule_id for rule_id in ids if rule_id in self.rule_index)
+    
+    def get_rule(self, rule_id: str) -> Optional[Dict[str, Any]]:
+        return self.pending_rules.get(rule_id) or self.rule_index.get(rule_id)
+    
+    def flush_rules(self) -> None:
+        if self.pending_rules:
+            self.rule_index.add_many(self.pending_rules)
+            self.pending_rules = {}
+        if self.pending_updates:
+            self._write_rule_documents(self.pending_updates)
+            self.pending_updates = {}
+    
+    def _write_rule_documents(self, rules: Dict[str, Dict[str, Any]]) -> None:
+        self.vector_store.update_documents(
+            list(rules), [json.dumps(rule, ensure_ascii=False) for rule in rules.values()]
+        )
 
 
 class RAGEngine:
-    def __init__(self):
+    def __init__(self, rule_store: Optional[RuleStore] = None):
         self.vector_store = vector_store
         self.rule_extractor = rule_extractor
-        self.knowledge_base = []
+        self.chunker = policy_chunker
+        self.context_compressor = ContextCompressor(embed_fn=lambda texts: self.vector_store.embed(texts))
+        self.rule_store = rule_store or RuleStore(RULE_STORE_CONFIG.get("path", str(KNOWLEDGE_DIR / "rules.db")))
+        self.rule_index = RuleIndex(store=self.rule_store, reconcile=self._reconcile_rules)
+        self._kb_version: Optional[int] = None
+        self._near_duplicates: Optional[NearDuplicateDetector] = None
+        self.near_duplicates_collapsed = 0
+        self._rebuild_thread: Optional[threading.Thread] = None
+        self.last_rebuild_error: Optional[str] = None
+        self.last_ingestion_stats: Optional[Dict[str, Any]] = None
+        self.rerank_cache = self._init_rerank_cache()
+        self.semantic_cache = self._init_semantic_cache()
+    
+    def _init_rerank_cache(self) -> Optional[TTLCache]:
+        cache_config = CACHE_CONFIG.get("rerank", {})
+        if not cache_config.get("enabled", True):
+            return None
+        
+        return TTLCache(
+            max_size=cache_config.get("max_size", 10000),
+            ttl=cache_config.get("ttl"),
+            persist_path=cache_config.get("persist_path") if cache_config.get("persist") else None,
+            save_interval=cache_config.get("save_interval", 60.0)
+        )
+    
+    def _init_semantic_cache(self) -> Optional[SemanticCache]:
+        cache_config = CACHE_CONFIG.get("semantic", {})
+        if not cache_config.get("enabled", True):
+            return None
+        
+        return SemanticCache(
+            embed_fn=lambda texts: self.vector_store.embed(texts),
+            threshold=AUDIT_CONFIG.get("similarity_threshold", 0.85),
+            max_size=cache_config.get("max_size", 1000),
+            ttl=cache_config.get("ttl")
+        )
+    
+    def build_knowledge_base(self,
+                             documents: List[Dict[str, Any]],
+                             bulk: bool = False,
+                             workers: Optional[int] = None) -> None:
+        build = self._live_build()
+        if bulk:
+            self._bulk_ingest(documents, build, workers)
+        else:
+            for doc in documents:
+                self._process_document(doc, build)
+        
+        self._bump_kb_version()
+    
+    def _bulk_ingest(self,
+                     documents: List[Dict[str, Any]],
+                     build: KnowledgeBuild,
+                     workers: Optional[int] = None) -> Dict[str, Any]:
+        documents = list(documents)
+        workers = workers or INGESTION_CONFIG.get("workers", 1)
+        
+        build.ingestor = BulkIngestor(
+            build.vector_store,
+            batch_size=INGESTION_CONFIG.get("batch_size", 512),
+            max_pending=INGESTION_CONFIG.get("max_pending", 8192)
+        )
+        try:
+            with build.ingestor:
+                extracted = self.rule_extractor.iter_document_rules(
+                    (self._document_texts(doc) for doc in documents), workers
+                )
+                for doc, rules in zip(documents, extracted):
+                    self._process_document(doc, build, rules)
+            build.flush_rules()
+            self.last_ingestion_stats = build.ingestor.stats()
+        finally:
+            build.ingestor = None
+        
+        print(f"批量写入完成: {self.last_ingestion_stats['records']} 条记录, "
+              f"{self.last_ingestion_stats['records_per_second']} 条/秒")
+        return self.last_ingestion_stats
+    
+    def rebuild_knowledge_base(self,
+                               documents: List[Dict[str, Any]],
+                               background: bool = False) -> Optional[threading.Thread]:
+        staging = self.vector_store.begin_rebuild()
+        
+        if background:
+            self._rebuild_thread = threading.Thread(
+                target=self._run_rebuild, args=(staging, documents, False),
+                name="kb-rebuild", daemon=True
+            )
+            self._rebuild_thread.start()
+            return self._rebuild_thread
+        
+        self._run_rebuild(staging, documents, True)
+        return None
     
-    def build_knowledge_base(self, documents: List[Dict[str, Any]]) -> None:
-        for doc in documents:
-            self._process_document(doc)
+    @property
+    def is_rebuilding(self) -> bool:
+        return self.vector_store.is_rebuilding
     
-    def _process_document(self, doc: Dict[str, Any]) -> None:
+    def wait_for_rebuild(self, timeout: Optional[float] = None) -> bool:
+        thread = self._rebuild_thread
+        if thread is not None:
+            thread.join(timeout)
+        return not self.is_rebuilding
+    
+    def _run_rebuild(self, staging, documents: List[Dict[str, Any]], raise_errors: bool) -> None:
+        build = KnowledgeBuild(staging, RuleIndex(), self._new_near_duplicate_detector([]))
+        try:
+            self._bulk_ingest(documents, build)
+        except Exception as e:
+            self.vector_store.abort_rebuild(staging)
+            self.last_rebuild_error = str(e)
+            if raise_errors:
+                raise
+            print(f"知识库重建失败: {e}")
+            return
+        
+        self.last_rebuild_error = None
+        self._commit_build(build)
+    
+    def _commit_build(self, build: KnowledgeBuild, version: Optional[int] = None) -> None:
+        self.vector_store.commit_rebuild(build.vector_store)
+        self.rule_index.replace(build.rule_index.snapshot())
+        self.rule_store.set_meta("collection", self.vector_store.collection_name or "")
+        self._near_duplicates = build.near_duplicates
+        self._bump_kb_version(version)
+    
+    def _live_build(self) -> KnowledgeBuild:
+        return KnowledgeBuild(self.vector_store, self.rule_index, self.near_duplicates)
+    
+    @property
+    def knowledge_base(self) -> List[Dict[str, Any]]:
+        return self.rule_index.all()
+    
+    @property
+    def kb_version(self) -> int:
+        if self._kb_version is None:
+            self._kb_version = self.rule_store.get_version()
+        return self._kb_version
+    
+    def _bump_kb_version(self, version: Optional[int] = None) -> None:
+        self._kb_version = version if version is not None else self.kb_version + 1
+        self.rule_store.set_version(self._kb_version)
+        if self.semantic_cache is not None:
+            self.semantic_cache.invalidate()
+    
+    def _reconcile_rules(self, stored: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        if not self.vector_store.is_persistent:
+            return stored
+        
+        vector_ids = set(self.vector_store.get_documents(
+            where=RuleIndex.where_filter(), include_documents=False
+        )["ids"])
+        
+        stale = [rule_id for rule_id in stored if rule_id not in vector_ids]
+        if stale:
+            self.rule_store.delete(stale)
+            for rule_id in stale:
+                del stored[rule_id]
+        
+        missing = [rule_id for rule_id in vector_ids if rule_id not in stored]
+        if missing:
+            recovered = self._decode_rule_documents(self.vector_store.get_documents(ids=missing))
+            self.rule_store.upsert_rules(recovered)
+            stored.update(recovered)
+        
+        return stored
+    
+    def _decode_rule_documents(self, results: Dict[str, List]) -> Dict[str, Dict[str, Any]]:
+        rules = {}
+        for rule_id, document in zip(results.get("ids", []), results.get("documents", [])):
+            try:
+                rule = json.loads(document or "")
+            except json.JSONDecodeError as e:
+                print(f"规则解码失败 {rule_id}: {e}")
+                continue
+            rule.setdefault("rule_id", rule_id)
+            rules[rule_id] = rule
+        return rules
+    
+    @property
+    def near_duplicates(self) -> Optional[NearDuplicateDetector]:
+        if self._near_duplicates is None:
+            self._near_duplicates = self._new_near_duplicate_detector(self.rule_index.all())
+        return self._near_duplicates
+    
+    def _new_near_duplicate_detector(self, rules: List[Dict[str, Any]]) -> Optional[NearDuplicateDetector]:
+        threshold = self.rule_extractor.config.get("near_duplicate_threshold", 0.75)
+        if not threshold:
+            return None
+        detector = NearDuplicateDetector(threshold=threshold)
+        for rule in rules:
+            detector.add(rule.get("rule_id"), rule)
+        return detector
+    
+    def _index_rules(self,
+                     rules: List[Dict[str, Any]],
+                     id_prefix: str,
+                     source: str,
+                     build: KnowledgeBuild,
+                     previous: frozenset = frozenset()) -> Dict[str, Dict[str, Any]]:
+        detector = build.near_duplicates
+        new_rules = {}
+        updated = {}
+        
+        for i, rule in enumerate(rules):
+            rule_id = f"{id_prefix}_{i}"
+            rule["rule_id"] = rule_id
+            rule["source"] = source
+            
+            match = detector.find(rule) if detector is not None else None
+            if match in previous and match != rule_id and match not in new_rules:
+                match = None
+            if match is not None and match != rule_id:
+                canonical = new_rules.get(match) or updated.get(match) or build.get_rule(match)
+                if canonical is not None:
+                    attach_provenance(canonical, rule)
+                    if match not in new_rules:
+                        updated[match] = canonical
+                    self.near_duplicates_collapsed += 1
+                    continue
+            
+            if match == rule_id:
+                previous = build.get_rule(rule_id)
+                if previous and previous.get("duplicates"):
+                    rule["duplicates"] = previous["duplicates"]
+            elif detector is not None:
+                detector.add(rule_id, rule)
+            new_rules[rule_id] = rule
+        
+        build.update_rules(updated)
+        return new_rules
+    
+    def _process_document(self,
+                          doc: Dict[str, Any],
+                          build: Optional[KnowledgeBuild] = None,
+                          rules: Optional[List[Dict[str, Any]]] = None) -> None:
         doc_type = doc.get("document_type", "")
+        build = build or self._live_build()
         
         if doc_type == "policy_document":
-            self._process_policy_document(doc)
+            self._process_policy_document(doc, build, rules)
         elif doc_type == "audit_case":
-            self._process_audit_case(doc)
+            self._process_audit_case(doc, build)
         elif doc_type == "regulation":
-            self._process_regulation(doc)
+            self._process_regulation(doc, build, rules)
     
-    def _process_policy_document(self, doc: Dict[str, Any]) -> None:
-        content = doc.get("content", [])
-        tables = doc.get("tables", [])
-        metadata = doc.get("metadata", {})
-        
-        text_chunks = []
-        for item in content:
-            text = item.get("text", "")
-            if text:
-                text_chunks.append(text)
+    def _document_texts(self, doc: Dict[str, Any]) -> List[str]:
+        doc_type = doc.get("document_type", "")
         
-        for table in tables:
-            table_text = table.get("markdown", "")
-            if table_text:
-                text_chunks.append(table_text)
+        if doc_type == "policy_document":
+            text_chunks = [item.get("text", "") for item in doc.get("content", [])]
+            text_chunks.extend(table.get("markdown", "") for table in doc.get("tables", []))
+            return [text for text in text_chunks if text]
+        if doc_type == "regulation":
+            return [doc.get("content", "")]
+        return []
+    
+    def _process_policy_document(self,
+                                 doc: Dict[str, Any],
+                                 build: KnowledgeBuild,
+                                 rules: Optional[List[Dict[str, Any]]] = None) -> None:
+        metadata = doc.get("metadata", {})
+        text_chunks = self._document_texts(doc)
         
-        rules = self.rule_extractor.extract_rules("\n".join(text_chunks))
+        if rules is None:
+            rules = list(self.rule_extractor.iter_rules_parallel(text_chunks))
         
         documents_to_add = []
         metadatas = []
         ids = []
         
-        for i, chunk in enumerate(text_chunks):
+        for i, chunk in enumerate(self.chunker.chunk_document(doc)):
             doc_id = f"policy_{metadata.get('title', 'doc')}_{i}"
-            documents_to_add.append(chunk)
+            documents_to_add.append(chunk["text"])
             metadatas.append({
                 "type": "policy",
                 "source": metadata.get("title", ""),
+                "section": chunk["section"],
+                "chunk_type": chunk["chunk_type"],
                 "doc_type": "policy_document"
             })
             ids.append(doc_id)
         
-        for i, rule in enumerate(rules):
-            rule_id = f"rule_{metadata.get('title', 'doc')}_{i}"
+        previous = self._existing_ids(
+            build, ("policy", "rule"), metadata.get("title", ""),
+            (f"policy_{metadata.get('title', 'doc')}_", f"rule_{metadata.get('title', 'doc')}_")
+        )
+        indexed_rules = self._index_rules(
+            rules, f"rule_{metadata.get('title', 'doc')}", metadata.get("title", ""), build, previous
+        )
+        for rule_id, rule in indexed_rules.items():
             rule_text = json.dumps(rule, ensure_ascii=False)
             documents_to_add.append(rule_text)
             metadatas.append({
@@ -71,12 +387,27 @@ class RAGEngine:
             })
             ids.append(rule_id)
         
-        if documents_to_add:
-            self.vector_store.add_documents(documents_to_add, metadatas, ids)
-        
-        self.knowledge_base.extend(rules)
+        self._delete_stale(build, previous, ids)
+        build.add_documents(documents_to_add, metadatas, ids)
+        build.add_rules(indexed_rules)
+    
+    def _existing_ids(self,
+                      build: KnowledgeBuild,
+                      types: tuple,
+                      source: str,
+                      prefixes: tuple) -> frozenset:
+        existing = build.vector_store.get_documents(
+            where={"$and": [{"type": {"$in": list(types)}}, {"source": source}]}, include_documents=False
+        )["ids"]
+        return frozenset(doc_id for doc_id in existing if doc_id.startswith(prefixes))
     
-    def _process_audit_case(self, doc: Dict[str, Any]) -> None:
+    def _delete_stale(self, build: KnowledgeBuild, previous: frozenset, ids: List[str]) -> None:
+        current = set(ids)
+        stale = [doc_id for doc_id in previous if doc_id not in current]
+        if stale:
+            build.delete(stale)
+    
+    def _process_audit_case(self, doc: Dict[str, Any], build: KnowledgeBuild) -> None:
         case_text = doc.get("content", "")
         case_metadata = doc.get("metadata", {})
         
@@ -89,13 +420,17 @@ class RAGEngine:
         }]
         ids = [f"case_{case_metadata.get('case_id', 'unknown')}"]
         
-        self.vector_store.add_documents(documents_to_add, metadatas, ids)
+        build.add_documents(documents_to_add, metadatas, ids)
     
-    def _process_regulation(self, doc: Dict[str, Any]) -> None:
+    def _process_regulation(self,
+                            doc: Dict[str, Any],
+                            build: KnowledgeBuild,
+                            rules: Optional[List[Dict[str, Any]]] = None) -> None:
         content = doc.get("content", "")
         metadata = doc.get("metadata", {})
         
-        rules = self.rule_extractor.extract_rules(content)
+        if rules is None:
+            rules = list(self.rule_extractor.iter_rules_parallel([content]))
         
         documents_to_add = [content]
         metadatas = [{
@@ -105,8 +440,13 @@ class RAGEngine:
         }]
         ids = [f"reg_{metadata.get('id', 'unknown')}"]
         
-        for i, rule in enumerate(rules):
-            rule_id = f"reg_rule_{metadata.get('id', 'unknown')}_{i}"
+        previous = self._existing_ids(
+            build, ("regulation_rule",), metadata.get("source", ""), (f"reg_rule_{metadata.get('id', 'unknown')}_",)
+        )
+        indexed_rules = self._index_rules(
+            rules, f"reg_rule_{metadata.get('id', 'unknown')}", metadata.get("source", ""), build, previous
+        )
+        for rule_id, rule in indexed_rules.items():
             documents_to_add.append(json.dumps(rule, ensure_ascii=False))
             metadatas.append({
                 "type": "regulation_rule",
@@ -115,8 +455,9 @@ class RAGEngine:
             })
             ids.append(rule_id)
         
-        self.vector_store.add_documents(documents_to_add, metadatas, ids)
-        self.knowledge_base.extend(rules)
+        self._delete_stale(build, previous, ids)
+        build.add_documents(documents_to_add, metadatas, ids)
+        build.add_rules(indexed_rules)
     
     def retrieve(self, query: str, n_results: int = 5) -> List[Dict[str, Any]]:
         results = self.vector_store.query([query], n_results=n_results)
@@ -125,9 +466,11 @@ class RAGEngine:
         documents = results.get("documents", [[]])[0]
         metadatas = results.get("metadatas", [[]])[0]
         distances = results.get("distances", [[]])[0]
+        ids = results.get("ids", [[]])[0] or [None] * len(documents)
         
-        for doc, meta, dist in zip(documents, metadatas, distances):
+        for doc_id, doc, meta, dist in zip(ids, documents, metadatas, distances):
             retrieved_docs.append({
+                "id": doc_id,
                 "content": doc,
                 "metadata": meta,
                 "relevance_score": 1 - dist
@@ -146,6 +489,42 @@ class RAGEngine:
         if not docs:
             return []
         
+        query_hash = generate_id(query.strip())
+        uncached = []
+        for doc in docs:
+            cache_key = self._rerank_cache_key(query_hash, doc)
+            score = self.rerank_cache.get(cache_key) if self.rerank_cache is not None else None
+            if score is None:
+                uncached.append((doc, cache_key))
+            else:
+                doc["llm_relevance_score"] = score
+        
+        if uncached:
+            score_map = self._score_with_llm(query, [doc for doc, _ in uncached])
+            
+            for i, (doc, cache_key) in enumerate(uncached):
+                if score_map is None:
+                    doc["llm_relevance_score"] = NEUTRAL_RELEVANCE_SCORE
+                    continue
+                if i not in score_map:
+                    doc["llm_relevance_score"] = 0
+                    continue
+                doc["llm_relevance_score"] = score_map[i]
+                if self.rerank_cache is not None:
+                    self.rerank_cache.set(cache_key, score_map[i])
+            
+            if self.rerank_cache is not None:
+                self.rerank_cache.save_if_due()
+        
+        docs.sort(key=lambda x: x.get("llm_relevance_score", 0), reverse=True)
+        return docs
+    
+    def _rerank_cache_key(self, query_hash: str, doc: Dict[str, Any]) -> str:
+        snippet = doc["content"][:500]
+        doc_id = doc.get("id") or generate_id(snippet)
+        return f"{query_hash}:{doc_id}:{generate_id(snippet)}"
+    
+    def _score_with_llm(self, query: str, docs: List[Dict[str, Any]]) -> Optional[Dict[int, float]]:
         system_prompt = """你是一个相关性评估专家。请评估每个文档片段与查询问题的相关性程度。
 返回一个JSON数组，每个元素包含：
 - index: 文档索引（从0开始）
@@ -160,25 +539,26 @@ class RAGEngine:
         )
         
         try:
-            result = llm_client.chat_json(system_prompt, user_message)
+            result = llm_client.chat_json(system_prompt, user_message, caller="rerank")
             
             if isinstance(result, list):
-                score_map = {item["index"]: item["relevance_score"] for item in result}
-                for doc in docs:
-                    idx = docs.index(doc)
-                    doc["llm_relevance_score"] = score_map.get(idx, 0)
-                
-                docs.sort(key=lambda x: x.get("llm_relevance_score", 0), reverse=True)
+                return {item["index"]: item["relevance_score"] for item in result}
         except Exception as e:
             print(f"重排序失败: {e}")
         
-        return docs
+        return None
     
-    def generate_answer(self, query: str, context_docs: List[Dict[str, Any]]) -> str:
-        context_text = "\n\n".join(
-            f"【参考文档{i+1}】\n{doc['content'][:1000]}"
-            for i, doc in enumerate(context_docs)
-        )
+    def compress_context(self, query: str, context_docs: List[Dict[str, Any]]) -> Dict[str, Any]:
+        if not CONTEXT_CONFIG.get("compression", True):
+            context_text = "\n\n".join(
+                f"【参考文档{i+1}】\n{doc['content'][:1000]}"
+                for i, doc in enumerate(context_docs)
+            )
+            return {"context": context_text, "compression_ratio": 1.0}
+        return self.context_compressor.compress(query, context_docs)
+    
+    def _answer_prompt(self, query: str, compressed: Dict[str, Any]) -> tuple:
+        context_text = compressed["context"]
         
         system_prompt = """你是一个专业的审计知识助手。请基于提供的参考文档回答用户问题。
 要求：
@@ -188,39 +568,165 @@ class RAGEngine:
 4. 如果涉及具体规则或数值，请准确引用"""
 
         user_message = f"参考文档：\n{context_text}\n\n问题：{query}"
-        
-        return llm_client.chat_with_system(system_prompt, user_message)
+        return system_prompt, user_message
+    
+    def generate_answer(self,
+                        query: str,
+                        context_docs: List[Dict[str, Any]],
+                        compressed: Optional[Dict[str, Any]] = None) -> str:
+        compressed = compressed or self.compress_context(query, context_docs)
+        return llm_client.chat_with_system(*self._answer_prompt(query, compressed), caller="answer")
+    
+    def generate_answer_stream(self,
+                               query: str,
+                               context_docs: List[Dict[str, Any]],
+                               compressed: Optional[Dict[str, Any]] = None) -> Iterator[str]:
+        compressed = compressed or self.compress_context(query, context_docs)
+        return llm_client.chat_stream_with_system(*self._answer_prompt(query, compressed), caller="answer")
     
     def query(self, question: str, n_context: int = 3) -> Dict[str, Any]:
+        if self.semantic_cache is not None:
+            cached = self.semantic_cache.lookup(question, self.kb_version, n_context)
+            if cached is not None:
+                cached["question"] = question
+                return cached
+        
         context_docs = self.retrieve_with_rerank(question, n_results=n_context)
-        answer = self.generate_answer(question, context_docs)
+        compressed = self.compress_context(question, context_docs)
+        answer = self.generate_answer(question, context_docs, compressed)
         
-        return {
+        return self._store_result(question, n_context, context_docs, compressed, answer)
+    
+    def query_stream(self, question: str, n_context: int = 3) -> Iterator[Dict[str, Any]]:
+        if self.semantic_cache is not None:
+            cached = self.semantic_cache.lookup(question, self.kb_version, n_context)
+            if cached is not None:
+                cached["question"] = question
+                yield {"type": "context", "context": cached["context"], "sources": cached["sources"],
+                       "compression": cached.get("compression")}
+                yield {"type": "token", "text": cached["answer"]}
+                yield {"type": "done", "result": cached}
+                return
+        
+        context_docs = self.retrieve_with_rerank(question, n_results=n_context)
+        compressed = self.compress_context(question, context_docs)
+        yield {
+            "type": "context",
+            "context": context_docs,
+            "sources": [d["metadata"] for d in context_docs],
+            "compression": {k: v for k, v in compressed.items() if k != "context"}
+        }
+        
+        parts = []
+        for delta in self.generate_answer_stream(question, context_docs, compressed):
+            parts.append(delta)
+            yield {"type": "token", "text": delta}
+        
+        result = self._store_result(question, n_context, context_docs, compressed, "".join(parts))
+        yield {"type": "done", "result": result}
+    
+    def _store_result(self,
+                      question: str,
+                      n_context: int,
+                      context_docs: List[Dict[str, Any]],
+                      compressed: Dict[str, Any],
+                      answer: str) -> Dict[str, Any]:
+        result = {
             "question": question,
             "answer": answer,
             "context": context_docs,
-            "sources": [d["metadata"] for d in context_docs]
+            "sources": [d["metadata"] for d in context_docs],
+            "compression": {k: v for k, v in compressed.items() if k != "context"}
         }
+        
+        if self.semantic_cache is not None:
+            self.semantic_cache.store(question, result, self.kb_version, n_context)
+        
+        return result
     
     def get_all_rules(self) -> List[Dict[str, Any]]:
-        return self.knowledge_base
+        return self.rule_index.all()
+    
+    def export_snapshot(self, filepath: str) -> Dict[str, Any]:
+        documents = self.vector_store.get_documents()
+        snapshot = {
+            "format": SNAPSHOT_FORMAT,
+            "format_version": SNAPSHOT_FORMAT_VERSION,
+            "kb_version": self.kb_version,
+            "rules": self.rule_index.snapshot(),
+            "documents": documents
+        }
+        save_json(snapshot, Path(filepath))
+        
+        return {
+            "path": str(filepath),
+            "kb_version": snapshot["kb_version"],
+            "rule_count": len(snapshot["rules"]),
+            "document_count": len(documents["ids"])
+        }
+    
+    def import_snapshot(self, filepath: str, batch_size: int = 500) -> Dict[str, Any]:
+        snapshot = load_json(Path(filepath))
+        if snapshot.get("format") != SNAPSHOT_FORMAT:
+            raise ValueError(f"不是有效的知识库快照: {filepath}")
+        if snapshot.get("format_version", 0) > SNAPSHOT_FORMAT_VERSION:
+            raise ValueError(f"不支持的快照版本: {snapshot.get('format_version')}")
+        
+        documents = snapshot.get("documents", {})
+        ids = documents.get("ids", [])
+        
+        staging = self.vector_store.begin_rebuild()
+        try:
+            for start in range(0, len(ids), batch_size):
+                end = start + batch_size
+                staging.add_documents(
+                    documents["documents"][start:end],
+                    documents["metadatas"][start:end],
+                    ids[start:end]
+                )
+        except Exception:
+            self.vector_store.abort_rebuild(staging)
+            raise
+        
+        build = KnowledgeBuild(staging, RuleIndex(), None)
+        build.rule_index.add_many(snapshot.get("rules", {}))
+        self._commit_build(build, max(self.kb_version + 1, snapshot.get("kb_version", 0)))
+        
+        return {
+            "path": str(filepath),
+            "kb_version": self.kb_version,
+            "rule_count": len(snapshot.get("rules", {})),
+            "document_count": len(ids)
+        }
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        return {
+            "rerank": self.rerank_cache.stats() if self.rerank_cache is not None else None,
+            "semantic": self.semantic_cache.stats() if self.semantic_cache is not None else None,
+            "kb_version": self.kb_version
+        }
     
     def find_applicable_rules(self, config_data: Dict[str, Any]) -> List[Dict[str, Any]]:
         config_text = json.dumps(config_data, ensure_ascii=False)
         
         query = f"适用于以下配置的审计规则: {config_text[:500]}"
-        relevant_docs = self.retrieve(query, n_results=10)
-        
-        applicable_rules = []
-        for doc in relevant_docs:
-            if doc["metadata"].get("type") in ["rule", "regulation_rule"]:
-                try:
-                    rule = json.loads(doc["content"])
-                    applicable_rules.append(rule)
-                except:
-                    pass
-        
-        return applicable_rules
-
+        results = self.vector_store.query([query], n_results=10, where=RuleIndex.where_filter())
+        rule_ids = results.get("ids", [[]])[0]
+        
+        missing = self.rule_index.missing(rule_ids)
+        if missing:
+            self._backfill_rule_index(missing, results)
+        
+        return self.rule_index.get_many(rule_ids)
+    
+    def _backfill_rule_index(self, rule_ids: List[str], results: Dict[str, Any]) -> None:
+        wanted = set(rule_ids)
+        pairs = [(rule_id, doc) for rule_id, doc in zip(results.get("ids", [[]])[0],
+                                                       results.get("documents", [[]])[0])
+                 if rule_id in wanted]
+        self.rule_index.add_many(self._decode_rule_documents({
+            "ids": [rule_id for rule_id, _ in pairs],
+            "documents": [doc for _, doc in pairs]
+        }))
 
-rag_engine = RAGEngine()
+rag_engine = LazyProxy(RAGEngine)
@@ -1,100 +1,263 @@
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Iterable, Iterator
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+import atexit
 import json
+import os
 import re
+import threading
+import weakref
+
+from utils.keyword_matcher import PolicyKeywordClassifier, policy_classifier
+from utils.compiled_rule import CompiledRule
+from config.settings import RULE_EXTRACTION_CONFIG
+
+
+VALUE_PATTERN = re.compile(
+    r'\d+(?:\.\d+)?(?:万|千|百)?(?:元|%)?'
+    r'|[一二三四五六七八九十]+(?:万|千|百)?(?:元|%)?'
+)
+
+
+def iter_paragraphs(texts: Iterable[str]) -> Iterator[str]:
+    for text in texts:
+        for para in text.split('\n'):
+            para = para.strip()
+            if para:
+                yield para
+
+
+_extractors: "weakref.WeakSet[RuleExtractor]" = weakref.WeakSet()
+_worker_extractor: Optional["RuleExtractor"] = None
+
+
+@atexit.register
+def _shutdown_extractors() -> None:
+    for extractor in list(_extractors):
+        extractor.shutdown()
+
+
+def _init_worker(config: Dict[str, Any], backend: str) -> None:
+    global _worker_extractor
+    _worker_extractor = RuleExtractor(config)
+    if _worker_extractor.classifier.matcher.backend != backend:
+        _worker_extractor.classifier = PolicyKeywordClassifier(backend)
+
+
+def _extract_chunk(paragraphs: List[str]) -> List[Dict[str, Any]]:
+    return _worker_extractor._extract_by_patterns(paragraphs)
+
+
+def _extract_document(texts: List[str]) -> List[Dict[str, Any]]:
+    return list(_worker_extractor.iter_rules(texts))
 
 
 class RuleExtractor:
-    def __init__(self):
-        self.rule_patterns = [
-            r'(.{0,50})(不得|禁止|必须|应当|要求)(.{0,100})',
-            r'(.{0,30})(限额|上限|下限|范围)(.{0,50})(\d+(?:\.\d+)?(?:万|千|百)?(?:元|%)?)',
-            r'(.{0,30})(条件|标准|要求)(.{0,100})',
-        ]
+    def __init__(self, config: Dict[str, Any] = None):
+        self.config = config or RULE_EXTRACTION_CONFIG
+        self.classifier = policy_classifier
+        self._llm_extractor = None
+        self._executors: Dict[int, ProcessPoolExecutor] = {}
+        self._executor_lock = threading.Lock()
+    
+    @property
+    def extraction_method(self) -> str:
+        return self.config.get("extraction_method", "pattern")
+    
+    @property
+    def llm_extractor(self):
+        if self._llm_extractor is None:
+            from .llm_rule_extractor import LLMRuleExtractor
+            self._llm_extractor = LLMRuleExtractor(
+                fallback=self._extract_paragraph,
+                compile_fn=self.compile,
+                config=self.config
+            )
+        return self._llm_extractor
     
     def extract_rules(self, text: str) -> List[Dict[str, Any]]:
         rules = []
         
-        pattern_rules = self._extract_by_patterns(text)
-        rules.extend(pattern_rules)
+        if self.extraction_method == "llm":
+            rules.extend(self.llm_extractor.extract(list(iter_paragraphs([text]))))
+        else:
+            pattern_rules = self._extract_by_patterns(iter_paragraphs([text]))
+            rules.extend(pattern_rules)
         
         return self._deduplicate_rules(rules)
     
-    def _extract_by_patterns(self, text: str) -> List[Dict[str, Any]]:
+    def iter_rules(self, texts: Iterable[str]) -> Iterator[Dict[str, Any]]:
+        if self.extraction_method == "llm":
+            yield from self._iter_llm_rules(texts)
+            return
+        
+        seen = set()
+        for para in iter_paragraphs(texts):
+            rule = self._extract_paragraph(para)
+            if rule is not None and self._first_seen(rule, seen):
+                yield rule
+    
+    def _iter_llm_rules(self, texts: Iterable[str]) -> Iterator[Dict[str, Any]]:
+        paragraphs = iter_paragraphs(texts)
+        chunk_size = self.config.get("chunk_size", 2000)
+        seen = set()
+        
+        while True:
+            window = list(islice(paragraphs, chunk_size))
+            if not window:
+                break
+            for rule in self.llm_extractor.extract(window):
+                if self._first_seen(rule, seen):
+                    yield rule
+    
+    def iter_rules_parallel(self,
+                            texts: Iterable[str],
+                            workers: Optional[int] = None,
+                            chunk_size: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        workers = workers or self.config.get("workers") or os.cpu_count() or 1
+        chunk_size = chunk_size or self.config.get("chunk_size", 2000)
+        
+        if workers <= 1 or self.extraction_method == "llm":
+            yield from self.iter_rules(texts)
+            return
+        
+        paragraphs = iter_paragraphs(texts)
+        seen = set()
+        pending = deque()
+        executor = self._executor(workers)
+        
+        try:
+            while True:
+                while len(pending) < workers * 2:
+                    chunk = list(islice(paragraphs, chunk_size))
+                    if not chunk:
+                        break
+                    pending.append(executor.submit(_extract_chunk, chunk))
+                
+                if not pending:
+                    break
+                
+                for rule in pending.popleft().result():
+                    if self._first_seen(rule, seen):
+                        yield rule
+        finally:
+            for future in pending:
+                future.cancel()
+    
+    def iter_document_rules(self,
+                            documents: Iterable[List[str]],
+                            workers: Optional[int] = None) -> Iterator[List[Dict[str, Any]]]:
+        workers = workers or self.config.get("workers") or 1
+        
+        if workers <= 1 or self.extraction_method == "llm":
+            for texts in documents:
+                yield list(self.iter_rules(texts))
+            return
+        
+        documents = iter(documents)
+        pending = deque()
+        executor = self._executor(workers)
+        
+        try:
+            while True:
+                while len(pending) < workers * 2:
+                    texts = next(documents, None)
+                    if texts is None:
+                        break
+                    pending.append(executor.submit(_extract_document, texts))
+                
+                if not pending:
+                    break
+                
+                yield pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
+    
+    def _executor(self, workers: int) -> ProcessPoolExecutor:
+        with self._executor_lock:
+            executor = self._executors.get(workers)
+            if executor is None or getattr(executor, "_broken", False):
+                executor = ProcessPoolExecutor(
+                    max_workers=workers,
+                    initializer=_init_worker,
+                    initargs=(self.config, self.classifier.matcher.backend)
+                )
+                self._executors[workers] = executor
+                _extractors.add(self)
+            return executor
+    
+    def shutdown(self) -> None:
+        with self._executor_lock:
+            executors = list(self._executors.values())
+            self._executors.clear()
+        for executor in executors:
+            executor.shutdown(wait=True, cancel_futures=True)
+    
+    def _extract_by_patterns(self, paragraphs: Iterable[str]) -> List[Dict[str, Any]]:
         rules = []
-        paragraphs = text.split('\n')
         
         for para in paragraphs:
-            para = para.strip()
-            if not para:
-                continue
-            
-            if self._contains_rule(para):
-                rule = {
-                    "source_text": para,
-                    "rule_type": self._determine_rule_type(para),
-                    "constraint_type": self._extract_constraint_type(para),
-                    "constraint_value": self._extract_values(para),
-                    "extraction_method": "pattern"
-                }
+            rule = self._extract_paragraph(para)
+            if rule is not None:
                 rules.append(rule)
         
         return rules
     
+    def _extract_paragraph(self, para: str) -> Optional[Dict[str, Any]]:
+        matched = self.classifier.scan(para)
+        if not self.classifier.contains_rule(matched):
+            return None
+        
+        rule = {
+            "source_text": para,
+            "rule_type": self.classifier.rule_type(matched),
+            "constraint_type": self.classifier.constraint_type(matched),
+            "constraint_value": self._extract_values(para),
+            "extraction_method": "pattern"
+        }
+        rule["compiled"] = self.compile(rule).to_dict()
+        return rule
+    
+    def compile(self, rule: Dict[str, Any]) -> CompiledRule:
+        return CompiledRule.from_text(
+            rule.get("source_text", ""),
+            rule.get("rule_type", ""),
+            rule.get("constraint_type", "")
+        )
+    
     def _contains_rule(self, text: str) -> bool:
-        rule_keywords = [
-            "应当", "必须", "不得", "禁止", "要求", "规定",
-            "限额", "上限", "下限", "范围", "条件", "标准",
-            "不超过", "不得超过", "不得少于", "仅限"
-        ]
-        return any(kw in text for kw in rule_keywords)
+        return self.classifier.contains_rule(self.classifier.scan(text))
     
     def _determine_rule_type(self, text: str) -> str:
-        if any(kw in text for kw in ['不得', '禁止', '严禁']):
-            return "禁止事项"
-        elif any(kw in text for kw in ['必须', '应当', '需要']):
-            return "必做事项"
-        elif any(kw in text for kw in ['限额', '上限', '不超过', '不得超过']):
-            return "上限约束"
-        elif any(kw in text for kw in ['下限', '不低于', '不少于', '不得少于']):
-            return "下限约束"
-        elif any(kw in text for kw in ['仅限', '范围']):
-            return "范围限制"
-        else:
-            return "条件约束"
+        return self.classifier.rule_type(self.classifier.scan(text))
     
     def _extract_constraint_type(self, text: str) -> str:
-        constraint_keywords = {
-            "金额": ["金额", "费用", "成本", "预算", "元"],
-            "比例": ["比例", "百分比", "%", "折扣"],
-            "范围": ["范围", "对象", "用户", "渠道", "仅限"],
-            "时间": ["时间", "期限", "日期", "周期", "天"],
-            "数量": ["数量", "次数", "件数", "人数"]
-        }
-        
-        for ctype, keywords in constraint_keywords.items():
-            if any(kw in text for kw in keywords):
-                return ctype
-        
-        return "其他"
+        return self.classifier.constraint_type(self.classifier.scan(text))
     
     def _extract_values(self, text: str) -> List[str]:
-        value_patterns = [
-            r'\d+(?:\.\d+)?(?:万|千|百)?(?:元|%)?',
-            r'[一二三四五六七八九十]+(?:万|千|百)?(?:元|%)?',
-        ]
-        
-        values = []
-        for pattern in value_patterns:
-            values.extend(re.findall(pattern, text))
-        
-        return list(set(values))
+        return list(set(VALUE_PATTERN.findall(text)))
+    
+    def _dedup_key(self, rule: Dict[str, Any]) -> str:
+        source = rule.get("source_text", "")[:100]
+        if rule.get("extraction_method") == "llm":
+            return f"{source}|{rule.get('constraint_field', '')}|{rule.get('description', '')[:50]}"
+        return source
+    
+    def _first_seen(self, rule: Dict[str, Any], seen: set) -> bool:
+        key = self._dedup_key(rule)
+        if key in seen:
+            return False
+        seen.add(key)
+        return True
     
     def _deduplicate_rules(self, rules: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         seen = set()
         unique_rules = []
         
         for rule in rules:
-            source = rule.get("source_text", "")[:100]
+            source = self._dedup_key(rule)
             if source not in seen:
                 seen.add(source)
                 unique_rules.append(rule)
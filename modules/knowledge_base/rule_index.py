@@ -0,0 +1,101 @@
+from typing import Dict, List, Any, Optional, Iterable, Callable
+import threading
+
+from .rule_store import RuleStore
+
+
+RULE_DOC_TYPES = ("rule", "regulation_rule")
+
+
+class RuleIndex:
+    def __init__(self,
+                 store: Optional[RuleStore] = None,
+                 reconcile: Optional[Callable[[Dict[str, Dict[str, Any]]], Dict[str, Dict[str, Any]]]] = None):
+        self.store = store
+        self.reconcile = reconcile
+        self._rules: Dict[str, Dict[str, Any]] = {}
+        self._loaded = store is None
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def where_filter() -> Dict[str, Any]:
+        return {"type": {"$in": list(RULE_DOC_TYPES)}}
+
+    def _ensure_loaded(self) -> None:
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            rules = self.store.load_all()
+            if self.reconcile is not None:
+                rules = self.reconcile(rules)
+            rules.update(self._rules)
+            self._rules = rules
+            self._loaded = True
+
+    def add(self, rule_id: str, rule: Dict[str, Any]) -> None:
+        self.add_many({rule_id: rule})
+
+    def add_many(self, rules: Dict[str, Dict[str, Any]]) -> None:
+        self._ensure_loaded()
+        with self._lock:
+            self._rules.update(rules)
+            if self.store is not None:
+                self.store.upsert_rules(rules)
+
+    def get(self, rule_id: str) -> Optional[Dict[str, Any]]:
+        self._ensure_loaded()
+        return self._rules.get(rule_id)
+
+    def get_many(self, rule_ids: Iterable[str]) -> List[Dict[str, Any]]:
+        self._ensure_loaded()
+        rules = self._rules
+        return [rules[rule_id] for rule_id in rule_ids if rule_id in rules]
+
+    def missing(self, rule_ids: Iterable[str]) -> List[str]:
+        self._ensure_loaded()
+        return [rule_id for rule_id in rule_ids if rule_id not in self._rules]
+
+    def all(self) -> List[Dict[str, Any]]:
+        self._ensure_loaded()
+        return list(self._rules.values())
+
+    def ids(self) -> List[str]:
+        self._ensure_loaded()
+        return list(self._rules.keys())
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        self._ensure_loaded()
+        return dict(self._rules)
+
+    def remove(self, rule_ids: Iterable[str]) -> None:
+        rule_ids = list(rule_ids)
+        self._ensure_loaded()
+        with self._lock:
+            for rule_id in rule_ids:
+                self._rules.pop(rule_id, None)
+            if self.store is not None:
+                self.store.delete(rule_ids)
+
+    def replace(self, rules: Dict[str, Dict[str, Any]]) -> None:
+        with self._lock:
+            if self.store is not None:
+                self.store.replace_all(rules)
+            self._rules = dict(rules)
+            self._loaded = True
+
+    def clear(self) -> None:
+        with self._lock:
+            self._rules.clear()
+            self._loaded = True
+            if self.store is not None:
+                self.store.clear()
+
+    def __contains__(self, rule_id: str) -> bool:
+        self._ensure_loaded()
+        return rule_id in self._rules
+
+    def __len__(self) -> int:
+        self._ensure_loaded()
+        return len(self._rules)
@@ -0,0 +1,132 @@
+from typing import Dict, List, Any, Optional, Iterable
+from pathlib import Path
+import json
+import sqlite3
+import threading
+import time
+
+
+SCHEMA_VERSION = 1
+
+
+class RuleStore:
+    def __init__(self, db_path: str):
+        self.db_path = Path(db_path)
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.RLock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS rules (
+                    rule_id TEXT PRIMARY KEY,
+                    source TEXT,
+                    rule_type TEXT,
+                    payload TEXT NOT NULL,
+                    updated_at REAL
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS meta (
+                    key TEXT PRIMARY KEY,
+                    value TEXT
+                )
+            """)
+            conn.execute(
+                "INSERT OR IGNORE INTO meta (key, value) VALUES ('schema_version', ?)",
+                (str(SCHEMA_VERSION),)
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def upsert_rules(self, rules: Dict[str, Dict[str, Any]]) -> None:
+        if not rules:
+            return
+
+        now = time.time()
+        rows = [
+            (rule_id, rule.get("source", ""), rule.get("rule_type", ""),
+             json.dumps(rule, ensure_ascii=False), now)
+            for rule_id, rule in rules.items()
+        ]
+        with self._lock:
+            conn = self._connect()
+            conn.executemany(
+                "INSERT OR REPLACE INTO rules (rule_id, source, rule_type, payload, updated_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                rows
+            )
+            conn.commit()
+
+    def replace_all(self, rules: Dict[str, Dict[str, Any]]) -> None:
+        now = time.time()
+        rows = [
+            (rule_id, rule.get("source", ""), rule.get("rule_type", ""),
+             json.dumps(rule, ensure_ascii=False), now)
+            for rule_id, rule in rules.items()
+        ]
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.execute("DELETE FROM rules")
+                conn.executemany(
+                    "INSERT INTO rules (rule_id, source, rule_type, payload, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    rows
+                )
+
+    def load_all(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            rows = self._connect().execute("SELECT rule_id, payload FROM rules").fetchall()
+        return {rule_id: json.loads(payload) for rule_id, payload in rows}
+
+    def ids(self) -> List[str]:
+        with self._lock:
+            rows = self._connect().execute("SELECT rule_id FROM rules").fetchall()
+        return [row[0] for row in rows]
+
+    def delete(self, rule_ids: Iterable[str]) -> None:
+        rule_ids = [(rule_id,) for rule_id in rule_ids]
+        if not rule_ids:
+            return
+        with self._lock:
+            conn = self._connect()
+            conn.executemany("DELETE FROM rules WHERE rule_id = ?", rule_ids)
+            conn.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM rules")
+            conn.commit()
+
+    def count(self) -> int:
+        with self._lock:
+            return self._connect().execute("SELECT COUNT(*) FROM rules").fetchone()[0]
+
+    def get_meta(self, key: str, default: Optional[str] = None) -> Optional[str]:
+        with self._lock:
+            row = self._connect().execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def set_meta(self, key: str, value: str) -> None:
+        with self._lock:
+            conn = self._connect()
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+            conn.commit()
+
+    def get_version(self) -> int:
+        return int(self.get_meta("kb_version", "0"))
+
+    def set_version(self, version: int) -> None:
+        self.set_meta("kb_version", str(version))
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,155 @@
+from typing import Dict, List, Any, Optional, Callable
+from collections import OrderedDict
+import threading
+import time
+
+import numpy as np
+
+
+class SemanticCache:
+    def __init__(self,
+                 embed_fn: Callable[[List[str]], List[List[float]]],
+                 threshold: float = 0.85,
+                 max_size: int = 1000,
+                 ttl: Optional[float] = None):
+        self.embed_fn = embed_fn
+        self.threshold = threshold
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._matrix: Optional[np.ndarray] = None
+        self._matrix_keys: List[str] = []
+        self._last_embedding: Optional[tuple] = None
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.exact_hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def lookup(self,
+               question: str,
+               kb_version: int,
+               n_context: int = 3) -> Optional[Dict[str, Any]]:
+        key = self._normalize(question)
+
+        with self._lock:
+            self._drop_expired()
+
+            entry = self._entries.get(key)
+            if entry is not None and self._is_usable(entry, kb_version, n_context):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                self.exact_hits += 1
+                return self._as_hit(entry, 1.0)
+
+            if not self._entries:
+                self.misses += 1
+                return None
+
+        embedding = self._embed(question)
+        self._last_embedding = (key, embedding)
+
+        with self._lock:
+            matrix = self._get_matrix()
+            if embedding is None or matrix is None:
+                self.misses += 1
+                return None
+
+            scores = matrix @ embedding
+            for idx in np.argsort(-scores):
+                if scores[idx] < self.threshold:
+                    break
+                entry = self._entries.get(self._matrix_keys[idx])
+                if entry is not None and self._is_usable(entry, kb_version, n_context):
+                    self._entries.move_to_end(self._matrix_keys[idx])
+                    self.hits += 1
+                    return self._as_hit(entry, float(scores[idx]))
+
+            self.misses += 1
+            return None
+
+    def store(self,
+              question: str,
+              result: Dict[str, Any],
+              kb_version: int,
+              n_context: int = 3) -> None:
+        key = self._normalize(question)
+        last = self._last_embedding
+        embedding = last[1] if last is not None and last[0] == key else self._embed(question)
+        if embedding is None:
+            return
+
+        with self._lock:
+            self._entries[key] = {
+                "question": question,
+                "embedding": embedding,
+                "result": result,
+                "kb_version": kb_version,
+                "n_context": n_context,
+                "expires_at": time.time() + self.ttl if self.ttl else None
+            }
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+            self._matrix = None
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._matrix = None
+            self._matrix_keys = []
+            self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "threshold": self.threshold,
+            "hits": self.hits,
+            "exact_hits": self.exact_hits,
+            "semantic_hits": self.hits - self.exact_hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "hit_rate": self.hits / total if total else 0.0
+        }
+
+    def _embed(self, text: str) -> Optional[np.ndarray]:
+        try:
+            vector = np.asarray(self.embed_fn([text])[0], dtype=np.float32)
+        except Exception as e:
+            print(f"语义缓存向量化失败: {e}")
+            return None
+
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else None
+
+    def _get_matrix(self) -> Optional[np.ndarray]:
+        if self._matrix is None and self._entries:
+            self._matrix_keys = list(self._entries.keys())
+            self._matrix = np.stack([self._entries[k]["embedding"] for k in self._matrix_keys])
+        return self._matrix
+
+    def _drop_expired(self) -> None:
+        now = time.time()
+        expired = [k for k, e in self._entries.items()
+                   if e["expires_at"] is not None and e["expires_at"] <= now]
+        for key in expired:
+            del self._entries[key]
+        if expired:
+            self._matrix = None
+
+    def _is_usable(self, entry: Dict[str, Any], kb_version: int, n_context: int) -> bool:
+        return entry["kb_version"] == kb_version and entry["n_context"] == n_context
+
+    def _as_hit(self, entry: Dict[str, Any], similarity: float) -> Dict[str, Any]:
+        result = dict(entry["result"])
+        result["cache"] = {
+            "hit": True,
+            "matched_question": entry["question"],
+            "similarity": similarity
+        }
+        return result
+
+    @staticmethod
+    def _normalize(question: str) -> str:
+        return "".join(question.split())
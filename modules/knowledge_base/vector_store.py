@@ -1,41 +1,195 @@
 from typing import Dict, List, Any, Optional
+import json
 import os
+import re
+import threading
 from pathlib import Path
 
-try:
-    import chromadb
-    from chromadb.config import Settings
-    CHROMADB_AVAILABLE = True
-except ImportError:
-    CHROMADB_AVAILABLE = False
+from config.settings import VECTOR_STORE_CONFIG, EMBEDDING_CONFIG, DATA_DIR
+from utils.lazy import LazyProxy
+from .embeddings import Embedder, create_embedder
 
-from config.settings import VECTOR_STORE_CONFIG, DATA_DIR
+
+def _import_chromadb():
+    try:
+        import chromadb
+        return chromadb
+    except ImportError:
+        return None
 
 
 class VectorStore:
-    def __init__(self, config: Dict[str, Any] = None):
+    def __init__(self,
+                 config: Dict[str, Any] = None,
+                 client=None,
+                 collection_name: Optional[str] = None,
+                 embedder: Optional[Embedder] = None):
         self.config = config or VECTOR_STORE_CONFIG
-        self.client = None
+        self.client = client
         self.collection = None
+        self.collection_name = collection_name
+        self.version = 0
+        self.embedder = embedder or create_embedder()
+        self._rebuild_lock = threading.Lock()
+        self._staging_name: Optional[str] = None
+        self._max_batch_size: Optional[int] = None
         self._init_store()
     
+    @property
+    def base_name(self) -> str:
+        name = self.config.get("collection_name", "audit_knowledge")
+        if self.embedder.name == "chroma":
+            return name
+        return f"{name}_{self.embedder.signature}"
+    
+    @property
+    def persist_dir(self) -> Path:
+        return Path(self.config.get("persist_directory", str(DATA_DIR / "vector_db")))
+    
     def _init_store(self):
-        if not CHROMADB_AVAILABLE:
-            print("Warning: chromadb not available, using in-memory storage")
-            self._use_memory_storage()
-            return
-        
-        persist_dir = self.config.get("persist_directory", str(DATA_DIR / "vector_db"))
-        Path(persist_dir).mkdir(parents=True, exist_ok=True)
+        if self.client is None:
+            chromadb = _import_chromadb()
+            if chromadb is None:
+                if self.collection_name is None:
+                    print("Warning: chromadb not available, using in-memory storage")
+                if self.embedder.name == "chroma":
+                    self.embedder = create_embedder({**EMBEDDING_CONFIG, "backend": "hashing"})
+                self._use_memory_storage()
+                return
+            
+            self.persist_dir.mkdir(parents=True, exist_ok=True)
+            self.client = chromadb.PersistentClient(path=str(self.persist_dir))
         
-        self.client = chromadb.PersistentClient(path=persist_dir)
+        if self.collection_name is None:
+            pointer = self._read_pointer()
+            self.collection_name = pointer.get("active", self.base_name)
+        self.version = self._parse_version(self.collection_name)
         
-        collection_name = self.config.get("collection_name", "audit_knowledge")
         self.collection = self.client.get_or_create_collection(
-            name=collection_name,
-            metadata={"description": "审计知识库向量存储"}
+            name=self.collection_name,
+            metadata={"description": "审计知识库向量存储", "embedding": self.embedder.signature}
         )
     
+    @property
+    def pointer_path(self) -> Path:
+        return self.persist_dir / f"{self.base_name}.active.json"
+    
+    def _read_pointer(self) -> Dict[str, Any]:
+        path = self.pointer_path
+        if not path.exists():
+            return {}
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"读取知识库版本指针失败: {e}")
+            return {}
+    
+    def _write_pointer(self, pointer: Dict[str, Any]) -> None:
+        path = self.pointer_path
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(pointer, f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    
+    def _parse_version(self, name: str) -> int:
+        match = re.fullmatch(re.escape(self.base_name) + r"__v(\d+)", name or "")
+        return int(match.group(1)) if match else 0
+    
+    def _version_name(self, version: int) -> str:
+        return f"{self.base_name}__v{version}"
+    
+    def list_versions(self) -> List[str]:
+        if self.client is None:
+            return []
+        names = [getattr(c, "name", c) for c in self.client.list_collections()]
+        versions = [n for n in names if n == self.base_name or self._parse_version(n) > 0]
+        return sorted(versions, key=self._parse_version)
+    
+    @property
+    def is_rebuilding(self) -> bool:
+        return self._rebuild_lock.locked()
+    
+    def begin_rebuild(self) -> "VectorStore":
+        if not self._rebuild_lock.acquire(blocking=False):
+            raise RuntimeError("已有知识库重建正在进行")
+        
+        try:
+            if self.client is None:
+                staging = VectorStore(self.config, collection_name=f"{self.base_name}__staging",
+                                      embedder=self.embedder)
+            else:
+                versions = [self._parse_version(n) for n in self.list_versions()]
+                version = max(versions + [self.version]) + 1
+                staging = VectorStore(self.config, client=self.client,
+                                      collection_name=self._version_name(version),
+                                      embedder=self.embedder)
+            self._staging_name = staging.collection_name
+            return staging
+        except Exception:
+            self._rebuild_lock.release()
+            raise
+    
+    def commit_rebuild(self, staging: "VectorStore") -> None:
+        try:
+            if self.client is None:
+                self.memory_store = staging.memory_store
+                return
+            
+            pointer = self._read_pointer()
+            history = [n for n in pointer.get("history", []) if n != staging.collection_name]
+            history.append(self.collection_name)
+            self._write_pointer({"active": staging.collection_name, "history": history})
+            
+            self.collection = staging.collection
+            self.collection_name = staging.collection_name
+            self.version = staging.version
+        finally:
+            self._staging_name = None
+            self._rebuild_lock.release()
+        
+        self.gc_versions()
+    
+    def abort_rebuild(self, staging: "VectorStore") -> None:
+        try:
+            if self.client is not None and staging.collection_name != self.collection_name:
+                self.client.delete_collection(staging.collection_name)
+        finally:
+            self._staging_name = None
+            self._rebuild_lock.release()
+    
+    def gc_versions(self, retain: Optional[int] = None) -> List[str]:
+        if self.client is None:
+            return []
+        if retain is None:
+            retain = self.config.get("retain_versions", 2)
+        
+        pointer = self._read_pointer()
+        keep = {self.collection_name}
+        if retain > 1:
+            keep.update(pointer.get("history", [])[-(retain - 1):])
+        if self._staging_name is not None:
+            keep.add(self._staging_name)
+        
+        removed = []
+        for name in self.list_versions():
+            if name not in keep:
+                self.client.delete_collection(name)
+                removed.append(name)
+        
+        if "history" in pointer:
+            pointer["history"] = [n for n in pointer["history"] if n in keep]
+            self._write_pointer(pointer)
+        return removed
+    
+    @property
+    def max_batch_size(self) -> int:
+        if self._max_batch_size is None:
+            self._max_batch_size = self.client.get_max_batch_size() if self.client is not None else 5000
+        return self._max_batch_size
+    
     def _use_memory_storage(self):
         self.memory_store = {
             "documents": [],
@@ -54,15 +208,43 @@ class VectorStore:
             metadatas = [{} for _ in documents]
         
         if self.collection is not None:
-            self.collection.add(
-                documents=documents,
-                metadatas=metadatas,
-                ids=ids
-            )
+            batch_size = self.max_batch_size
+            for start in range(0, len(documents), batch_size):
+                end = start + batch_size
+                self.collection.upsert(
+                    documents=documents[start:end],
+                    embeddings=self.embedder.embed(documents[start:end]),
+                    metadatas=metadatas[start:end],
+                    ids=ids[start:end]
+                )
+        else:
+            store = self.memory_store
+            positions = {doc_id: i for i, doc_id in enumerate(store["ids"])}
+            for doc_id, document, metadata in zip(ids, documents, metadatas):
+                if doc_id in positions:
+                    store["documents"][positions[doc_id]] = document
+                    store["metadatas"][positions[doc_id]] = metadata
+                else:
+                    positions[doc_id] = len(store["ids"])
+                    store["documents"].append(document)
+                    store["metadatas"].append(metadata)
+                    store["ids"].append(doc_id)
+    
+    def update_documents(self, ids: List[str], documents: List[str]) -> None:
+        if self.collection is not None:
+            batch_size = self.max_batch_size
+            for start in range(0, len(ids), batch_size):
+                end = start + batch_size
+                self.collection.update(
+                    ids=ids[start:end],
+                    documents=documents[start:end],
+                    embeddings=self.embedder.embed(documents[start:end])
+                )
         else:
-            self.memory_store["documents"].extend(documents)
-            self.memory_store["metadatas"].extend(metadatas)
-            self.memory_store["ids"].extend(ids)
+            positions = {doc_id: i for i, doc_id in enumerate(self.memory_store["ids"])}
+            for doc_id, document in zip(ids, documents):
+                if doc_id in positions:
+                    self.memory_store["documents"][positions[doc_id]] = document
     
     def query(self, 
               query_texts: List[str], 
@@ -70,34 +252,104 @@ class VectorStore:
               where: Optional[Dict] = None) -> Dict[str, Any]:
         if self.collection is not None:
             results = self.collection.query(
-                query_texts=query_texts,
+                query_embeddings=self.embedder.embed(query_texts),
                 n_results=n_results,
                 where=where
             )
             return results
         else:
-            return self._memory_query(query_texts[0], n_results)
+            return self._memory_query(query_texts[0], n_results, where)
     
-    def _memory_query(self, query: str, n_results: int) -> Dict[str, Any]:
+    def _memory_query(self, query: str, n_results: int, where: Optional[Dict] = None) -> Dict[str, Any]:
         from difflib import SequenceMatcher
         
+        store = self.memory_store
         docs_with_scores = []
-        for i, doc in enumerate(self.memory_store["documents"]):
+        for i, doc in enumerate(store["documents"]):
+            if where and not self._matches_where(store["metadatas"][i], where):
+                continue
             score = SequenceMatcher(None, query, doc).ratio()
-            docs_with_scores.append((doc, self.memory_store["metadatas"][i], score))
+            docs_with_scores.append((doc, store["metadatas"][i], score, store["ids"][i]))
         
         docs_with_scores.sort(key=lambda x: x[2], reverse=True)
         top_results = docs_with_scores[:n_results]
         
         return {
+            "ids": [[r[3] for r in top_results]],
             "documents": [[r[0] for r in top_results]],
             "metadatas": [[r[1] for r in top_results]],
             "distances": [[1 - r[2] for r in top_results]]
         }
     
+    def _matches_where(self, metadata: Dict[str, Any], where: Dict[str, Any]) -> bool:
+        for key, condition in where.items():
+            if key == "$and":
+                if not all(self._matches_where(metadata, c) for c in condition):
+                    return False
+            elif key == "$or":
+                if not any(self._matches_where(metadata, c) for c in condition):
+                    return False
+            elif isinstance(condition, dict):
+                value = metadata.get(key)
+                for op, expected in condition.items():
+                    if op == "$eq" and value != expected:
+                        return False
+                    if op == "$ne" and value == expected:
+                        return False
+                    if op == "$in" and value not in expected:
+                        return False
+                    if op == "$nin" and value in expected:
+                        return False
+            elif metadata.get(key) != condition:
+                return False
+        return True
+    
+    def embed(self, texts: List[str]):
+        return self.embedder.embed(texts)
+    
+    def get_documents(self,
+                      ids: Optional[List[str]] = None,
+                      where: Optional[Dict] = None,
+                      include_documents: bool = True) -> Dict[str, List]:
+        if self.collection is not None:
+            include = ["documents", "metadatas"] if include_documents else []
+            results = self.collection.get(ids=ids, where=where, include=include)
+            return {
+                "ids": results.get("ids") or [],
+                "documents": results.get("documents") or [],
+                "metadatas": results.get("metadatas") or []
+            }
+        
+        wanted = set(ids) if ids is not None else None
+        selected = {"ids": [], "documents": [], "metadatas": []}
+        for doc_id, doc, meta in zip(self.memory_store["ids"],
+                                     self.memory_store["documents"],
+                                     self.memory_store["metadatas"]):
+            if wanted is not None and doc_id not in wanted:
+                continue
+            if where and not self._matches_where(meta, where):
+                continue
+            selected["ids"].append(doc_id)
+            if include_documents:
+                selected["documents"].append(doc)
+                selected["metadatas"].append(meta)
+        return selected
+    
+    @property
+    def is_persistent(self) -> bool:
+        return self.collection is not None
+    
     def delete(self, ids: List[str]) -> None:
         if self.collection is not None:
-            self.collection.delete(ids=ids)
+            batch_size = self.config.get("delete_batch_size", 1000)
+            for start in range(0, len(ids), batch_size):
+                self.collection.delete(ids=ids[start:start + batch_size])
+        else:
+            removed = set(ids)
+            keep = [i for i, doc_id in enumerate(self.memory_store["ids"]) if doc_id not in removed]
+            self.memory_store = {
+                key: [values[i] for i in keep] for key, values in self.memory_store.items()
+            }
     
     def get_count(self) -> int:
         if self.collection is not None:
@@ -106,11 +358,11 @@ class VectorStore:
     
     def clear(self) -> None:
         if self.collection is not None:
-            ids = self.collection.get()["ids"]
+            ids = self.collection.get(include=[])["ids"]
             if ids:
-                self.collection.delete(ids=ids)
+                self.delete(ids)
         else:
             self.memory_store = {"documents": [], "metadatas": [], "ids": []}
 
 
-vector_store = VectorStore()
+vector_store = LazyProxy(VectorStore)
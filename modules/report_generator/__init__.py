@@ -21,8 +21,9 @@ class ReportGenerator:
         return self.builder.build_violation_list(violations, format)
     
     def save_all_outputs(self, 
-                         audit_result: Dict[str, Any]) -> Dict[str, Path]:
-        return self.builder.generate_full_output(audit_result)
+                         audit_result: Dict[str, Any],
+                         llm_since: Optional[Dict[str, Any]] = None) -> Dict[str, Path]:
+        return self.builder.generate_full_output(audit_result, llm_since)
     
     def quick_report(self, violations: List[Dict[str, Any]]) -> str:
         report_data = {
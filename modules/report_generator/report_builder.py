@@ -6,6 +6,7 @@ import csv
 
 from .templates import ReportTemplates
 from config.settings import OUTPUT_DIR
+from utils.llm_metrics import llm_metrics
 
 
 class ReportBuilder:
@@ -181,7 +182,8 @@ class ReportBuilder:
         return recommendations
     
     def generate_full_output(self, 
-                             audit_result: Dict[str, Any]) -> Dict[str, Path]:
+                             audit_result: Dict[str, Any],
+                             llm_since: Optional[Dict[str, Any]] = None) -> Dict[str, Path]:
         outputs = {}
         
         report = self.build_report(audit_result, "markdown")
@@ -198,6 +200,11 @@ class ReportBuilder:
         json_report = self.build_report(audit_result, "json")
         outputs["json_report"] = self.save_report(json_report["content"], json_report["filename"])
         
+        outputs["llm_usage"] = llm_metrics.save(
+            self.output_dir / f"llm_usage_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
+            since=llm_since
+        )
+        
         return outputs
 
 
@@ -6,6 +6,7 @@
 用于验证各模块功能是否正常工作
 """
 
+import os
 import sys
 import json
 from pathlib import Path
@@ -13,6 +14,15 @@ from pathlib import Path
 project_root = Path(__file__).parent
 sys.path.insert(0, str(project_root))
 
+os.environ.setdefault("EMBEDDING_BACKEND", "hashing")
+
+
+def temp_rule_store():
+    import tempfile
+    from modules.knowledge_base.rule_store import RuleStore
+    
+    return RuleStore(str(Path(tempfile.mkdtemp()) / "rules.db"))
+
 
 def test_document_parser():
     print("\n" + "=" * 50)
@@ -56,7 +66,8 @@ def test_knowledge_base():
     print("测试模块二：知识库构建")
     print("=" * 50)
     
-    from modules.knowledge_base import knowledge_base, rule_extractor
+    import tempfile
+    from modules.knowledge_base import knowledge_base, rule_extractor, RAGEngine, VectorStore
     
     sample_text = """
     单张优惠券金额不得超过500元。
@@ -72,14 +83,1156 @@ def test_knowledge_base():
         print(f"  规则{i}: {rule.get('rule_type', '未知')} - {rule.get('source_text', '')[:40]}...")
     
     print("\n测试知识库查询...")
-    knowledge_base.build_from_documents([{
-        "document_type": "policy_document",
-        "content": [{"text": "优惠券金额不得超过500元"}],
-        "metadata": {"title": "测试政策"}
-    }])
+    engine = RAGEngine(rule_store=temp_rule_store())
+    engine.vector_store = VectorStore({"persist_directory": tempfile.mkdtemp(), "collection_name": "kb_test"})
+    knowledge_base.rag_engine, live_engine = engine, knowledge_base.rag_engine
+    try:
+        knowledge_base.build_from_documents([{
+            "document_type": "policy_document",
+            "content": [{"text": "优惠券金额不得超过500元"}],
+            "metadata": {"title": "测试政策"}
+        }])
+        
+        stats = knowledge_base.get_statistics()
+        print(f"知识库统计: {stats}")
+    finally:
+        knowledge_base.rag_engine = live_engine
+    
+    return True
+
+
+def test_llm_rule_extractor():
+    print("\n" + "=" * 50)
+    print("测试LLM规则提取")
+    print("=" * 50)
+    
+    import re
+    import tempfile
+    from modules.knowledge_base import rule_extractor
+    from modules.knowledge_base.llm_rule_extractor import LLMRuleExtractor, SYSTEM_PROMPT
+    from utils.helpers import estimate_tokens
+    from utils.llm_client import llm_client
+    
+    paragraphs = [f"第{i}条 单张优惠券金额不得超过{i}00元。" for i in range(1, 7)]
+    paragraphs[3] = "第4条 促销活动总预算不得超过100万元。"
+    dropped = paragraphs[3]
+    batch_tokens = estimate_tokens(SYSTEM_PROMPT) + 2 * (estimate_tokens(paragraphs[0]) + 4)
+    cache_path = Path(tempfile.mkdtemp()) / "llm_rule_cache.json"
+    extractor = LLMRuleExtractor(
+        fallback=lambda para: {"source_text": para, "extraction_method": "pattern"},
+        compile_fn=rule_extractor.compile,
+        config={"llm_batch_tokens": batch_tokens, "llm_cache_size": 100,
+                "llm_cache_path": str(cache_path), "llm_cache_save_interval": 3600}
+    )
+    assert len(extractor._pack(paragraphs)) > 1
+    
+    requested = []
+    
+    async def fake_achat_json(system_prompt, user_message, **kwargs):
+        batch = re.findall(r"^\[(\d+)\] (.*)$", user_message, re.M)
+        requested.append([para for _, para in batch])
+        return [{"index": int(i), "rules": [{"rule_type": "上限约束", "constraint_type": "金额"}]}
+                for i, para in batch if para != dropped]
+    
+    llm_client.achat_json = fake_achat_json
+    try:
+        rules = extractor.extract(paragraphs)
+        methods = {rule["source_text"]: rule["extraction_method"] for rule in rules}
+        assert methods[dropped] == "pattern", "回复中缺失的段落应回退到模式提取"
+        assert all(methods[para] == "llm" for para in paragraphs if para != dropped)
+        assert extractor.stats["fallback_paragraphs"] == 1
+        assert len(requested) > 1
+        
+        requested.clear()
+        again = extractor.extract(paragraphs)
+        assert [rule["extraction_method"] for rule in again] == [rule["extraction_method"] for rule in rules]
+        assert requested == [[dropped]], "缺失的段落不应被缓存"
+        assert extractor.stats["cached_paragraphs"] == len(paragraphs) - 1
+        assert extractor.stats["fallback_paragraphs"] == 2
+        assert not cache_path.exists(), "缓存应按保存间隔写盘，而不是每次提取都重写"
+        extractor.cache.flush()
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            assert len(json.load(f)) == len(paragraphs) - 1
+    finally:
+        del llm_client.achat_json
+    
+    print(f"提取统计: {extractor.get_stats()}")
+    
+    return True
+
+
+def test_parallel_rule_extraction():
+    print("\n" + "=" * 50)
+    print("测试并行规则提取")
+    print("=" * 50)
+    
+    from modules.knowledge_base import RuleExtractor, rule_extractor
+    from utils.keyword_matcher import PolicyKeywordClassifier
+    
+    templates = ["单张优惠券金额不得超过{n}元。", "每位用户每月领取次数不超过{n}次。",
+                 "活动有效期不少于{n}天。", "本活动解释权归平台所有，编号{n}。"]
+    texts = ["\n".join(templates[(i + j) % 4].format(n=(i * j) % 7) for j in range(12)) for i in range(8)]
+    
+    serial = list(rule_extractor.iter_rules(texts))
+    parallel = list(rule_extractor.iter_rules_parallel(texts, workers=2, chunk_size=5))
+    print(f"串行规则数: {len(serial)}, 并行规则数: {len(parallel)}")
+    assert parallel == serial and len(serial) < sum(len(t.split("\n")) for t in texts)
+    
+    documents = [texts[:3], texts[3:5], texts[5:]]
+    by_document = list(rule_extractor.iter_document_rules(documents, workers=2))
+    assert by_document == [list(rule_extractor.iter_rules(doc)) for doc in documents]
+    
+    executor = rule_extractor._executor(2)
+    assert list(rule_extractor.iter_rules_parallel(texts, workers=2, chunk_size=5)) == serial
+    assert rule_extractor._executor(2) is executor, "进程池应在多次提取间复用"
+    rule_extractor.shutdown()
+    
+    extractor = RuleExtractor(dict(rule_extractor.config, chunk_size=5))
+    extractor.classifier = PolicyKeywordClassifier("substring")
+    config, backend = extractor._executor(2).submit(worker_extractor_settings).result()
+    print(f"工作进程配置: chunk_size={config['chunk_size']}, 匹配后端={backend}")
+    assert config == extractor.config and backend == "substring", "工作进程应使用调用方实例的配置与匹配后端"
+    assert list(extractor.iter_rules_parallel(texts, workers=2)) == serial
+    extractor.shutdown()
+    
+    return True
+
+
+def worker_extractor_settings():
+    import importlib
+    
+    extractor = importlib.import_module("modules.knowledge_base.rule_extractor")._worker_extractor
+    return extractor.config, extractor.classifier.matcher.backend
+
+
+def test_keyword_classifier():
+    print("\n" + "=" * 50)
+    print("测试关键词分类")
+    print("=" * 50)
+    
+    from utils.keyword_matcher import (
+        PolicyKeywordClassifier, AHOCORASICK_AVAILABLE, RULE_KEYWORDS, DOCUMENT_RULE_KEYWORDS,
+        RULE_TYPE_KEYWORDS, CONSTRAINT_KEYWORDS, OPERATOR_KEYWORDS
+    )
+    
+    def first_group(groups, text, default):
+        return next((name for name, keywords in groups.items() if any(kw in text for kw in keywords)), default)
+    
+    def legacy(text):
+        return {
+            "contains_rule": any(kw in text for kw in RULE_KEYWORDS),
+            "contains_document_rule": any(kw in text for kw in DOCUMENT_RULE_KEYWORDS),
+            "rule_type": first_group(RULE_TYPE_KEYWORDS, text, "条件约束"),
+            "constraint_type": first_group(CONSTRAINT_KEYWORDS, text, "其他"),
+            "operator": first_group(OPERATOR_KEYWORDS, text, "<=")
+        }
+    
+    with open(project_root / "data" / "input" / "sample_policy.json", 'r', encoding='utf-8') as f:
+        policy_data = json.load(f)
+    texts = [item["text"] for item in policy_data["content"]]
+    texts += [table.get("markdown", "") for table in policy_data.get("tables", [])]
+    texts += [line for text in texts for line in text.split("\n")] + ["\n".join(texts), ""]
+    
+    backends = ["substring"] + (["ahocorasick"] if AHOCORASICK_AVAILABLE else [])
+    for backend in backends:
+        classifier = PolicyKeywordClassifier(backend)
+        for text in texts:
+            matched = classifier.scan(text)
+            labels = classifier.classify(text)
+            labels["contains_document_rule"] = classifier.contains_document_rule(matched)
+            del labels["matched"]
+            assert labels == legacy(text), f"{backend} 后端分类结果与逐关键词检查不一致: {text[:30]}"
+    print(f"校验文本数: {len(texts)}, 匹配后端: {backends}")
+    
+    return True
+
+
+def test_policy_chunker():
+    print("\n" + "=" * 50)
+    print("测试政策分块")
+    print("=" * 50)
+    
+    from modules.knowledge_base.chunker import PolicyChunker
+    from utils.helpers import estimate_tokens
+    
+    with open(project_root / "data" / "input" / "sample_policy.json", 'r', encoding='utf-8') as f:
+        policy_data = json.load(f)
+    
+    chunker = PolicyChunker({"max_tokens": 120, "overlap_tokens": 40, "min_tokens": 40, "table_max_tokens": 50})
+    chunks = chunker.chunk_document(policy_data)
+    text_chunks = [c for c in chunks if c["chunk_type"] == "text"]
+    table_chunks = [c for c in chunks if c["chunk_type"] == "table"]
+    
+    print(f"段落数: {len(policy_data['content'])}, 文本分块数: {len(text_chunks)}, 表格分块数: {len(table_chunks)}")
+    assert len(text_chunks) < len(policy_data["content"])
+    assert all(estimate_tokens(c["text"]) <= 120 + 20 for c in text_chunks)
+    assert all(c["text"].startswith("| 活动类型") or c["text"].startswith("| 优惠券类型") for c in table_chunks)
+    assert len(table_chunks) > len(policy_data["tables"])
+    assert "单张优惠券金额不得超过500元" in "".join(c["text"] for c in text_chunks)
+    
+    import tempfile
+    from docx import Document
+    from modules.document_parser.docx_parser import DocxParser
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        docx_path = os.path.join(tmp_dir, "policy.docx")
+        document = Document()
+        document.add_paragraph("单张优惠券金额不得超过500元。")
+        table = document.add_table(rows=3, cols=2)
+        for row, values in zip(table.rows, [("优惠券类型", "面额上限"), ("满减券", "500元"), ("折扣券", "8折")]):
+            for cell, value in zip(row.cells, values):
+                cell.text = value
+        document.save(docx_path)
+        
+        parser = DocxParser()
+        parsed_table = parser.to_json_format(parser.parse(docx_path))["tables"][0]
+        assert parsed_table["data"] == [["满减券", "500元"], ["折扣券", "8折"]], "表头不应重复出现在数据行中"
+        table_text = "".join(c["text"] for c in chunker.chunk_table(parsed_table))
+        assert table_text.count("优惠券类型") == 1
+    
+    from modules.knowledge_base.rag_engine import RAGEngine
+    from modules.knowledge_base.vector_store import VectorStore
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        engine = RAGEngine(rule_store=temp_rule_store())
+        engine.chunker = chunker
+        engine.vector_store = VectorStore({"persist_directory": tmp_dir, "collection_name": "chunk_test"})
+        engine.build_knowledge_base([policy_data])
+        shortened = dict(policy_data, content=policy_data["content"][:2], tables=[])
+        engine.build_knowledge_base([shortened])
+        
+        title = policy_data["metadata"]["title"]
+        stored = engine.vector_store.get_documents(
+            where={"$and": [{"type": "policy"}, {"source": title}]}, include_documents=False
+        )["ids"]
+        expected = [f"policy_{title}_{i}" for i in range(len(chunker.chunk_document(shortened)))]
+        print(f"重新入库后分块: {len(chunks)} -> {len(stored)}")
+        assert sorted(stored) == sorted(expected), "重新入库后不应残留多余的旧分块"
+        
+        revised = dict(shortened["content"][0], text="（已修订）" + shortened["content"][0]["text"])
+        edited = dict(shortened, content=[revised] + shortened["content"][1:])
+        engine.build_knowledge_base([edited])
+        first = engine.vector_store.get_documents(ids=[f"policy_{title}_0"])["documents"]
+        assert len(first) == 1 and "（已修订）" in first[0], "同一ID重新入库应覆盖旧分块内容"
+        
+        memory_store = VectorStore({"persist_directory": tmp_dir, "collection_name": "chunk_memory"})
+        memory_store.collection = None
+        memory_store._use_memory_storage()
+        engine.vector_store = memory_store
+        engine.build_knowledge_base([shortened])
+        engine.build_knowledge_base([edited])
+        memory_ids = memory_store.get_documents(include_documents=False)["ids"]
+        first = memory_store.get_documents(ids=[f"policy_{title}_0"])["documents"]
+        assert len(memory_ids) == len(set(memory_ids)), "内存存储不应出现重复ID"
+        assert len(first) == 1 and "（已修订）" in first[0], "内存存储应按ID覆盖旧分块"
+    
+    return True
+
+
+def test_context_compressor():
+    print("\n" + "=" * 50)
+    print("测试上下文压缩")
+    print("=" * 50)
+    
+    from modules.knowledge_base.chunker import PolicyChunker
+    from modules.knowledge_base.context_compressor import ContextCompressor
+    from modules.knowledge_base.embeddings import Embedder, HashingEmbedder
+    from utils.helpers import estimate_tokens
+    
+    with open(project_root / "data" / "input" / "sample_policy.json", 'r', encoding='utf-8') as f:
+        policy_data = json.load(f)
+    
+    docs = [{"content": c["text"]} for c in PolicyChunker().chunk_document(policy_data)]
+    docs.append({"content": json.dumps({"source_text": "单张优惠券金额不得超过500元", "rule_type": "禁止事项"},
+                                       ensure_ascii=False)})
+    question = "优惠券金额上限是多少？"
+    
+    compressed = ContextCompressor({"token_budget": 120}).compress(question, docs)
+    print(f"压缩前: {compressed['original_tokens']} tokens, 压缩后: {compressed['compressed_tokens']} tokens, "
+          f"压缩比: {compressed['compression_ratio']:.0%}")
+    assert compressed["compressed_tokens"] < compressed["original_tokens"]
+    assert compressed["compression_ratio"] < 0.5
+    assert "单张优惠券金额不得超过500元" in compressed["context"]
+    assert '"rule_type"' not in compressed["context"]
+    assert estimate_tokens(compressed["context"]) <= 120 + 10 * len(docs)
+    
+    embedder = Embedder(HashingEmbedder())
+    semantic = ContextCompressor({"token_budget": 120, "method": "embedding"}, embed_fn=embedder.embed)
+    assert semantic.compress(question, docs)["sentences_kept"] > 0
+    
+    fallback = ContextCompressor({"token_budget": 120}).compress("XYZ", docs)
+    leading = ContextCompressor({"token_budget": 120}).compress("XYZ", docs[:1])
+    print(f"无重叠问题保留句数: {fallback['sentences_kept']}")
+    assert fallback["sentences_kept"] > 1, "无词重叠时应回退到首个文档的开头句子"
+    assert fallback["context"] == leading["context"] and fallback["context"].startswith("【参考文档1】")
+    assert docs[0]["content"].replace("\n", "").startswith(fallback["context"].split("\n", 1)[1])
+    assert estimate_tokens(fallback["context"]) <= 120 + 10
+    
+    return True
+
+
+def test_async_llm_client():
+    print("\n" + "=" * 50)
+    print("测试异步LLM客户端")
+    print("=" * 50)
+    
+    import asyncio
+    from types import SimpleNamespace
+    from utils.llm_client import LLMClient
+    
+    active = {"now": 0, "peak": 0}
+    
+    class FakeCompletions:
+        async def create(self, **kwargs):
+            active["now"] += 1
+            active["peak"] = max(active["peak"], active["now"])
+            prompt = kwargs["messages"][-1]["content"]
+            await asyncio.sleep(0.05 if prompt.endswith("0") else 0.01)
+            active["now"] -= 1
+            message = SimpleNamespace(content=f'{{"echo": "{prompt}"}}')
+            return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+    
+    client = LLMClient({"provider": "openai", "api_key": "test", "max_concurrency": 3})
+    client._init_async_client = lambda *args: SimpleNamespace(chat=SimpleNamespace(completions=FakeCompletions()))
+    
+    requests = [("系统", f"问题{i}") for i in range(10)]
+    results = client.batch_chat_json(requests)
+    print(f"请求数: {len(results)}, 最大并发: {active['peak']}")
+    assert [r["echo"] for r in results] == [f"问题{i}" for i in range(10)]
+    assert active["peak"] == 3
+    
+    assert client.chat_with_system("系统", "单次") == '{"echo": "单次"}'
+    
+    async def from_running_loop():
+        return await client.achat_json("系统", "异步")
+    assert asyncio.run(from_running_loop()) == {"echo": "异步"}
+    
+    return True
+
+
+def test_llm_resilience():
+    print("\n" + "=" * 50)
+    print("测试LLM限流重试与熔断")
+    print("=" * 50)
+    
+    import time
+    import asyncio
+    from types import SimpleNamespace
+    from utils.llm_client import LLMClient
+    from utils.resilience import CircuitOpenError, RateLimiter
+    
+    class ProviderError(Exception):
+        def __init__(self, status_code):
+            super().__init__(f"status {status_code}")
+            self.status_code = status_code
+    
+    calls = []
+    outcomes = []
+    
+    class FakeCompletions:
+        async def create(self, **kwargs):
+            calls.append(kwargs["messages"][-1]["content"])
+            outcome = outcomes.pop(0) if outcomes else "ok"
+            if outcome == "slow":
+                await asyncio.sleep(1)
+            if isinstance(outcome, Exception):
+                raise outcome
+            return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=outcome))])
+    
+    client = LLMClient({"provider": "openai", "api_key": "test", "max_retries": 2,
+                        "retry_base_delay": 0.001, "retry_max_delay": 0.01,
+                        "breaker_failure_threshold": 3, "breaker_recovery_seconds": 60})
+    client._init_async_client = lambda *args: SimpleNamespace(chat=SimpleNamespace(completions=FakeCompletions()))
+    
+    outcomes.extend([ProviderError(503), ProviderError(429), "恢复"])
+    assert client.chat([{"role": "user", "content": "重试"}]) == "恢复"
+    assert len(calls) == 3
+    
+    outcomes.append(ProviderError(400))
+    try:
+        client.chat([{"role": "user", "content": "参数错误"}])
+        assert False, "不可重试的错误应直接抛出"
+    except ProviderError:
+        pass
+    assert calls[-1] == "参数错误" and calls.count("参数错误") == 1
+    
+    outcomes.extend([ProviderError(502)] * 3)
+    try:
+        client.chat([{"role": "user", "content": "服务故障"}])
+        assert False
+    except ProviderError:
+        pass
+    calls_before = len(calls)
+    try:
+        client.chat([{"role": "user", "content": "熔断"}])
+        assert False
+    except CircuitOpenError:
+        pass
+    assert len(calls) == calls_before
+    
+    stats = client.stats()
+    print(f"客户端计数: {stats}")
+    assert stats["retries"] == 4 and stats["failures"] == 2
+    assert stats["circuit_breaker"]["state"] == "open" and stats["circuit_breaker"]["rejected"] == 1
+    
+    probe_client = LLMClient({"provider": "openai", "api_key": "test", "max_retries": 0,
+                              "breaker_failure_threshold": 1, "breaker_recovery_seconds": 0.05})
+    probe_client._init_async_client = client._init_async_client
+    breaker = probe_client.circuit_breaker
+    
+    def fail_probe(outcome, content):
+        time.sleep(0.06)
+        assert breaker.state == "half_open"
+        outcomes.append(outcome)
+        try:
+            probe_client.chat([{"role": "user", "content": content}])
+            assert False
+        except ProviderError:
+            pass
+    
+    outcomes.append(ProviderError(503))
+    try:
+        probe_client.chat([{"role": "user", "content": "触发熔断"}])
+        assert False
+    except ProviderError:
+        pass
+    fail_probe(ProviderError(429), "探测限流")
+    assert breaker.state == "open", "半开探测遇到429应重新熔断"
+    
+    time.sleep(0.06)
+    outcomes.append("slow")
+    try:
+        probe_client.run(asyncio.wait_for(probe_client.achat([{"role": "user", "content": "探测取消"}]), 0.05))
+        assert False
+    except asyncio.TimeoutError:
+        pass
+    assert breaker.state == "open", "被取消的探测应重新熔断"
+    
+    fail_probe(ProviderError(400), "探测参数错误")
+    assert breaker.state == "half_open", "不可重试的错误不应关闭熔断，也不应占用探测"
+    assert probe_client.chat([{"role": "user", "content": "探测恢复"}]) == "ok"
+    assert breaker.state == "closed"
+    
+    limiter = RateLimiter(requests_per_minute=600)
+    limiter.requests._tokens = 1
+    start = time.perf_counter()
+    client.run(limiter.acquire())
+    client.run(limiter.acquire())
+    assert time.perf_counter() - start >= 0.09
+    assert limiter.stats()["throttled"] == 1
+    
+    return True
+
+
+def test_llm_response_cache():
+    print("\n" + "=" * 50)
+    print("测试LLM响应缓存")
+    print("=" * 50)
+    
+    import tempfile
+    import threading
+    import time
+    from types import SimpleNamespace
+    from utils.llm_client import LLMClient
+    from utils.response_cache import ResponseCache
+    from utils.llm_metrics import LLMMetrics
+    
+    calls = []
+    
+    class FakeCompletions:
+        async def create(self, **kwargs):
+            calls.append(kwargs)
+            content = '{"answer": "' + kwargs["messages"][-1]["content"] + '"}'
+            return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cache = ResponseCache(str(Path(tmp_dir) / "llm.db"), max_bytes=512)
+        client = LLMClient({"provider": "openai", "api_key": "test", "temperature": 0.1}, response_cache=cache)
+        client._init_async_client = lambda *args: SimpleNamespace(chat=SimpleNamespace(completions=FakeCompletions()))
+        
+        first = client.chat_json("系统", "优惠券上限")
+        second = client.chat_json("系统", "优惠券上限")
+        assert first == second == {"answer": "优惠券上限"}
+        assert len(calls) == 1
+        
+        client.chat_with_system("系统", "优惠券上限", temperature=0.7)
+        client.chat_json("系统", "优惠券上限", use_cache=False)
+        assert len(calls) == 3
+        
+        reopened = ResponseCache(str(Path(tmp_dir) / "llm.db"), max_bytes=512)
+        client.response_cache = reopened
+        client.chat_json("系统", "优惠券上限")
+        assert len(calls) == 3
+        
+        for i in range(40):
+            client.chat_with_system("系统", f"问题{i}")
+        stats = reopened.stats()
+        print(f"响应缓存统计: {stats}")
+        assert stats["bytes"] <= 512 and stats["evictions"] > 0
+        assert stats["hits"] == 1 and stats["misses"] == 40
+        
+        reopened.bypass = True
+        size = reopened.stats()["size"]
+        client.metrics = LLMMetrics()
+        client.chat_with_system("系统", "问题39")
+        client.chat_with_system("系统", "绕过缓存的新问题")
+        assert len(calls) == 45 and reopened.stats()["bypassed"] == 2
+        assert reopened.stats()["size"] == size, "绕过模式下不应写入缓存"
+        assert client.metrics.report()["callers"]["default"]["cache"] == {
+            "miss": 0, "hit": 0, "coalesced": 0, "bypass": 2, "disabled": 0
+        }
+        
+        cache.close()
+        reopened.close()
+        
+        touched = ResponseCache(str(Path(tmp_dir) / "touch.db"), touch_batch=2)
+        touched.set("a", "甲")
+        touched.set("b", "乙")
+        accessed = lambda: dict(touched._connect().execute("SELECT key, accessed_at FROM responses"))
+        before = accessed()
+        time.sleep(0.01)
+        assert touched.get("a") == "甲" and accessed() == before, "命中时不应立即写回访问时间"
+        assert touched.get("b") == "乙"
+        assert all(accessed()[key] > before[key] for key in before)
+        
+        threads = []
+        original_get = touched.get
+        touched.get = lambda key: threads.append(threading.get_ident()) or original_get(key)
+        client.response_cache = touched
+        
+        async def cached_call():
+            return threading.get_ident(), await client.achat([{"role": "user", "content": "缓存线程"}])
+        
+        loop_thread, _ = client.run(cached_call())
+        assert threads and loop_thread not in threads, "SQLite读取应在事件循环线程之外执行"
+        touched.close()
+    
+    return True
+
+
+def test_streaming_answer():
+    print("\n" + "=" * 50)
+    print("测试流式回答")
+    print("=" * 50)
+    
+    import asyncio
+    import tempfile
+    from types import SimpleNamespace
+    from utils.llm_client import LLMClient
+    from utils.response_cache import ResponseCache
+    from modules.knowledge_base.rag_engine import RAGEngine
+    rag_module = sys.modules["modules.knowledge_base.rag_engine"]
+    
+    deltas = ["单张", "优惠券", "不得超过", "500元"]
+    requests = []
+    
+    class FakeStream:
+        def __init__(self):
+            self.parts = list(deltas)
+        
+        def __aiter__(self):
+            return self
+        
+        async def __anext__(self):
+            if not self.parts:
+                raise StopAsyncIteration
+            await asyncio.sleep(0.01)
+            delta = SimpleNamespace(content=self.parts.pop(0))
+            return SimpleNamespace(choices=[SimpleNamespace(delta=delta)])
+    
+    class FakeCompletions:
+        async def create(self, **kwargs):
+            requests.append(kwargs)
+            return FakeStream()
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cache = ResponseCache(str(Path(tmp_dir) / "llm.db"))
+        client = LLMClient({"provider": "zhipu", "api_key": "test"}, response_cache=cache)
+        client._init_async_client = lambda *args: SimpleNamespace(chat=SimpleNamespace(completions=FakeCompletions()))
+        
+        assert list(client.chat_stream([{"role": "user", "content": "上限"}])) == deltas
+        assert requests[-1]["stream"] is True
+        assert list(client.chat_stream([{"role": "user", "content": "上限"}])) == ["".join(deltas)]
+        assert len(requests) == 1
+        
+        engine = RAGEngine(rule_store=temp_rule_store())
+        engine.semantic_cache = None
+        context_docs = [{"content": "单张优惠券金额不得超过500元。", "metadata": {"title": "测试政策"}}]
+        engine.retrieve_with_rerank = lambda question, n_results=3: context_docs
+        
+        original_client = rag_module.llm_client
+        rag_module.llm_client = client
+        try:
+            events = list(engine.query_stream("优惠券金额上限是多少？"))
+        finally:
+            rag_module.llm_client = original_client
+        cache.close()
+    
+    kinds = [e["type"] for e in events]
+    print(f"事件序列: {kinds}")
+    assert kinds[0] == "context" and kinds[-1] == "done"
+    assert kinds.count("token") == len(deltas)
+    assert events[-1]["result"]["answer"] == "".join(deltas)
+    assert events[0]["sources"] == [{"title": "测试政策"}]
+    
+    return True
+
+
+def test_single_flight():
+    print("\n" + "=" * 50)
+    print("测试相同请求合并")
+    print("=" * 50)
+    
+    import asyncio
+    import threading
+    from types import SimpleNamespace
+    from utils.llm_client import LLMClient
+    from utils.singleflight import SingleFlight
+    
+    calls = []
+    
+    class FakeCompletions:
+        async def create(self, **kwargs):
+            prompt = kwargs["messages"][-1]["content"]
+            calls.append(prompt)
+            await asyncio.sleep(0.05)
+            if prompt == "失败":
+                raise ValueError("provider error")
+            return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=f"答:{prompt}"))])
+    
+    client = LLMClient({"provider": "openai", "api_key": "test"})
+    client._init_async_client = lambda *args: SimpleNamespace(chat=SimpleNamespace(completions=FakeCompletions()))
+    
+    async def burst():
+        prompts = ["上限"] * 5 + ["频次"]
+        return await client.gather(client.achat([{"role": "user", "content": p}]) for p in prompts)
+    
+    answers = asyncio.run(burst())
+    assert answers == ["答:上限"] * 5 + ["答:频次"]
+    assert sorted(calls) == ["上限", "频次"]
+    
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(
+        client.chat([{"role": "user", "content": "同步"}]))) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert results == ["答:同步"] * 4 and calls.count("同步") == 1
+    
+    async def failing():
+        return await client.gather((client.achat([{"role": "user", "content": "失败"}]) for _ in range(3)),
+                                   return_exceptions=True)
+    errors = asyncio.run(failing())
+    assert all(isinstance(e, ValueError) for e in errors) and calls.count("失败") == 1
+    
+    stats = client.stats()
+    print(f"合并请求数: {stats['coalesced']}, 实际请求数: {stats['requests']}")
+    assert stats["coalesced"] == 4 + 3 + 2
+    assert client.single_flight.in_flight() == 0
+    
+    async def leader_cancelled():
+        flight = SingleFlight()
+        started = []
+        
+        async def fetch():
+            started.append(len(started))
+            await asyncio.sleep(0.05)
+            return f"第{len(started)}次请求"
+        
+        leader = asyncio.ensure_future(flight.do("key", fetch))
+        await asyncio.sleep(0.01)
+        followers = [asyncio.ensure_future(flight.do("key", fetch)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        results = await asyncio.gather(*followers)
+        return leader, results, started, flight
+    
+    leader, results, started, flight = asyncio.run(leader_cancelled())
+    assert leader.cancelled()
+    assert sorted(results, key=lambda r: r[1]) == [("第2次请求", False)] + [("第2次请求", True)] * 2, \
+        "主请求被取消后应由一个跟随者接替重试，其余跟随者共享其结果"
+    assert len(started) == 2 and flight.in_flight() == 0
+    
+    return True
+
+
+def test_llm_metrics():
+    print("\n" + "=" * 50)
+    print("测试LLM用量统计")
+    print("=" * 50)
+    
+    import tempfile
+    from types import SimpleNamespace
+    from utils.llm_client import LLMClient
+    from utils.llm_metrics import LLMMetrics
+    from utils.response_cache import ResponseCache
+    from utils.helpers import estimate_tokens
+    
+    sent = []
+    
+    class FakeCompletions:
+        async def create(self, **kwargs):
+            sent.append(kwargs["messages"])
+            usage = SimpleNamespace(prompt_tokens=120, completion_tokens=30, total_tokens=150)
+            message = SimpleNamespace(content='[{"index": 0, "relevance_score": 0.9}]')
+            return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=usage)
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        metrics = LLMMetrics()
+        client = LLMClient({"provider": "openai", "api_key": "test",
+                            "prompt_budgets": {"default": 4000, "rerank": 300}},
+                           response_cache=ResponseCache(str(Path(tmp_dir) / "llm.db")), metrics=metrics)
+        client._init_async_client = lambda *args: SimpleNamespace(chat=SimpleNamespace(completions=FakeCompletions()))
+        
+        long_context = "查询问题: 优惠券上限\n\n文档列表:\n" + "单张优惠券金额不得超过500元。" * 100
+        client.chat_json("相关性评估", long_context, caller="rerank")
+        client.chat_json("相关性评估", long_context, caller="rerank")
+        client.chat_with_system("审计助手", "问题：优惠券上限", caller="answer", use_cache=False)
+        
+        assert sum(estimate_tokens(m["content"]) for m in sent[0]) <= 300
+        assert sent[0][1]["content"].startswith("查询问题: 优惠券上限")
+        assert sent[0][0]["content"].startswith("相关性评估")
+        
+        report = metrics.report()
+        rerank, answer = report["callers"]["rerank"], report["callers"]["answer"]
+        print(f"用量统计: {report['totals']}")
+        assert rerank["calls"] == 2 and rerank["truncated"] == 2
+        assert rerank["cache"]["miss"] == 1 and rerank["cache"]["hit"] == 1
+        assert rerank["prompt_tokens"] == 120 and rerank["completion_tokens"] == 30
+        assert answer["cache"]["bypass"] == 1 and answer["truncated"] == 0
+        assert report["totals"]["total_tokens"] == 300
+        
+        since = metrics.snapshot()
+        client.chat_with_system("审计助手", "问题：优惠券上限", caller="answer", use_cache=False)
+        run_report = metrics.report(since=since)
+        print(f"本次运行用量: {run_report['totals']}")
+        assert list(run_report["callers"]) == ["answer"]
+        assert run_report["callers"]["answer"]["calls"] == 1
+        assert run_report["callers"]["answer"]["cache"]["bypass"] == 1
+        assert run_report["totals"]["total_tokens"] == 150
+        assert run_report["started_at"] == since["started_at"]
+        assert metrics.report()["totals"]["total_tokens"] == 450
+        
+        path = metrics.save(Path(tmp_dir) / "llm_usage.json")
+        with open(path, 'r', encoding='utf-8') as f:
+            assert json.load(f)["callers"]["rerank"]["calls"] == 2
+        path = metrics.save(Path(tmp_dir) / "llm_usage_run.json", since=since)
+        with open(path, 'r', encoding='utf-8') as f:
+            assert "rerank" not in json.load(f)["callers"]
+        client.response_cache.close()
+    
+    return True
+
+
+def test_endpoint_hedging():
+    print("\n" + "=" * 50)
+    print("测试多端点对冲与故障转移")
+    print("=" * 50)
+    
+    import threading
+    import time
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from utils.llm_client import LLMClient
+    
+    def start_server(name, latency):
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                prompt = body["messages"][-1]["content"]
+                delay, status = latency(prompt)
+                time.sleep(delay)
+                payload = json.dumps({
+                    "id": "chatcmpl-test", "object": "chat.completion", "created": 0, "model": body["model"],
+                    "choices": [{"index": 0, "finish_reason": "stop",
+                                 "message": {"role": "assistant", "content": f"{name}:{prompt}"}}],
+                    "usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15}
+                } if status == 200 else {"error": {"message": "unavailable"}}).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+            
+            def log_message(self, *args):
+                pass
+        
+        server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server, f"http://127.0.0.1:{server.server_address[1]}/v1"
+    
+    def primary_latency(prompt):
+        if prompt.startswith("稍慢"):
+            return 0.3, 200
+        if prompt.startswith("慢"):
+            return 2.0, 200
+        if prompt.startswith("故障"):
+            return 0.0, 503
+        return 0.02, 200
+    
+    def gateway_latency(prompt):
+        if prompt.startswith("稍慢"):
+            return 0.0, 401
+        return 0.03, 200
+    
+    primary, primary_url = start_server("primary", primary_latency)
+    gateway, gateway_url = start_server("gateway", gateway_latency)
+    
+    try:
+        client = LLMClient({
+            "provider": "openai", "api_key": "test", "max_retries": 0,
+            "endpoints": [{"name": "primary", "base_url": primary_url},
+                          {"name": "gateway", "base_url": gateway_url}],
+            "hedge_min_samples": 5, "hedge_min_delay": 0.05
+        })
+        
+        for i in range(6):
+            assert client.chat([{"role": "user", "content": f"快{i}"}], use_cache=False) == f"primary:快{i}"
+        
+        start = time.perf_counter()
+        answer = client.chat([{"role": "user", "content": "慢请求"}], use_cache=False)
+        elapsed = time.perf_counter() - start
+        print(f"对冲请求耗时: {elapsed:.3f}s, 应答端点: {answer.split(':')[0]}")
+        assert answer == "gateway:慢请求"
+        assert elapsed < 1.0
+        
+        assert client.chat([{"role": "user", "content": "故障请求"}], use_cache=False) == "gateway:故障请求"
+        
+        stats = client.endpoint_pool.stats()
+        print(f"端点统计: hedged={stats['hedged']}, hedge_wins={stats['hedge_wins']}, failovers={stats['failovers']}")
+        assert stats["hedged"] == 1 and stats["hedge_wins"] == 1 and stats["failovers"] == 1
+        assert stats["endpoints"]["primary"]["failures"] == 1
+        assert stats["endpoints"]["primary"]["p95_latency"] < 0.5
+        
+        answer = client.chat([{"role": "user", "content": "稍慢请求"}], use_cache=False)
+        assert answer == "primary:稍慢请求", "对冲端点的不可重试错误不应中断仍在进行的主请求"
+        stats = client.endpoint_pool.stats()
+        assert stats["hedged"] == 2 and stats["hedge_wins"] == 1
+    finally:
+        primary.shutdown()
+        gateway.shutdown()
+    
+    return True
+
+
+def test_rerank_cache():
+    print("\n" + "=" * 50)
+    print("测试重排序缓存")
+    print("=" * 50)
+    
+    import tempfile
+    from modules.knowledge_base.rag_engine import RAGEngine
+    from utils.cache import TTLCache
+    
+    engine = RAGEngine(rule_store=temp_rule_store())
+    engine.rerank_cache = TTLCache(max_size=100, ttl=60)
+    
+    llm_calls = []
+    def fake_score(query, docs):
+        llm_calls.append(len(docs))
+        return {i: 1.0 / (i + 1) for i in range(len(docs))}
+    engine._score_with_llm = fake_score
+    
+    docs = [{"id": f"doc_{i}", "content": f"优惠券规则{i}"} for i in range(4)]
+    engine._rerank_with_llm("优惠券金额上限", [dict(d) for d in docs])
+    engine._rerank_with_llm("优惠券金额上限", [dict(d) for d in docs])
+    
+    extra = docs[:2] + [{"id": "doc_9", "content": "新增文档"}]
+    engine._rerank_with_llm("优惠券金额上限", [dict(d) for d in extra])
+    
+    print(f"LLM调用批次: {llm_calls}")
+    print(f"缓存统计: {engine.rerank_cache.stats()}")
+    assert llm_calls == [4, 1]
+    
+    engine._score_with_llm = lambda query, docs: (llm_calls.append(len(docs)) or {0: 0.9})
+    engine._rerank_with_llm("优惠券有效期", [dict(d) for d in docs[:2]])
+    engine._rerank_with_llm("优惠券有效期", [dict(d) for d in docs[:2]])
+    assert llm_calls[2:] == [2, 1], "LLM未返回分数的文档不应被缓存"
+    
+    engine._score_with_llm = lambda query, docs: None
+    mixed = [docs[3], docs[2], {"id": "doc_8", "content": "未缓存文档"}, docs[0]]
+    reranked = engine._rerank_with_llm("优惠券金额上限", [dict(d) for d in mixed])
+    assert [d["id"] for d in reranked] == ["doc_0", "doc_8", "doc_2", "doc_3"], "LLM失败时仍应按已缓存分数排序"
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "rerank_cache.json")
+        persisted = TTLCache(max_size=10, persist_path=path, save_interval=3600)
+        persisted.set("k", 0.5)
+        persisted.save_if_due()
+        assert not os.path.exists(path), "未到保存间隔时不应重写缓存文件"
+        persisted.flush()
+        assert TTLCache(persist_path=path).get("k") == 0.5
+    
+    return True
+
+
+def test_semantic_cache():
+    print("\n" + "=" * 50)
+    print("测试语义问答缓存")
+    print("=" * 50)
+    
+    from config.settings import AUDIT_CONFIG
+    from modules.knowledge_base.semantic_cache import SemanticCache
+    from modules.knowledge_base.embeddings import Embedder, HashingEmbedder
+    
+    embedder = Embedder(HashingEmbedder())
+    embedded = []
+    def embed(texts):
+        embedded.extend(texts)
+        return embedder.embed(texts)
+    
+    threshold = AUDIT_CONFIG["similarity_threshold"]
+    cache = SemanticCache(embed_fn=embed, threshold=threshold)
+    cache.store("优惠券金额上限是多少", {"answer": "500元"}, kb_version=1)
+    
+    exact = cache.lookup("优惠券金额上限是多少", kb_version=1)
+    spaced = cache.lookup("优惠券 金额上限 是多少", kb_version=1)
+    assert exact["answer"] == spaced["answer"] == "500元"
+    assert exact["cache"]["similarity"] == spaced["cache"]["similarity"] == 1.0
+    assert cache.stats()["exact_hits"] == 2 and len(embedded) == 1, "精确命中不应触发向量化"
+    
+    similar = cache.lookup("优惠券金额上限多少", kb_version=1)
+    unrelated = cache.lookup("活动预算有多少", kb_version=1)
+    stale = cache.lookup("优惠券金额上限是多少", kb_version=2)
+    print(f"近似命中: {similar and similar['cache']}")
+    print(f"缓存统计: {cache.stats()}")
+    assert similar is not None and threshold <= similar["cache"]["similarity"] < 1.0
+    assert unrelated is None and stale is None
+    assert cache.stats()["semantic_hits"] == 1
+    
+    return True
+
+
+def test_rule_store():
+    print("\n" + "=" * 50)
+    print("测试规则持久化存储")
+    print("=" * 50)
+    
+    import tempfile
+    from modules.knowledge_base.rule_store import RuleStore
+    from modules.knowledge_base.rule_index import RuleIndex
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = Path(tmp_dir) / "rules.db"
+        
+        index = RuleIndex(store=RuleStore(str(db_path)))
+        index.add_many({
+            "rule_测试_0": {"rule_id": "rule_测试_0", "source_text": "单张优惠券金额不得超过500元"},
+            "rule_测试_1": {"rule_id": "rule_测试_1", "source_text": "促销范围仅限线上渠道"}
+        })
+        index.store.set_version(3)
+        index.store.close()
+        
+        reloaded = RuleIndex(store=RuleStore(str(db_path)))
+        print(f"重启后规则数: {len(reloaded)}")
+        print(f"知识库版本: {reloaded.store.get_version()}")
+        assert len(reloaded) == 2
+        assert reloaded.get("rule_测试_1")["source_text"] == "促销范围仅限线上渠道"
+        assert reloaded.store.get_version() == 3
+        reloaded.store.close()
+    
+    return True
+
+
+def test_rule_index_lookup():
+    print("\n" + "=" * 50)
+    print("测试规则索引检索")
+    print("=" * 50)
+    
+    import tempfile
+    from modules.knowledge_base.rag_engine import RAGEngine
+    from modules.knowledge_base.rule_index import RuleIndex
+    from modules.knowledge_base.vector_store import VectorStore
+    
+    with open(project_root / "data" / "input" / "sample_policy.json", 'r', encoding='utf-8') as f:
+        policy_data = json.load(f)
+    regulation = {"document_type": "regulation", "metadata": {"id": "R1", "source": "监管规定"},
+                  "content": "单笔优惠金额不得超过1000元。\n促销活动必须明确告知用户规则。"}
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        engine = RAGEngine(rule_store=temp_rule_store())
+        engine.vector_store = VectorStore({"persist_directory": tmp_dir, "collection_name": "rule_lookup"})
+        engine.rule_index = RuleIndex()
+        engine.build_knowledge_base([policy_data, regulation])
+        store = engine.vector_store
+        
+        def linear_scan(config):
+            query = f"适用于以下配置的审计规则: {json.dumps(config, ensure_ascii=False)[:500]}"
+            rules = [json.loads(doc["content"]) for doc in engine.retrieve(query, n_results=store.get_count())
+                     if doc["metadata"].get("type") in ["rule", "regulation_rule"]]
+            return [rule["rule_id"] for rule in rules[:10]]
+        
+        configs = [{"优惠券金额": 600, "发放对象": "老用户"}, {"活动名称": "双十一", "total_budget": 2000000},
+                   {"规则内容": "满500减100"}]
+        for config in configs:
+            indexed = [rule["rule_id"] for rule in engine.find_applicable_rules(config)]
+            assert indexed and indexed == linear_scan(config), "规则索引检索结果应与线性扫描一致"
+        
+        memory = VectorStore({"persist_directory": tmp_dir, "collection_name": "rule_lookup"})
+        memory.collection = None
+        memory._use_memory_storage()
+        everything = store.get_documents()
+        memory.add_documents(everything["documents"], everything["metadatas"], everything["ids"])
+        
+        filters = [
+            RuleIndex.where_filter(),
+            {"type": "policy"},
+            {"type": {"$ne": "policy"}},
+            {"type": {"$nin": ["rule", "policy"]}},
+            {"$and": [{"type": "rule"}, {"rule_type": {"$in": ["上限约束", "下限约束"]}}]},
+            {"$or": [{"type": "regulation"}, {"source": "监管规定"}]},
+        ]
+        for where in filters:
+            expected = store.get_documents(where=where, include_documents=False)["ids"]
+            actual = memory.get_documents(where=where, include_documents=False)["ids"]
+            assert expected and sorted(actual) == sorted(expected), f"内存过滤与向量库过滤不一致: {where}"
+        print(f"文档数: {store.get_count()}, 规则数: {len(engine.rule_index)}, 校验过滤条件: {len(filters)}")
+        
+        before = len(engine.rule_index)
+        revised = dict(policy_data, tables=[],
+                       content=[dict(item, text="（修订）" + item["text"]) for item in policy_data["content"][:4]])
+        engine.build_knowledge_base([revised, dict(regulation, content="单笔优惠金额不得超过800元。")])
+        stored = engine._decode_rule_documents(store.get_documents(where=RuleIndex.where_filter()))
+        indexed = engine.rule_index.snapshot()
+        print(f"修订后规则数: {before} -> {len(indexed)}")
+        assert len(indexed) < before and sorted(stored) == sorted(indexed), "修订后向量库与规则索引的规则ID应一致"
+        for rule_id, rule in indexed.items():
+            assert stored[rule_id]["source_text"] == rule["source_text"], f"规则内容不一致: {rule_id}"
+        assert all(rule["source_text"].startswith("（修订）") or "800元" in rule["source_text"]
+                   for rule in indexed.values())
+    
+    return True
+
+
+def test_versioned_collections():
+    print("\n" + "=" * 50)
+    print("测试知识库版本切换")
+    print("=" * 50)
+    
+    import tempfile
+    from modules.knowledge_base.vector_store import VectorStore
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        config = {"persist_directory": tmp_dir, "collection_name": "audit_test", "retain_versions": 2}
+        store = VectorStore(config)
+        
+        for _ in range(3):
+            staging = store.begin_rebuild()
+            assert store.is_rebuilding
+            store.commit_rebuild(staging)
+        
+        base = store.base_name
+        print(f"当前版本: {store.collection_name}")
+        print(f"保留版本: {store.list_versions()}")
+        assert store.collection_name == f"{base}__v3"
+        assert store.list_versions() == [f"{base}__v2", f"{base}__v3"]
+        
+        staging = store.begin_rebuild()
+        store.abort_rebuild(staging)
+        assert not store.is_rebuilding
+        assert VectorStore(config).collection_name == f"{base}__v3"
+    
+    return True
+
+
+def test_background_rebuild():
+    print("\n" + "=" * 50)
+    print("测试后台重建期间查询")
+    print("=" * 50)
+    
+    import tempfile
+    import threading
+    from modules.knowledge_base.rag_engine import RAGEngine
+    from modules.knowledge_base.vector_store import VectorStore
+    
+    def policy(title, text):
+        return {"document_type": "policy_document", "content": [{"text": text}], "metadata": {"title": title}}
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        engine = RAGEngine(rule_store=temp_rule_store())
+        engine.vector_store = VectorStore({"persist_directory": tmp_dir, "collection_name": "rebuild_test"})
+        engine.semantic_cache = None
+        engine.rerank_cache = None
+        engine._score_with_llm = lambda query, docs: None
+        engine.generate_answer = lambda question, docs, compressed: "；".join(d["content"] for d in docs)
+        engine.build_knowledge_base([policy("旧版政策", "单张优惠券金额不得超过500元。")])
+        old_collection, old_version = engine.vector_store.collection_name, engine.kb_version
+        
+        started, release = threading.Event(), threading.Event()
+        bulk_ingest = engine._bulk_ingest
+        def gated_ingest(*args, **kwargs):
+            started.set()
+            assert release.wait(10)
+            return bulk_ingest(*args, **kwargs)
+        engine._bulk_ingest = gated_ingest
+        
+        def sources(result):
+            return {source.get("source") for source in result["sources"]}
+        
+        engine.rebuild_knowledge_base([policy("新版政策", "单张优惠券金额不得超过800元。")], background=True)
+        assert started.wait(10)
+        during = engine.query("优惠券金额上限")
+        assert engine.is_rebuilding, "提交前重建应仍在进行"
+        assert sources(during) == {"旧版政策"} and "500元" in during["answer"], "提交前应由旧版本回答"
+        assert engine.vector_store.collection_name == old_collection and engine.kb_version == old_version
+        
+        release.set()
+        assert engine.wait_for_rebuild(30) and engine.last_rebuild_error is None
+        after = engine.query("优惠券金额上限")
+        print(f"重建前: {old_collection} -> 重建后: {engine.vector_store.collection_name}")
+        assert sources(after) == {"新版政策"} and "800元" in after["answer"], "提交后应由新版本回答"
+        assert engine.vector_store.collection_name != old_collection and engine.kb_version > old_version
+    
+    return True
+
+
+def test_embedding_backends():
+    print("\n" + "=" * 50)
+    print("测试向量化后端")
+    print("=" * 50)
     
-    stats = knowledge_base.get_statistics()
-    print(f"知识库统计: {stats}")
+    from modules.knowledge_base.embeddings import Embedder, HashingEmbedder
+    
+    texts = [f"单张优惠券金额不得超过{i}元" for i in range(100)]
+    serial = Embedder(HashingEmbedder(128), batch_size=16, max_workers=1)
+    threaded = Embedder(HashingEmbedder(128), batch_size=16, max_workers=4)
+    
+    vectors = serial.embed(texts)
+    print(f"向量维度: {vectors.shape}")
+    print(f"吞吐统计: {threaded.embed(texts) is not None and threaded.stats()}")
+    assert vectors.shape == (100, 128)
+    assert (threaded.embed(texts) == vectors).all()
+    assert threaded.stats()["batches"] == 14
+    
+    return True
+
+
+def test_bulk_ingestion():
+    print("\n" + "=" * 50)
+    print("测试批量写入队列")
+    print("=" * 50)
+    
+    from modules.knowledge_base.ingestion import BulkIngestor
+    
+    class RecordingStore:
+        def __init__(self):
+            self.batches = []
+        
+        def add_documents(self, documents, metadatas, ids):
+            self.batches.append(list(ids))
+    
+    store = RecordingStore()
+    with BulkIngestor(store, batch_size=100) as ingestor:
+        for i in range(25):
+            ids = [f"case_{i}_{j}" for j in range(10)]
+            ingestor.put([f"案例{i}-{j}" for j in range(10)], [{} for _ in ids], ids)
+    
+    stats = ingestor.stats()
+    print(f"写入批次: {[len(b) for b in store.batches]}")
+    print(f"吞吐统计: {stats}")
+    assert [len(b) for b in store.batches] == [100, 100, 50]
+    assert store.batches[0][0] == "case_0_0" and store.batches[-1][-1] == "case_24_9"
+    assert stats["records"] == 250
     
     return True
 
@@ -117,6 +1270,207 @@ def test_audit_engine():
     return True
 
 
+def test_compiled_rule():
+    print("\n" + "=" * 50)
+    print("测试规则预编译")
+    print("=" * 50)
+    
+    from utils.compiled_rule import compile_rule, parse_threshold
+    
+    samples = {
+        "单张优惠券金额不得超过500元": 500,
+        "单次促销活动总预算不得超过100万元": 1000000,
+        "单笔返现不得超过3千元": 3000,
+        "每位用户每月领取次数不超过三次": 3,
+        "有效期不得超过二十五天": 25,
+        "活动规则必须明确告知用户": None,
+    }
+    for text, expected in samples.items():
+        value = parse_threshold(text)
+        print(f"  {text} -> {value}")
+        assert value == expected
+    
+    compiled = compile_rule({"source_text": "优惠券发放对象仅限新注册用户", "rule_type": "范围限制"})
+    print(f"编译结果: {compiled}")
+    assert compiled.checks_scope and "new_user" in compiled.scope_tokens
+    
+    return True
+
+
+def test_vectorized_audit():
+    print("\n" + "=" * 50)
+    print("测试向量化规则评估")
+    print("=" * 50)
+    
+    from modules.audit_engine import VectorizedEvaluator, reasoning_engine
+    
+    rules = [
+        {"source_text": "单张优惠券金额不得超过500元", "rule_type": "金额上限"},
+        {"source_text": "有效期不少于7天", "rule_type": "条件限制"},
+        {"source_text": "每位用户每月领取次数必须等于3次", "rule_type": "条件限制"},
+        {"source_text": "优惠券发放对象仅限新注册用户", "rule_type": "范围限制"},
+        {"source_text": "活动仅限线上渠道", "rule_type": "范围限制"},
+        {"source_text": "活动规则必须明确告知用户", "rule_type": "其他"},
+        {"source_text": "预算上限", "compiled": {"field_categories": ["预算"], "operator": "<=", "threshold": 0.0}},
+    ]
+    configs = [
+        {"优惠券金额": 600, "发放对象": "老用户"},
+        {"优惠券金额": 100, "validity_days": 3, "活动渠道": ["线上", "线下"]},
+        {"活动": {"max_amount": 800}, "monthly_limit": 3},
+        {"名称": "无数值配置"},
+        {"budget": float("nan"), "limit": True},
+        {},
+    ]
+    
+    legacy = [(rules.index(r), configs.index(c), reasoning_engine.reason(r, c))
+              for r in rules for c in configs
+              if reasoning_engine.reason(r, c)["conclusion"]["is_violation"] == "是"]
+    vectorized = [(rules.index(r), configs.index(c), reasoning)
+                  for r, c, reasoning in VectorizedEvaluator(block_elements=8).iter_violations(rules, configs)]
+    print(f"逐对推理违规数: {len(legacy)}, 向量化违规数: {len(vectorized)}")
+    assert [(i, j) for i, j, _ in vectorized] == [(i, j) for i, j, _ in legacy]
+    assert [r["conclusion"] for _, _, r in vectorized] == [r["conclusion"] for _, _, r in legacy]
+    assert VectorizedEvaluator().find_violations([], configs) == []
+    
+    return True
+
+
+def test_audit_planner():
+    print("\n" + "=" * 50)
+    print("测试分区审计计划")
+    print("=" * 50)
+    
+    from modules.audit_engine import audit_planner, find_violations, iter_violations
+    from modules.audit_engine.agents import AuditAgent
+    from modules.document_parser.xlsx_parser import XlsxParser
+    
+    rules = [
+        {"source_text": "单张优惠券金额不得超过500元", "rule_type": "上限约束", "constraint_type": "金额"},
+        {"source_text": "每位用户每月领取次数不得超过3次", "rule_type": "上限约束", "constraint_type": "数量"},
+        {"source_text": "优惠券发放对象仅限新注册用户", "rule_type": "范围限制", "constraint_type": "范围"},
+        {"source_text": "活动规则必须明确告知用户", "rule_type": "必做事项", "constraint_type": "其他"},
+    ]
+    coupon_rows = [{"优惠券金额": 600 + i, "发放对象": "老用户"} for i in range(20)]
+    configs = XlsxParser().extract_business_config({"sheets": {
+        "优惠券": {"data": coupon_rows},
+        "活动": {"data": [{"活动名称": f"活动{i}", "总预算(元)": 2000000} for i in range(20)]},
+        "规则": {"data": [{"规则内容": "满500减100", "规则状态": "生效中"} for _ in range(20)]},
+        "会员": {"data": [{"用户": "会员", "优惠券金额": 900}]},
+    }})
+    assert all("config_data" in config for config in configs) and configs[-1]["config_type"] == "user_config"
+    assert audit_planner.config_signature(configs[0])[1:] == audit_planner.config_signature(coupon_rows[0])[1:]
+    
+    plan = audit_planner.plan(rules, configs)
+    stats = plan.stats()
+    print(f"计划: {stats}")
+    assert stats["pairs_total"] == len(rules) * len(configs)
+    assert stats["pairs_evaluated"] + stats["pairs_skipped"] == stats["pairs_total"]
+    assert stats["pairs_skipped"] > stats["pairs_evaluated"]
+    
+    matches, plan_stats = find_violations(rules, configs)
+    full = list(iter_violations(rules, configs))
+    kept = [(rules.index(r), configs.index(c)) for r, c, _ in matches]
+    full_pairs = {(rules.index(r), configs.index(c)) for r, c, _ in full}
+    print(f"分区后违规数: {len(matches)}, 全量交叉违规数: {len(full)}")
+    assert kept == sorted(kept)
+    assert set(kept) < full_pairs
+    assert {(0, j) for j in range(20)} <= set(kept) and {(2, j) for j in range(20)} <= set(kept)
+    assert not any(i == 1 and j >= 20 for i, j in kept)
+    assert (0, 60) in full_pairs and (0, 60) not in kept, "金额规则不应评估用户类配置"
+    
+    result = AuditAgent().execute({"action": "audit", "rules": rules, "configs": configs})
+    assert result["pairs_evaluated"] == plan_stats["pairs_evaluated"]
+    assert result["pairs_skipped"] == plan_stats["pairs_skipped"]
+    assert result["violations_found"] == len(matches)
+    
+    return True
+
+
+def test_sharded_audit():
+    print("\n" + "=" * 50)
+    print("测试多进程分片审计")
+    print("=" * 50)
+    
+    from modules.audit_engine import ShardedAuditor
+    from modules.audit_engine.agents import AuditAgent
+    
+    rules = [
+        {"rule_id": "R1", "source_text": "单张优惠券金额不得超过500元", "rule_type": "上限约束"},
+        {"rule_id": "R2", "source_text": "每位用户每月领取次数不得超过3次", "rule_type": "上限约束"},
+        {"rule_id": "R3", "source_text": "优惠券发放对象仅限新注册用户", "rule_type": "范围限制"},
+    ]
+    configs = [{"优惠券金额": 300 + 50 * i, "monthly_limit": i % 6, "发放对象": ["新用户", "老用户"][i % 2]}
+               for i in range(40)]
+    configs += configs[:5]
+    
+    serial, serial_stats = ShardedAuditor(workers=1).audit(rules, configs)
+    sharded, sharded_stats = ShardedAuditor(workers=2, min_shard_size=8).audit(rules, configs)
+    print(f"单进程: {serial_stats}")
+    print(f"分片: {sharded_stats}")
+    
+    assert sharded_stats["workers"] == 2 and sharded_stats["shards"] == 6
+    assert sharded_stats["pairs_evaluated"] == serial_stats["pairs_evaluated"]
+    assert [m[0] for m in sharded] == [m[0] for m in serial]
+    assert [(m[1]["rule_id"], configs.index(m[2])) for m in sharded] == [(m[1]["rule_id"], configs.index(m[2])) for m in serial]
+    assert [m[3] for m in sharded] == [m[3] for m in serial]
+    
+    ids = [m[0] for m in serial]
+    assert len(set(ids)) == len(ids)
+    assert any(vid.endswith("_2") for vid in ids)
+    assert ids == [m[0] for m in ShardedAuditor(workers=1).audit(rules, configs)[0]]
+    
+    result = AuditAgent().execute({"action": "audit", "rules": rules, "configs": configs, "workers": 1})
+    assert [v["violation_id"] for v in result["violations"]] == ids
+    
+    return True
+
+
+def test_near_duplicate_rules():
+    print("\n" + "=" * 50)
+    print("测试近重复规则合并")
+    print("=" * 50)
+    
+    from modules.knowledge_base.dedup import collapse_near_duplicates
+    
+    rules = [
+        {"content": "各地区单张优惠券金额不得超过500元，仅限新注册用户使用，北京地区执行", "file_path": "北京.docx"},
+        {"content": "各地区单张优惠券金额不得超过500元，仅限新注册用户使用，上海地区执行", "file_path": "上海.docx"},
+        {"content": "各地区单张优惠券金额不得超过600元，仅限新注册用户使用，北京地区执行", "file_path": "北京.docx"},
+        {"content": "同一用户每月领取次数不得超过3次", "file_path": "北京.docx"},
+    ]
+    canonical = collapse_near_duplicates(rules, threshold=0.75)
+    
+    print(f"原始规则: {len(rules)}, 合并后: {len(canonical)}")
+    assert len(canonical) == 3
+    assert canonical[0]["duplicates"][0]["file_path"] == "上海.docx"
+    assert "duplicates" not in canonical[1]
+    
+    import tempfile
+    from modules.knowledge_base.rag_engine import RAGEngine
+    from modules.knowledge_base.rule_index import RuleIndex
+    from modules.knowledge_base.vector_store import VectorStore
+    
+    regulations = [
+        {"document_type": "regulation", "metadata": {"id": region, "source": f"{region}规定"},
+         "content": f"各地区单张优惠券金额不得超过500元，仅限新注册用户使用，{region}地区执行"}
+        for region in ("北京", "上海")
+    ]
+    for bulk in (False, True):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            engine = RAGEngine(rule_store=temp_rule_store())
+            engine.vector_store = VectorStore({"persist_directory": tmp_dir, "collection_name": "dedup_test"})
+            engine.rule_index = RuleIndex()
+            engine._near_duplicates = None
+            engine.build_knowledge_base(regulations, bulk=bulk)
+            
+            assert engine.rule_index.ids() == ["reg_rule_北京_0"]
+            stored = engine.vector_store.get_documents(ids=["reg_rule_北京_0"])["documents"]
+            duplicates = json.loads(stored[0]).get("duplicates", [])
+            assert [d["rule_id"] for d in duplicates] == ["reg_rule_上海_0"], "向量库中的规范规则应带有合并来源"
+    
+    return True
+
+
 def test_report_generator():
     print("\n" + "=" * 50)
     print("测试模块四：报告生成")
@@ -177,6 +1531,45 @@ def test_multi_agent_system():
     return True
 
 
+def test_lazy_startup():
+    print("\n" + "=" * 50)
+    print("测试延迟初始化与启动耗时")
+    print("=" * 50)
+    
+    import subprocess
+    from types import SimpleNamespace
+    from utils.lazy import LazyProxy, is_initialized
+    
+    created = []
+    proxy = LazyProxy(lambda: created.append(1) or SimpleNamespace(value=0))
+    assert not is_initialized(proxy) and not created
+    proxy.value = 3
+    assert proxy.value == 3
+    assert is_initialized(proxy) and len(created) == 1
+    
+    probe = (
+        "import contextlib, io, json, sys\n"
+        "sys.argv = ['main.py', '--status']\n"
+        "with contextlib.redirect_stdout(io.StringIO()):\n"
+        "    import main\n"
+        "    main.main()\n"
+        "from utils.lazy import is_initialized\n"
+        "from modules.knowledge_base import rag_engine, vector_store\n"
+        "heavy = [m for m in ('chromadb', 'openai', 'zhipuai', 'pandas', 'docx') if m in sys.modules]\n"
+        "print(json.dumps({'heavy': heavy, 'vector_store': is_initialized(vector_store),\n"
+        "                  'rag_engine': is_initialized(rag_engine)}))\n"
+    )
+    completed = subprocess.run([sys.executable, "-c", probe], cwd=str(project_root),
+                               capture_output=True, text=True, check=True)
+    loaded = json.loads(completed.stdout.strip().splitlines()[-1])
+    print(f"--status 加载的重量级依赖: {loaded['heavy'] or '无'}")
+    
+    assert loaded["heavy"] == []
+    assert not loaded["vector_store"] and not loaded["rag_engine"]
+    
+    return True
+
+
 def run_all_tests():
     print("\n" + "=" * 60)
     print("营销审计多智能体系统 - 功能测试")
@@ -185,9 +1578,35 @@ def run_all_tests():
     tests = [
         ("文档解析模块", test_document_parser),
         ("知识库构建模块", test_knowledge_base),
+        ("LLM规则提取", test_llm_rule_extractor),
+        ("并行规则提取", test_parallel_rule_extraction),
+        ("关键词分类", test_keyword_classifier),
+        ("政策分块", test_policy_chunker),
+        ("上下文压缩", test_context_compressor),
+        ("异步LLM客户端", test_async_llm_client),
+        ("LLM限流重试与熔断", test_llm_resilience),
+        ("LLM响应缓存", test_llm_response_cache),
+        ("流式回答", test_streaming_answer),
+        ("相同请求合并", test_single_flight),
+        ("LLM用量统计", test_llm_metrics),
+        ("多端点对冲与故障转移", test_endpoint_hedging),
+        ("重排序缓存", test_rerank_cache),
+        ("语义问答缓存", test_semantic_cache),
+        ("规则持久化存储", test_rule_store),
+        ("规则索引检索", test_rule_index_lookup),
+        ("知识库版本切换", test_versioned_collections),
+        ("后台重建期间查询", test_background_rebuild),
+        ("向量化后端", test_embedding_backends),
+        ("批量写入队列", test_bulk_ingestion),
         ("审计引擎模块", test_audit_engine),
+        ("规则预编译", test_compiled_rule),
+        ("向量化规则评估", test_vectorized_audit),
+        ("分区审计计划", test_audit_planner),
+        ("多进程分片审计", test_sharded_audit),
+        ("近重复规则合并", test_near_duplicate_rules),
         ("报告生成模块", test_report_generator),
-        ("多智能体系统", test_multi_agent_system)
+        ("多智能体系统", test_multi_agent_system),
+        ("延迟初始化", test_lazy_startup)
     ]
     
     results = []
@@ -0,0 +1,154 @@
+import atexit
+import json
+import time
+import threading
+import weakref
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+
+_persistent_caches: "weakref.WeakSet[TTLCache]" = weakref.WeakSet()
+
+
+@atexit.register
+def _flush_persistent_caches() -> None:
+    for cache in list(_persistent_caches):
+        try:
+            cache.flush()
+        except OSError as e:
+            print(f"缓存保存失败: {e}")
+
+
+class TTLCache:
+    def __init__(self,
+                 max_size: int = 1024,
+                 ttl: Optional[float] = None,
+                 persist_path: Optional[str] = None,
+                 save_interval: float = 0.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.persist_path = Path(persist_path) if persist_path else None
+        self.save_interval = save_interval
+        self._data: "OrderedDict[str, Tuple[Optional[float], Any]]" = OrderedDict()
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._dirty = False
+        self._last_saved = time.monotonic()
+
+        if self.persist_path:
+            self.load()
+            _persistent_caches.add(self)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+
+            expires_at, value = entry
+            if expires_at is not None and expires_at <= time.time():
+                del self._data[key]
+                self.evictions += 1
+                self.misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = ttl if ttl is not None else self.ttl
+        expires_at = time.time() + ttl if ttl else None
+
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._dirty = True
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            if self._data.pop(key, None) is not None:
+                self._dirty = True
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._dirty = True
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            entry = self._data.get(key)
+            return entry is not None and (entry[0] is None or entry[0] > time.time())
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def purge_expired(self) -> int:
+        now = time.time()
+        with self._lock:
+            expired = [k for k, (exp, _) in self._data.items() if exp is not None and exp <= now]
+            for key in expired:
+                del self._data[key]
+            self.evictions += len(expired)
+        return len(expired)
+
+    def load(self) -> None:
+        if not self.persist_path or not self.persist_path.exists():
+            return
+
+        try:
+            with open(self.persist_path, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"缓存加载失败: {e}")
+            return
+
+        now = time.time()
+        with self._lock:
+            for key, expires_at, value in entries:
+                if expires_at is None or expires_at > now:
+                    self._data[key] = (expires_at, value)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def save(self) -> None:
+        if not self.persist_path:
+            return
+
+        self.purge_expired()
+        with self._lock:
+            entries = [[k, exp, v] for k, (exp, v) in self._data.items()]
+            self._dirty = False
+            self._last_saved = time.monotonic()
+
+        self.persist_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.persist_path.with_suffix(self.persist_path.suffix + ".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entries, f, ensure_ascii=False)
+        tmp_path.replace(self.persist_path)
+
+    def save_if_due(self) -> None:
+        if self._dirty and time.monotonic() - self._last_saved >= self.save_interval:
+            self.save()
+
+    def flush(self) -> None:
+        if self._dirty:
+            self.save()
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / total if total else 0.0
+        }
@@ -0,0 +1,171 @@
+from typing import Dict, List, Any, Optional, Tuple, FrozenSet
+from functools import lru_cache
+import re
+
+from utils.keyword_matcher import policy_classifier
+
+
+FIELD_CATEGORY_KEYS = {
+    "金额": ["金额", "amount", "max_amount", "price"],
+    "预算": ["预算", "budget", "total_budget"],
+    "次数": ["次数", "limit", "monthly_limit"],
+    "天数": ["天数", "days", "validity_days"],
+}
+
+SCOPE_NEW_USER = "new_user"
+SCOPE_ONLINE_ONLY = "online_only"
+
+UNIT_MULTIPLIERS = {"万": 10000, "千": 1000, "百": 100}
+
+CHINESE_DIGITS = {"零": 0, "一": 1, "二": 2, "两": 2, "三": 3, "四": 4,
+                  "五": 5, "六": 6, "七": 7, "八": 8, "九": 9}
+CHINESE_UNITS = {"十": 10, "百": 100, "千": 1000}
+
+ENUMERATION_PREFIX = re.compile(r'^\s*(?:\d+[、．.](?!\d)|[(（]\d+[)）])\s*')
+ARABIC_NUMBER_PATTERN = re.compile(r'(\d+(?:\.\d+)?)\s*(万|千|百)?')
+CHINESE_NUMBER_PATTERN = re.compile(
+    r'(百分之)?([零一二两三四五六七八九十百千万]+)(?=[元%次天日个件人倍折月年周小])'
+)
+
+
+def parse_chinese_numeral(text: str) -> Optional[float]:
+    if not text:
+        return None
+
+    total = 0
+    section = 0
+    digit = 0
+    for ch in text:
+        if ch in CHINESE_DIGITS:
+            digit = CHINESE_DIGITS[ch]
+        elif ch in CHINESE_UNITS:
+            section += (digit or 1) * CHINESE_UNITS[ch]
+            digit = 0
+        elif ch == "万":
+            total += (section + digit) * 10000
+            section = 0
+            digit = 0
+        else:
+            return None
+    return float(total + section + digit)
+
+
+def parse_threshold(text: str) -> Optional[float]:
+    if not text:
+        return None
+    text = ENUMERATION_PREFIX.sub("", str(text))
+
+    match = ARABIC_NUMBER_PATTERN.search(text)
+    if match:
+        value = float(match.group(1))
+        unit = match.group(2)
+        return value * UNIT_MULTIPLIERS[unit] if unit else value
+
+    match = CHINESE_NUMBER_PATTERN.search(text)
+    if match:
+        return parse_chinese_numeral(match.group(2))
+
+    return None
+
+
+class CompiledRule:
+    __slots__ = (
+        "rule_type", "constraint_type", "field_categories", "operator",
+        "threshold", "checks_scope", "scope_tokens", "source_text"
+    )
+
+    def __init__(self,
+                 rule_type: str,
+                 constraint_type: str,
+                 field_categories: Tuple[str, ...],
+                 operator: str,
+                 threshold: Optional[float],
+                 checks_scope: bool,
+                 scope_tokens: FrozenSet[str],
+                 source_text: Any):
+        self.rule_type = rule_type
+        self.constraint_type = constraint_type
+        self.field_categories = field_categories
+        self.operator = operator
+        self.threshold = threshold
+        self.checks_scope = checks_scope
+        self.scope_tokens = scope_tokens
+        self.source_text = source_text
+
+    @property
+    def field_category(self) -> Optional[str]:
+        return self.field_categories[0] if self.field_categories else None
+
+    @property
+    def is_numeric(self) -> bool:
+        return self.threshold is not None
+
+    @classmethod
+    def from_text(cls, text: Any, rule_type: str = "", constraint_type: str = "") -> "CompiledRule":
+        terms = text if isinstance(text, str) else set(map(str, text or []))
+        matched = policy_classifier.scan(text)
+
+        scope_tokens = set()
+        checks_scope = "仅限" in terms or "禁止" in terms
+        if checks_scope:
+            if "新注册用户" in terms or "新用户" in terms:
+                scope_tokens.add(SCOPE_NEW_USER)
+            if "线上" in terms and "仅限" in terms:
+                scope_tokens.add(SCOPE_ONLINE_ONLY)
+
+        return cls(
+            rule_type=rule_type,
+            constraint_type=constraint_type or policy_classifier.constraint_type(matched),
+            field_categories=tuple(c for c in FIELD_CATEGORY_KEYS if c in terms),
+            operator=policy_classifier.operator(matched),
+            threshold=parse_threshold(text),
+            checks_scope=checks_scope,
+            scope_tokens=frozenset(scope_tokens),
+            source_text=text
+        )
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], source_text: Any = "", rule_type: str = "") -> "CompiledRule":
+        return cls(
+            rule_type=rule_type,
+            constraint_type=data.get("constraint_type", ""),
+            field_categories=tuple(data.get("field_categories", ())),
+            operator=data.get("operator", "<="),
+            threshold=data.get("threshold"),
+            checks_scope=data.get("checks_scope", False),
+            scope_tokens=frozenset(data.get("scope_tokens", ())),
+            source_text=source_text
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "constraint_type": self.constraint_type,
+            "field_categories": list(self.field_categories),
+            "operator": self.operator,
+            "threshold": self.threshold,
+            "checks_scope": self.checks_scope,
+            "scope_tokens": sorted(self.scope_tokens)
+        }
+
+    def __repr__(self) -> str:
+        return (f"CompiledRule({self.field_category!r} {self.operator} {self.threshold!r}, "
+                f"scope={sorted(self.scope_tokens)})")
+
+
+@lru_cache(maxsize=16384)
+def _compile_text(text: str, rule_type: str) -> CompiledRule:
+    return CompiledRule.from_text(text, rule_type)
+
+
+def compile_rule(rule: Dict[str, Any]) -> CompiledRule:
+    text = rule.get("source_text", rule.get("content", ""))
+    rule_type = rule.get("rule_type", "")
+    compiled = rule.get("compiled")
+
+    if isinstance(compiled, CompiledRule):
+        return compiled
+    if isinstance(compiled, dict):
+        return CompiledRule.from_dict(compiled, text, rule_type)
+    if isinstance(text, str):
+        return _compile_text(text, rule_type)
+    return CompiledRule.from_text(text, rule_type)
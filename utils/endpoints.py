@@ -0,0 +1,202 @@
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from utils.resilience import CircuitBreaker, is_retryable
+
+
+class Endpoint:
+    def __init__(self,
+                 name: str,
+                 base_url: Optional[str] = None,
+                 api_key: str = "",
+                 model: Optional[str] = None,
+                 window: int = 200,
+                 failure_threshold: int = 3,
+                 recovery_timeout: float = 30.0):
+        self.name = name
+        self.base_url = base_url
+        self.api_key = api_key
+        self.model = model
+        self.breaker = CircuitBreaker(failure_threshold, recovery_timeout)
+        self._latencies: deque = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.successes = 0
+        self.failures = 0
+
+    @property
+    def healthy(self) -> bool:
+        return self.breaker.state != CircuitBreaker.OPEN
+
+    def record_success(self, latency: float) -> None:
+        with self._lock:
+            self.successes += 1
+            self._latencies.append(latency)
+        self.breaker.record_success()
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+        self.breaker.record_failure()
+
+    def percentile(self, q: float, min_samples: int = 1) -> Optional[float]:
+        with self._lock:
+            if len(self._latencies) < max(1, min_samples):
+                return None
+            latencies = sorted(self._latencies)
+        return latencies[min(len(latencies) - 1, int(q * len(latencies)))]
+
+    def stats(self) -> Dict[str, Any]:
+        p50, p95 = self.percentile(0.5), self.percentile(0.95)
+        with self._lock:
+            return {
+                "base_url": self.base_url,
+                "requests": self.requests,
+                "successes": self.successes,
+                "failures": self.failures,
+                "p50_latency": round(p50, 4) if p50 is not None else None,
+                "p95_latency": round(p95, 4) if p95 is not None else None,
+                "state": self.breaker.state
+            }
+
+
+class EndpointPool:
+    def __init__(self,
+                 endpoints: List[Endpoint],
+                 hedge: bool = True,
+                 hedge_quantile: float = 0.95,
+                 hedge_min_samples: int = 5,
+                 hedge_default_delay: float = 2.0,
+                 hedge_min_delay: float = 0.05):
+        if not endpoints:
+            raise ValueError("至少需要配置一个LLM端点")
+        self.endpoints = endpoints
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_samples = hedge_min_samples
+        self.hedge_default_delay = hedge_default_delay
+        self.hedge_min_delay = hedge_min_delay
+        self._lock = threading.Lock()
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.failovers = 0
+
+    @property
+    def primary(self) -> Endpoint:
+        return self.ordered()[0]
+
+    def ordered(self) -> List[Endpoint]:
+        healthy = [e for e in self.endpoints if e.healthy]
+        return healthy + [e for e in self.endpoints if not e.healthy]
+
+    def hedge_delay(self, endpoint: Endpoint) -> float:
+        observed = endpoint.percentile(self.hedge_quantile, self.hedge_min_samples)
+        delay = observed if observed is not None else self.hedge_default_delay
+        return max(delay, self.hedge_min_delay)
+
+    async def call(self, fn: Callable[[Endpoint], Awaitable[Any]]) -> Any:
+        candidates = self.ordered()
+        tasks: Dict[asyncio.Task, Endpoint] = {}
+
+        def launch() -> None:
+            endpoint = candidates.pop(0)
+            tasks[asyncio.ensure_future(self._attempt(endpoint, fn))] = endpoint
+
+        launch()
+        primary = next(iter(tasks.values()))
+        hedged = False
+        last_error: Optional[BaseException] = None
+        fatal_error: Optional[BaseException] = None
+
+        try:
+            while tasks:
+                timeout = None
+                if self.hedge and candidates and not hedged and len(tasks) == 1:
+                    timeout = self.hedge_delay(primary)
+
+                done, _ = await asyncio.wait(set(tasks), timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    hedged = True
+                    self._count("hedged")
+                    launch()
+                    continue
+
+                for task in done:
+                    endpoint = tasks.pop(task)
+                    if task.exception() is None:
+                        if hedged and endpoint is not primary:
+                            self._count("hedge_wins")
+                        return task.result()
+                    last_error = task.exception()
+                    if not is_retryable(last_error):
+                        fatal_error = fatal_error or last_error
+
+                if fatal_error is not None and not tasks:
+                    raise fatal_error
+                if not tasks and candidates:
+                    self._count("failovers")
+                    launch()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        raise last_error
+
+    async def _attempt(self, endpoint: Endpoint, fn: Callable[[Endpoint], Awaitable[Any]]) -> Any:
+        with endpoint._lock:
+            endpoint.requests += 1
+        start = time.perf_counter()
+        try:
+            result = await fn(endpoint)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            if is_retryable(e):
+                endpoint.record_failure()
+            raise
+        endpoint.record_success(time.perf_counter() - start)
+        return result
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "hedged": self.hedged,
+                "hedge_wins": self.hedge_wins,
+                "failovers": self.failovers,
+                "endpoints": {e.name: e.stats() for e in self.endpoints}
+            }
+
+
+def create_endpoint_pool(config: Dict[str, Any], default_base_url: Optional[str] = None) -> EndpointPool:
+    api_key = config.get("api_key") or os.getenv("ZHIPU_API_KEY") or os.getenv("OPENAI_API_KEY", "")
+    specs = config.get("endpoints") or [{"name": "primary"}]
+
+    endpoints = []
+    for i, spec in enumerate(specs):
+        if spec.get("enabled", True) is False:
+            continue
+        endpoints.append(Endpoint(
+            spec.get("name", f"endpoint{i}"),
+            base_url=spec.get("base_url") or config.get("base_url") or default_base_url,
+            api_key=spec.get("api_key") or api_key,
+            model=spec.get("model"),
+            failure_threshold=config.get("endpoint_failure_threshold", 3),
+            recovery_timeout=config.get("breaker_recovery_seconds", 30.0)
+        ))
+
+    return EndpointPool(
+        endpoints,
+        hedge=config.get("hedge", True),
+        hedge_quantile=config.get("hedge_quantile", 0.95),
+        hedge_min_samples=config.get("hedge_min_samples", 5),
+        hedge_default_delay=config.get("hedge_default_delay", 2.0),
+        hedge_min_delay=config.get("hedge_min_delay", 0.05)
+    )
@@ -30,6 +30,34 @@ def truncate_text(text: str, max_length: int = 500) -> str:
     return text[:max_length] + "..."
 
 
+def estimate_tokens(text: str) -> int:
+    if not text:
+        return 0
+    cjk = sum(1 for ch in text if '\u4e00' <= ch <= '\u9fff')
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def truncate_tokens(text: str, max_tokens: int, tail_ratio: float = 0.25,
+                    marker: str = "\n……（内容已截断）……\n") -> str:
+    if estimate_tokens(text) <= max_tokens:
+        return text
+
+    def take(chars: str, budget: float) -> int:
+        cost = 0.0
+        for i, ch in enumerate(chars):
+            cost += 1 if '\u4e00' <= ch <= '\u9fff' else 0.25
+            if cost > budget:
+                return i
+        return len(chars)
+
+    budget = max(0, max_tokens - estimate_tokens(marker))
+    tail_budget = budget * tail_ratio
+    head = text[:take(text, budget - tail_budget)]
+    tail_length = take(text[::-1], tail_budget)
+    tail = text[len(text) - tail_length:] if tail_length else ""
+    return head + marker + tail
+
+
 def merge_dicts(dict_list: List[Dict]) -> Dict:
     result = {}
     for d in dict_list:
@@ -0,0 +1,128 @@
+from typing import Dict, List, Any, Optional, Iterable, FrozenSet, Union
+from functools import lru_cache
+
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+
+
+RULE_KEYWORDS = [
+    "应当", "必须", "不得", "禁止", "要求", "规定",
+    "限额", "上限", "下限", "范围", "条件", "标准",
+    "不超过", "不得超过", "不得少于", "仅限"
+]
+
+DOCUMENT_RULE_KEYWORDS = [
+    "应当", "必须", "不得", "禁止", "要求", "规定",
+    "限额", "上限", "下限", "范围", "条件", "标准"
+]
+
+RULE_TYPE_KEYWORDS = {
+    "禁止事项": ['不得', '禁止', '严禁'],
+    "必做事项": ['必须', '应当', '需要'],
+    "上限约束": ['限额', '上限', '不超过', '不得超过'],
+    "下限约束": ['下限', '不低于', '不少于', '不得少于'],
+    "范围限制": ['仅限', '范围'],
+}
+
+CONSTRAINT_KEYWORDS = {
+    "金额": ["金额", "费用", "成本", "预算", "元"],
+    "比例": ["比例", "百分比", "%", "折扣"],
+    "范围": ["范围", "对象", "用户", "渠道", "仅限"],
+    "时间": ["时间", "期限", "日期", "周期", "天"],
+    "数量": ["数量", "次数", "件数", "人数"]
+}
+
+OPERATOR_KEYWORDS = {
+    "<=": ["不超过", "不大于", "上限", "最高", "不得超过"],
+    ">=": ["不低于", "不小于", "下限", "最低", "不得少于"],
+    "==": ["等于", "为", "是"],
+}
+
+
+class KeywordMatcher:
+    def __init__(self, keywords: Iterable[str], backend: Optional[str] = None):
+        self.keywords = frozenset(kw for kw in keywords if kw)
+        self._ordered = sorted(self.keywords)
+        if backend is None:
+            if not AHOCORASICK_AVAILABLE:
+                print("Warning: pyahocorasick not available, falling back to per-keyword substring matching")
+            backend = "ahocorasick" if AHOCORASICK_AVAILABLE else "substring"
+        if backend == "ahocorasick" and not AHOCORASICK_AVAILABLE:
+            raise ImportError("pyahocorasick 未安装，无法使用 ahocorasick 匹配后端")
+        self.backend = backend
+        self._automaton = self._build_automaton() if backend == "ahocorasick" else None
+
+    def _build_automaton(self):
+        automaton = ahocorasick.Automaton()
+        for kw in self._ordered:
+            automaton.add_word(kw, kw)
+        automaton.make_automaton()
+        return automaton
+
+    def scan(self, text: Union[str, Dict, Iterable]) -> FrozenSet[str]:
+        if not text:
+            return frozenset()
+        if not isinstance(text, str):
+            return frozenset(k for k in text if k in self.keywords)
+        if self._automaton is not None:
+            return frozenset(kw for _, kw in self._automaton.iter(text))
+        return frozenset(kw for kw in self._ordered if kw in text)
+
+
+class PolicyKeywordClassifier:
+    def __init__(self, backend: Optional[str] = None):
+        all_keywords = set(RULE_KEYWORDS) | set(DOCUMENT_RULE_KEYWORDS)
+        for groups in (RULE_TYPE_KEYWORDS, CONSTRAINT_KEYWORDS, OPERATOR_KEYWORDS):
+            for keywords in groups.values():
+                all_keywords.update(keywords)
+
+        self.matcher = KeywordMatcher(all_keywords, backend)
+        self._rule_keywords = frozenset(RULE_KEYWORDS)
+        self._document_rule_keywords = frozenset(DOCUMENT_RULE_KEYWORDS)
+        self._rule_types = [(name, frozenset(kws)) for name, kws in RULE_TYPE_KEYWORDS.items()]
+        self._constraints = [(name, frozenset(kws)) for name, kws in CONSTRAINT_KEYWORDS.items()]
+        self._operators = [(name, frozenset(kws)) for name, kws in OPERATOR_KEYWORDS.items()]
+        self._cached_scan = lru_cache(maxsize=8192)(self.matcher.scan)
+
+    def scan(self, text: Any) -> FrozenSet[str]:
+        if isinstance(text, str):
+            return self._cached_scan(text)
+        return self.matcher.scan(text)
+
+    def contains_rule(self, matched: FrozenSet[str]) -> bool:
+        return not self._rule_keywords.isdisjoint(matched)
+
+    def contains_document_rule(self, matched: FrozenSet[str]) -> bool:
+        return not self._document_rule_keywords.isdisjoint(matched)
+
+    def rule_type(self, matched: FrozenSet[str]) -> str:
+        return self._first_group(self._rule_types, matched) or "条件约束"
+
+    def constraint_type(self, matched: FrozenSet[str]) -> str:
+        return self._first_group(self._constraints, matched) or "其他"
+
+    def operator(self, matched: FrozenSet[str]) -> str:
+        return self._first_group(self._operators, matched) or "<="
+
+    def classify(self, text: Any) -> Dict[str, Any]:
+        matched = self.scan(text)
+        return {
+            "matched": matched,
+            "contains_rule": self.contains_rule(matched),
+            "rule_type": self.rule_type(matched),
+            "constraint_type": self.constraint_type(matched),
+            "operator": self.operator(matched)
+        }
+
+    @staticmethod
+    def _first_group(groups: List, matched: FrozenSet[str]) -> Optional[str]:
+        for name, keywords in groups:
+            if not keywords.isdisjoint(matched):
+                return name
+        return None
+
+
+policy_classifier = PolicyKeywordClassifier()
@@ -0,0 +1,43 @@
+import threading
+from typing import Any, Callable
+
+
+class LazyProxy:
+    __slots__ = ("_factory", "_instance", "_lock")
+
+    def __init__(self, factory: Callable[[], Any]):
+        object.__setattr__(self, "_factory", factory)
+        object.__setattr__(self, "_instance", None)
+        object.__setattr__(self, "_lock", threading.Lock())
+
+    def _resolve(self) -> Any:
+        instance = object.__getattribute__(self, "_instance")
+        if instance is None:
+            with object.__getattribute__(self, "_lock"):
+                instance = object.__getattribute__(self, "_instance")
+                if instance is None:
+                    instance = object.__getattribute__(self, "_factory")()
+                    object.__setattr__(self, "_instance", instance)
+        return instance
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._resolve(), name)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        setattr(self._resolve(), name, value)
+
+    def __delattr__(self, name: str) -> None:
+        delattr(self._resolve(), name)
+
+    def __repr__(self) -> str:
+        instance = object.__getattribute__(self, "_instance")
+        if instance is None:
+            factory = object.__getattribute__(self, "_factory")
+            return f"<LazyProxy {getattr(factory, '__name__', factory)} (未初始化)>"
+        return repr(instance)
+
+
+def is_initialized(proxy: Any) -> bool:
+    if not isinstance(proxy, LazyProxy):
+        return True
+    return object.__getattribute__(proxy, "_instance") is not None
@@ -1,18 +1,72 @@
 import os
 import json
-from typing import Optional, Dict, Any, List
-from openai import OpenAI
-from config.settings import LLM_CONFIG
+import asyncio
+import queue
+import threading
+import time
+import weakref
+from typing import Optional, Dict, Any, List, Iterable, Iterator, AsyncIterator, Awaitable
+from config.settings import LLM_CONFIG, CACHE_CONFIG
+from utils.helpers import estimate_tokens, truncate_tokens
+from utils.llm_metrics import LLMMetrics, llm_metrics
+from utils.resilience import RateLimiter, RetryPolicy, CircuitBreaker, is_retryable, retry_after
+from utils.response_cache import ResponseCache, create_response_cache
+from utils.singleflight import SingleFlight
+from utils.endpoints import Endpoint, create_endpoint_pool
+from utils.lazy import LazyProxy
+
+
+ZHIPU_BASE_URL = "https://open.bigmodel.cn/api/paas/v4"
 
 
 class LLMClient:
-    def __init__(self, config: Dict[str, Any] = None):
+    def __init__(self,
+                 config: Dict[str, Any] = None,
+                 response_cache: Optional[ResponseCache] = None,
+                 metrics: Optional[LLMMetrics] = None):
         self.config = config or LLM_CONFIG
+        self.response_cache = response_cache
+        self.metrics = metrics or LLMMetrics()
+        self.prompt_budgets = self.config.get("prompt_budgets", {})
         self.provider = self.config.get("provider", "openai")
-        self.client = self._init_client()
+        self.max_concurrency = max(1, self.config.get("max_concurrency", 8))
+        self._client = None
+        self.endpoint_pool = create_endpoint_pool(
+            self.config, ZHIPU_BASE_URL if self.provider == "zhipu" else None
+        )
+        self._loop_state: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_lock = threading.Lock()
+        self.rate_limiter = RateLimiter(
+            self.config.get("requests_per_minute", 0),
+            self.config.get("tokens_per_minute", 0)
+        )
+        self.retry_policy = RetryPolicy(
+            self.config.get("max_retries", 3),
+            self.config.get("retry_base_delay", 0.5),
+            self.config.get("retry_max_delay", 8.0)
+        )
+        self.circuit_breaker = CircuitBreaker(
+            self.config.get("breaker_failure_threshold", 5),
+            self.config.get("breaker_recovery_seconds", 30.0)
+        )
+        self.single_flight = SingleFlight() if self.config.get("single_flight", True) else None
+        self._stats_lock = threading.Lock()
+        self.counters = {"requests": 0, "attempts": 0, "retries": 0, "failures": 0}
+    
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = self._init_client()
+        return self._client
+    
+    def _api_key(self) -> str:
+        return self.config.get("api_key") or os.getenv("ZHIPU_API_KEY") or os.getenv("OPENAI_API_KEY", "")
     
     def _init_client(self):
-        api_key = self.config.get("api_key") or os.getenv("ZHIPU_API_KEY") or os.getenv("OPENAI_API_KEY", "")
+        from openai import OpenAI
+        
+        api_key = self._api_key()
         base_url = self.config.get("base_url")
         
         if self.provider == "zhipu":
@@ -22,7 +76,7 @@ class LLMClient:
             except ImportError:
                 return OpenAI(
                     api_key=api_key,
-                    base_url=base_url or "https://open.bigmodel.cn/api/paas/v4"
+                    base_url=base_url or ZHIPU_BASE_URL
                 )
         else:
             client_kwargs = {"api_key": api_key}
@@ -30,57 +84,294 @@ class LLMClient:
                 client_kwargs["base_url"] = base_url
             return OpenAI(**client_kwargs)
     
-    def chat(self, 
-             messages: List[Dict[str, str]], 
-             temperature: Optional[float] = None,
-             max_tokens: Optional[int] = None,
-             response_format: Optional[Dict] = None) -> str:
+    def _init_async_client(self, endpoint: Optional[Endpoint] = None):
+        from openai import AsyncOpenAI
+        
+        endpoint = endpoint or self.endpoint_pool.endpoints[0]
+        client_kwargs = {"api_key": endpoint.api_key, "max_retries": 0}
+        if endpoint.base_url:
+            client_kwargs["base_url"] = endpoint.base_url
+        return AsyncOpenAI(**client_kwargs)
+    
+    def _async_state(self) -> tuple:
+        loop = asyncio.get_running_loop()
+        state = self._loop_state.get(loop)
+        if state is None:
+            state = ({}, asyncio.Semaphore(self.max_concurrency))
+            self._loop_state[loop] = state
+        return state
+    
+    def _endpoint_client(self, endpoint: Endpoint):
+        clients, _ = self._async_state()
+        client = clients.get(endpoint.name)
+        if client is None:
+            client = clients[endpoint.name] = self._init_async_client(endpoint)
+        return client
+    
+    def _background_loop(self) -> asyncio.AbstractEventLoop:
+        with self._loop_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name="llm-client-loop", daemon=True).start()
+        return self._loop
+    
+    def run(self, coro: Awaitable) -> Any:
+        return asyncio.run_coroutine_threadsafe(coro, self._background_loop()).result()
+    
+    async def achat(self,
+                    messages: List[Dict[str, str]],
+                    temperature: Optional[float] = None,
+                    max_tokens: Optional[int] = None,
+                    response_format: Optional[Dict] = None,
+                    use_cache: bool = True,
+                    caller: str = "default") -> str:
+        start = time.perf_counter()
+        messages, truncated = self._apply_budget(messages, caller)
+        kwargs = self._request_kwargs(messages, temperature, max_tokens, response_format)
+        key = self._cache_key(kwargs)
+        call = {"caller": caller, "truncated": truncated, "cache": self._cache_status(use_cache)}
         
-        model = self.config.get("model", "glm-4")
-        temp = temperature or self.config.get("temperature", 0.1)
-        tokens = max_tokens or self.config.get("max_tokens", 4096)
+        try:
+            if call["cache"] == "miss":
+                cached = await self.response_cache.aget(key)
+                if cached is not None:
+                    call["cache"] = "hit"
+                    return cached
+                if self.response_cache.bypass:
+                    call["cache"] = "bypass"
+            
+            async def fetch() -> str:
+                content = await self._request(kwargs, call)
+                if call["cache"] == "miss" and content:
+                    await self.response_cache.aset(key, content)
+                return content
+            
+            if self.single_flight is None:
+                return await fetch()
+            content, shared = await self.single_flight.do(key, fetch)
+            if shared:
+                call["cache"] = "coalesced"
+            return content
+        except Exception:
+            call["error"] = True
+            raise
+        finally:
+            self._record(call, start)
+    
+    def _cache_status(self, use_cache: bool) -> str:
+        if self.response_cache is None:
+            return "disabled"
+        return "miss" if use_cache else "bypass"
+    
+    def _apply_budget(self, messages: List[Dict[str, str]], caller: str) -> tuple:
+        budget = self.prompt_budgets.get(caller, self.prompt_budgets.get("default"))
+        if not budget or not messages:
+            return messages, False
         
-        if self.provider == "zhipu" and hasattr(self.client, 'chat'):
-            try:
-                from zhipuai import ZhipuAI
-                if isinstance(self.client, ZhipuAI):
-                    response = self.client.chat.completions.create(
-                        model=model,
-                        messages=messages,
-                        temperature=temp,
-                        max_tokens=tokens
-                    )
-                    return response.choices[0].message.content
-            except Exception:
-                pass
+        sizes = [estimate_tokens(m.get("content", "")) for m in messages]
+        if sum(sizes) <= budget:
+            return messages, False
         
+        target = max(range(len(messages)), key=lambda i: (messages[i].get("role") != "system", sizes[i]))
+        allowed = max(budget - (sum(sizes) - sizes[target]), budget // 4)
+        messages = list(messages)
+        messages[target] = {**messages[target], "content": truncate_tokens(messages[target]["content"], allowed)}
+        return messages, True
+    
+    def _record(self, call: Dict[str, Any], start: float) -> None:
+        spent = call["cache"] in ("miss", "bypass", "disabled")
+        self.metrics.record(
+            call["caller"],
+            prompt_tokens=call.get("prompt_tokens", 0) if spent else 0,
+            completion_tokens=call.get("completion_tokens", 0) if spent else 0,
+            latency=time.perf_counter() - start,
+            retries=call.get("retries", 0),
+            cache=call["cache"],
+            truncated=call["truncated"],
+            error=call.get("error", False),
+            first_token_latency=call.get("first_token_latency")
+        )
+    
+    def _request_kwargs(self,
+                        messages: List[Dict[str, str]],
+                        temperature: Optional[float] = None,
+                        max_tokens: Optional[int] = None,
+                        response_format: Optional[Dict] = None) -> Dict[str, Any]:
         kwargs = {
-            "model": model,
+            "model": self.config.get("model", "glm-4"),
             "messages": messages,
-            "temperature": temp,
-            "max_tokens": tokens,
+            "temperature": temperature if temperature is not None else self.config.get("temperature", 0.1),
+            "max_tokens": max_tokens or self.config.get("max_tokens", 4096),
         }
         
         if response_format and self.provider != "zhipu":
             kwargs["response_format"] = response_format
+        return kwargs
+    
+    def _cache_key(self, kwargs: Dict[str, Any]) -> str:
+        return ResponseCache.fingerprint(
+            self.provider, kwargs["model"], kwargs["messages"],
+            kwargs["temperature"], kwargs["max_tokens"], kwargs.get("response_format")
+        )
+    
+    async def _request(self, kwargs: Dict[str, Any], call: Optional[Dict[str, Any]] = None) -> str:
+        response = await self._create(kwargs, call=call)
+        content = response.choices[0].message.content
+        if call is not None:
+            self._record_usage(call, getattr(response, "usage", None), kwargs["messages"], content)
+        return content
+    
+    async def _request_stream(self,
+                              kwargs: Dict[str, Any],
+                              call: Optional[Dict[str, Any]] = None) -> AsyncIterator[str]:
+        _, semaphore = self._async_state()
+        usage = None
+        parts = []
+        async with semaphore:
+            stream = await self._create({**kwargs, "stream": True}, bounded=False, call=call)
+            async for chunk in stream:
+                usage = getattr(chunk, "usage", None) or usage
+                if chunk.choices and chunk.choices[0].delta.content:
+                    parts.append(chunk.choices[0].delta.content)
+                    yield parts[-1]
+        if call is not None:
+            self._record_usage(call, usage, kwargs["messages"], "".join(parts))
+    
+    @staticmethod
+    def _record_usage(call: Dict[str, Any], usage: Any, messages: List[Dict[str, str]], content: str) -> None:
+        prompt_tokens = getattr(usage, "prompt_tokens", None)
+        completion_tokens = getattr(usage, "completion_tokens", None)
+        call["prompt_tokens"] = prompt_tokens if prompt_tokens is not None else \
+            sum(estimate_tokens(m.get("content", "")) for m in messages)
+        call["completion_tokens"] = completion_tokens if completion_tokens is not None else \
+            estimate_tokens(content or "")
+    
+    async def _create(self,
+                      kwargs: Dict[str, Any],
+                      bounded: bool = True,
+                      call: Optional[Dict[str, Any]] = None) -> Any:
+        _, semaphore = self._async_state()
+        messages = kwargs["messages"]
+        prompt_tokens = sum(estimate_tokens(m.get("content", "")) for m in messages)
+        self._count("requests")
+        
+        async def send(endpoint: Endpoint) -> Any:
+            request = dict(kwargs, model=endpoint.model or kwargs["model"])
+            return await self._endpoint_client(endpoint).chat.completions.create(**request)
         
-        response = self.client.chat.completions.create(**kwargs)
-        return response.choices[0].message.content
+        attempt = 0
+        while True:
+            if call is not None:
+                call["retries"] = attempt
+            probe = self.circuit_breaker.before_call()
+            error = None
+            try:
+                await self.rate_limiter.acquire(prompt_tokens)
+                self._count("attempts")
+                if bounded:
+                    async with semaphore:
+                        response = await self.endpoint_pool.call(send)
+                else:
+                    response = await self.endpoint_pool.call(send)
+            except asyncio.CancelledError:
+                if probe:
+                    self.circuit_breaker.record_failure()
+                raise
+            except Exception as e:
+                error = e
+                if is_retryable(e) and (probe or getattr(e, "status_code", None) != 429):
+                    self.circuit_breaker.record_failure()
+            else:
+                self.circuit_breaker.record_success()
+            finally:
+                if probe:
+                    self.circuit_breaker.release_probe()
+            
+            if error is not None:
+                if not is_retryable(error) or attempt >= self.retry_policy.max_retries:
+                    self._count("failures")
+                    raise error
+                self._count("retries")
+                await asyncio.sleep(self.retry_policy.delay(attempt, retry_after(error)))
+                attempt += 1
+                continue
+            
+            total_tokens = getattr(getattr(response, "usage", None), "total_tokens", None)
+            if total_tokens:
+                self.rate_limiter.record_usage(total_tokens - prompt_tokens)
+            return response
     
-    def chat_with_system(self,
-                         system_prompt: str,
-                         user_message: str,
-                         temperature: Optional[float] = None) -> str:
+    def _count(self, name: str) -> None:
+        with self._stats_lock:
+            self.counters[name] += 1
+    
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            counters = dict(self.counters)
+        return {
+            **counters,
+            "rate_limiter": self.rate_limiter.stats(),
+            "circuit_breaker": self.circuit_breaker.stats(),
+            "coalesced": self.single_flight.coalesced if self.single_flight is not None else 0,
+            "endpoint_pool": self.endpoint_pool.stats(),
+            "response_cache": self.response_cache.stats() if self.response_cache is not None else None
+        }
+    
+    async def achat_stream(self,
+                           messages: List[Dict[str, str]],
+                           temperature: Optional[float] = None,
+                           max_tokens: Optional[int] = None,
+                           use_cache: bool = True,
+                           caller: str = "default") -> AsyncIterator[str]:
+        start = time.perf_counter()
+        messages, truncated = self._apply_budget(messages, caller)
+        kwargs = self._request_kwargs(messages, temperature, max_tokens)
+        key = self._cache_key(kwargs)
+        call = {"caller": caller, "truncated": truncated, "cache": self._cache_status(use_cache)}
+        
+        try:
+            if call["cache"] == "miss":
+                cached = await self.response_cache.aget(key)
+                if cached is not None:
+                    call["cache"] = "hit"
+                    call["first_token_latency"] = time.perf_counter() - start
+                    yield cached
+                    return
+                if self.response_cache.bypass:
+                    call["cache"] = "bypass"
+            
+            parts = []
+            async for delta in self._request_stream(kwargs, call):
+                if not parts:
+                    call["first_token_latency"] = time.perf_counter() - start
+                parts.append(delta)
+                yield delta
+            if call["cache"] == "miss" and parts:
+                await self.response_cache.aset(key, "".join(parts))
+        except Exception:
+            call["error"] = True
+            raise
+        finally:
+            self._record(call, start)
+    
+    async def achat_with_system(self,
+                                system_prompt: str,
+                                user_message: str,
+                                temperature: Optional[float] = None,
+                                use_cache: bool = True,
+                                caller: str = "default") -> str:
         messages = [
             {"role": "system", "content": system_prompt},
             {"role": "user", "content": user_message}
         ]
-        return self.chat(messages, temperature=temperature)
+        return await self.achat(messages, temperature=temperature, use_cache=use_cache, caller=caller)
     
-    def chat_json(self,
-                  system_prompt: str,
-                  user_message: str,
-                  temperature: Optional[float] = None) -> Dict[str, Any]:
+    async def achat_json(self,
+                         system_prompt: str,
+                         user_message: str,
+                         temperature: Optional[float] = None,
+                         use_cache: bool = True,
+                         caller: str = "default") -> Dict[str, Any]:
         enhanced_prompt = system_prompt + "\n\n请确保返回有效的JSON格式。"
         
         messages = [
@@ -88,27 +379,122 @@ class LLMClient:
             {"role": "user", "content": user_message}
         ]
         
+        response = None
         try:
-            response = self.chat(messages, temperature=temperature)
-            
-            json_str = response.strip()
-            if json_str.startswith("```json"):
-                json_str = json_str[7:]
-            if json_str.startswith("```"):
-                json_str = json_str[3:]
-            if json_str.endswith("```"):
-                json_str = json_str[:-3]
-            json_str = json_str.strip()
-            
-            if json_str.startswith("[") or json_str.startswith("{"):
-                return json.loads(json_str)
-            else:
-                return {"raw_response": response, "error": "Not valid JSON format"}
-                
+            response = await self.achat(messages, temperature=temperature, use_cache=use_cache, caller=caller)
+            result = self._parse_json(response)
+            if isinstance(result, dict) and "raw_response" in result:
+                self._forget(messages, temperature, caller)
+            return result
         except json.JSONDecodeError as e:
+            self._forget(messages, temperature, caller)
             return {"error": f"Failed to parse JSON response: {str(e)}", "raw": response}
         except Exception as e:
             return {"error": str(e)}
+    
+    def _forget(self,
+                messages: List[Dict[str, str]],
+                temperature: Optional[float] = None,
+                caller: str = "default") -> None:
+        if self.response_cache is not None:
+            messages, _ = self._apply_budget(messages, caller)
+            self.response_cache.delete(self._cache_key(self._request_kwargs(messages, temperature)))
+    
+    async def gather(self, coros: Iterable[Awaitable], return_exceptions: bool = False) -> List[Any]:
+        return list(await asyncio.gather(*coros, return_exceptions=return_exceptions))
+    
+    def chat(self,
+             messages: List[Dict[str, str]],
+             temperature: Optional[float] = None,
+             max_tokens: Optional[int] = None,
+             response_format: Optional[Dict] = None,
+             use_cache: bool = True,
+             caller: str = "default") -> str:
+        return self.run(self.achat(messages, temperature, max_tokens, response_format, use_cache, caller))
+    
+    def chat_stream(self,
+                    messages: List[Dict[str, str]],
+                    temperature: Optional[float] = None,
+                    max_tokens: Optional[int] = None,
+                    use_cache: bool = True,
+                    caller: str = "default") -> Iterator[str]:
+        return self.iterate(self.achat_stream(messages, temperature, max_tokens, use_cache, caller))
+    
+    def chat_stream_with_system(self,
+                                system_prompt: str,
+                                user_message: str,
+                                temperature: Optional[float] = None,
+                                caller: str = "default") -> Iterator[str]:
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_message}
+        ]
+        return self.chat_stream(messages, temperature=temperature, caller=caller)
+    
+    def iterate(self, stream: AsyncIterator) -> Iterator:
+        items: "queue.Queue" = queue.Queue()
+        
+        async def pump():
+            try:
+                async for item in stream:
+                    items.put((True, item))
+            except BaseException as e:
+                items.put((False, e))
+                return
+            items.put((False, None))
+        
+        future = asyncio.run_coroutine_threadsafe(pump(), self._background_loop())
+        try:
+            while True:
+                ok, value = items.get()
+                if ok:
+                    yield value
+                elif value is not None:
+                    raise value
+                else:
+                    return
+        finally:
+            future.cancel()
+    
+    def chat_with_system(self,
+                         system_prompt: str,
+                         user_message: str,
+                         temperature: Optional[float] = None,
+                         use_cache: bool = True,
+                         caller: str = "default") -> str:
+        return self.run(self.achat_with_system(system_prompt, user_message, temperature, use_cache, caller))
+    
+    def chat_json(self,
+                  system_prompt: str,
+                  user_message: str,
+                  temperature: Optional[float] = None,
+                  use_cache: bool = True,
+                  caller: str = "default") -> Dict[str, Any]:
+        return self.run(self.achat_json(system_prompt, user_message, temperature, use_cache, caller))
+    
+    def batch_chat_json(self,
+                        requests: List[tuple],
+                        temperature: Optional[float] = None,
+                        caller: str = "default") -> List[Dict[str, Any]]:
+        return self.run(self.gather(
+            self.achat_json(system_prompt, user_message, temperature, caller=caller)
+            for system_prompt, user_message in requests
+        ))
+    
+    @staticmethod
+    def _parse_json(response: str) -> Any:
+        json_str = response.strip()
+        if json_str.startswith("```json"):
+            json_str = json_str[7:]
+        if json_str.startswith("```"):
+            json_str = json_str[3:]
+        if json_str.endswith("```"):
+            json_str = json_str[:-3]
+        json_str = json_str.strip()
+        
+        if json_str.startswith("[") or json_str.startswith("{"):
+            return json.loads(json_str)
+        return {"raw_response": response, "error": "Not valid JSON format"}
 
 
-llm_client = LLMClient()
+llm_client = LazyProxy(lambda: LLMClient(response_cache=create_response_cache(CACHE_CONFIG["llm"]), metrics=llm_metrics))
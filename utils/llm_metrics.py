@@ -0,0 +1,138 @@
+import json
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+
+CACHE_STATUSES = ("miss", "hit", "coalesced", "bypass", "disabled")
+
+
+class LLMMetrics:
+    def __init__(self, max_samples: int = 2048):
+        self.max_samples = max_samples
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._callers: Dict[str, Dict[str, Any]] = {}
+            self._latencies: Dict[str, deque] = {}
+            self._samples: Dict[str, int] = {}
+            self._started_at = datetime.now().isoformat()
+            self._start = time.perf_counter()
+
+    def record(self,
+               caller: str,
+               prompt_tokens: int = 0,
+               completion_tokens: int = 0,
+               latency: float = 0.0,
+               retries: int = 0,
+               cache: str = "miss",
+               truncated: bool = False,
+               error: bool = False,
+               first_token_latency: Optional[float] = None) -> None:
+        with self._lock:
+            stats = self._callers.get(caller)
+            if stats is None:
+                stats = {
+                    "calls": 0,
+                    "errors": 0,
+                    "prompt_tokens": 0,
+                    "completion_tokens": 0,
+                    "latency_seconds": 0.0,
+                    "max_latency": 0.0,
+                    "retries": 0,
+                    "truncated": 0,
+                    "streams": 0,
+                    "first_token_seconds": 0.0,
+                    "cache": {status: 0 for status in CACHE_STATUSES}
+                }
+                self._callers[caller] = stats
+                self._latencies[caller] = deque(maxlen=self.max_samples)
+                self._samples[caller] = 0
+
+            stats["calls"] += 1
+            stats["errors"] += int(error)
+            stats["prompt_tokens"] += prompt_tokens
+            stats["completion_tokens"] += completion_tokens
+            stats["latency_seconds"] += latency
+            stats["max_latency"] = max(stats["max_latency"], latency)
+            stats["retries"] += retries
+            stats["truncated"] += int(truncated)
+            stats["cache"][cache] = stats["cache"].get(cache, 0) + 1
+            if first_token_latency is not None:
+                stats["streams"] += 1
+                stats["first_token_seconds"] += first_token_latency
+            self._latencies[caller].append(latency)
+            self._samples[caller] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "started_at": datetime.now().isoformat(),
+                "start": time.perf_counter(),
+                "callers": {caller: dict(stats, cache=dict(stats["cache"]))
+                            for caller, stats in self._callers.items()},
+                "samples": dict(self._samples)
+            }
+
+    def _since(self, caller: str, stats: Dict[str, Any], since: Dict[str, Any]):
+        before = since["callers"].get(caller)
+        new_samples = self._samples[caller] - since["samples"].get(caller, 0)
+        latencies = list(self._latencies[caller])[-new_samples:] if new_samples else []
+        if before is None:
+            return stats, latencies
+
+        delta = {key: value - before[key] for key, value in stats.items()
+                 if key not in ("cache", "max_latency")}
+        delta["cache"] = {status: count - before["cache"].get(status, 0)
+                          for status, count in stats["cache"].items()}
+        delta["max_latency"] = max(latencies, default=0.0)
+        return delta, latencies
+
+    def report(self, since: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        with self._lock:
+            callers = {}
+            totals = {"calls": 0, "errors": 0, "prompt_tokens": 0, "completion_tokens": 0,
+                      "latency_seconds": 0.0, "retries": 0, "truncated": 0}
+            for caller, stats in sorted(self._callers.items()):
+                latencies = self._latencies[caller]
+                if since is not None:
+                    stats, latencies = self._since(caller, stats, since)
+                    if not stats["calls"]:
+                        continue
+                latencies = sorted(latencies)
+                entry = dict(stats, cache=dict(stats["cache"]))
+                entry["total_tokens"] = stats["prompt_tokens"] + stats["completion_tokens"]
+                entry["avg_latency"] = round(stats["latency_seconds"] / stats["calls"], 4)
+                entry["p95_latency"] = round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 4)
+                entry["latency_seconds"] = round(stats["latency_seconds"], 4)
+                entry["max_latency"] = round(stats["max_latency"], 4)
+                entry["first_token_seconds"] = round(
+                    stats["first_token_seconds"] / stats["streams"], 4) if stats["streams"] else None
+                callers[caller] = entry
+                for key in totals:
+                    totals[key] += stats[key]
+
+            totals["total_tokens"] = totals["prompt_tokens"] + totals["completion_tokens"]
+            totals["latency_seconds"] = round(totals["latency_seconds"], 4)
+            started_at, start = (since["started_at"], since["start"]) if since else (self._started_at, self._start)
+            return {
+                "started_at": started_at,
+                "elapsed_seconds": round(time.perf_counter() - start, 4),
+                "totals": totals,
+                "callers": callers
+            }
+
+    def save(self, filepath: Path, since: Optional[Dict[str, Any]] = None) -> Path:
+        filepath = Path(filepath)
+        filepath.parent.mkdir(parents=True, exist_ok=True)
+        with open(filepath, 'w', encoding='utf-8') as f:
+            json.dump(self.report(since), f, ensure_ascii=False, indent=2)
+        return filepath
+
+
+llm_metrics = LLMMetrics()
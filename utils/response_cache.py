@@ -0,0 +1,182 @@
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+
+class ResponseCache:
+    def __init__(self,
+                 db_path: str,
+                 max_bytes: int = 64 * 1024 * 1024,
+                 bypass: bool = False,
+                 touch_batch: int = 64):
+        self.db_path = Path(db_path)
+        self.max_bytes = max_bytes
+        self.bypass = bypass
+        self.touch_batch = max(1, touch_batch)
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.RLock()
+        self._total_bytes: Optional[int] = None
+        self._touched: Dict[str, float] = {}
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.evictions = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    response TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL,
+                    accessed_at REAL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses (accessed_at)")
+            conn.commit()
+            self._conn = conn
+            self._total_bytes = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        return self._conn
+
+    @staticmethod
+    def fingerprint(provider: str,
+                    model: str,
+                    messages: List[Dict[str, str]],
+                    temperature: float,
+                    max_tokens: int,
+                    response_format: Optional[Dict] = None) -> str:
+        payload = json.dumps(
+            [provider, model, messages, temperature, max_tokens, response_format],
+            ensure_ascii=False, sort_keys=True, separators=(",", ":")
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            if self.bypass:
+                self.bypassed += 1
+                return None
+
+            conn = self._connect()
+            row = conn.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            self._touched[key] = time.time()
+            if len(self._touched) >= self.touch_batch:
+                self._flush_touches(conn)
+                conn.commit()
+            self.hits += 1
+            return row[0]
+
+    async def aget(self, key: str) -> Optional[str]:
+        return await asyncio.to_thread(self.get, key)
+
+    async def aset(self, key: str, response: str) -> None:
+        await asyncio.to_thread(self.set, key, response)
+
+    def set(self, key: str, response: str) -> None:
+        size = len(response.encode("utf-8"))
+        if self.bypass or size > self.max_bytes:
+            return
+
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, response, size, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, response, size, now, now)
+            )
+            self._total_bytes += size - (row[0] if row else 0)
+            self._touched.pop(key, None)
+            if self._total_bytes > self.max_bytes:
+                self._flush_touches(conn)
+                self._evict(conn, int(self.max_bytes * 0.9))
+            conn.commit()
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            conn = self._connect()
+            self._touched.pop(key, None)
+            row = conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return
+            conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            conn.commit()
+            self._total_bytes -= row[0]
+
+    def clear(self) -> None:
+        with self._lock:
+            conn = self._connect()
+            self._touched.clear()
+            conn.execute("DELETE FROM responses")
+            conn.commit()
+            self._total_bytes = 0
+
+    def flush(self) -> None:
+        with self._lock:
+            if self._touched and self._conn is not None:
+                self._flush_touches(self._conn)
+                self._conn.commit()
+
+    def _flush_touches(self, conn: sqlite3.Connection) -> None:
+        if self._touched:
+            conn.executemany("UPDATE responses SET accessed_at = ? WHERE key = ?",
+                             [(accessed_at, key) for key, accessed_at in self._touched.items()])
+            self._touched.clear()
+
+    def _evict(self, conn: sqlite3.Connection, target_bytes: int) -> None:
+        evicted = []
+        for key, size in conn.execute("SELECT key, size FROM responses ORDER BY accessed_at"):
+            if self._total_bytes <= target_bytes:
+                break
+            evicted.append((key,))
+            self._total_bytes -= size
+        conn.executemany("DELETE FROM responses WHERE key = ?", evicted)
+        self.evictions += len(evicted)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self.flush()
+                self._conn.close()
+                self._conn = None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            conn = self._connect()
+            size = conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            total = self.hits + self.misses
+            return {
+                "size": size,
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "bypassed": self.bypassed,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / total if total else 0.0
+            }
+
+
+def create_response_cache(config: Dict[str, Any]) -> Optional[ResponseCache]:
+    if not config.get("enabled", True):
+        return None
+    return ResponseCache(
+        config["path"],
+        max_bytes=config.get("max_bytes", 64 * 1024 * 1024),
+        bypass=config.get("bypass", False),
+        touch_batch=config.get("touch_batch", 64)
+    )